@@ -0,0 +1,89 @@
+# Compares one CTGAN per condition with a single conditional CTGAN over hospital_data.csv:
+# training time, disk footprint, load latency and per-condition fidelity.
+# Run from the project root: python -m data_synthesis_and_personalized_treatment.benchmark_conditional_model
+import argparse
+import os
+import tempfile
+import time
+import joblib
+import numpy as np
+import pandas as pd
+from data_synthesis_and_personalized_treatment.model_registry import CONDITIONAL_FILE, model_filename
+from data_synthesis_and_personalized_treatment.sampling import sample_exact
+from data_synthesis_and_personalized_treatment.train_ehr_generator import DATASET, categorical_features
+from data_synthesis_and_personalized_treatment.training import train_conditional, train_per_condition
+
+CONTINUOUS_COLUMNS = ['Age', 'Cost', 'Length_of_Stay']
+DISCRETE_COLUMNS = ['Gender', 'Procedure', 'Readmission', 'Outcome', 'Satisfaction']
+
+
+def ks_statistic(real, synthetic):
+    """Two-sample Kolmogorov-Smirnov statistic: the largest gap between the two empirical CDFs."""
+    real, synthetic = np.sort(np.asarray(real, float)), np.sort(np.asarray(synthetic, float))
+    grid = np.concatenate([real, synthetic])
+    return float(np.max(np.abs(np.searchsorted(real, grid, side="right") / len(real)
+                               - np.searchsorted(synthetic, grid, side="right") / len(synthetic))))
+
+
+def tvd(real, synthetic):
+    """Total variation distance between two categorical distributions."""
+    p = pd.Series(real).astype(str).value_counts(normalize=True)
+    q = pd.Series(synthetic).astype(str).value_counts(normalize=True)
+    return float(p.subtract(q, fill_value=0).abs().sum() / 2)
+
+
+def fidelity(real, synthetic):
+    """Mean KS over continuous columns and mean TVD over discrete columns (lower is better)."""
+    ks = np.mean([ks_statistic(real[c], synthetic[c]) for c in CONTINUOUS_COLUMNS])
+    tv = np.mean([tvd(real[c], synthetic[c]) for c in DISCRETE_COLUMNS])
+    return ks, tv
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-condition CTGAN models against one conditional model.")
+    parser.add_argument("--epochs", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=500, help="Synthetic rows per condition for fidelity")
+    args = parser.parse_args()
+
+    df = pd.read_csv(DATASET).drop(columns=['Patient_ID'])
+    conditions = list(df['Condition'].unique())
+
+    with tempfile.TemporaryDirectory() as per_dir, tempfile.TemporaryDirectory() as cond_dir:
+        # Same epochs for both: each per-condition model sees only its slice per epoch
+        started = time.perf_counter()
+        train_per_condition(df, 'Condition', categorical_features, per_dir, epochs=args.epochs, workers=1)
+        per_train = time.perf_counter() - started
+
+        started = time.perf_counter()
+        conditional, _ = train_conditional(df, categorical_features, cond_dir, epochs=args.epochs)
+        cond_train = time.perf_counter() - started
+
+        per_files = [os.path.join(per_dir, model_filename(c)) for c in conditions]
+        per_bytes = sum(os.path.getsize(path) for path in per_files)
+        cond_bytes = os.path.getsize(os.path.join(cond_dir, CONDITIONAL_FILE))
+
+        # Load latency after the first load, so import cost is not counted
+        joblib.load(per_files[0])
+        started = time.perf_counter()
+        per_models = {c: joblib.load(path) for c, path in zip(conditions, per_files)}
+        per_load = time.perf_counter() - started
+        started = time.perf_counter()
+        joblib.load(os.path.join(cond_dir, CONDITIONAL_FILE))
+        cond_load = time.perf_counter() - started
+
+        print(f"{'':24}{'per-condition':>16}{'conditional':>16}")
+        print(f"{'training time (s)':24}{per_train:>16.1f}{cond_train:>16.1f}")
+        print(f"{'disk (KB)':24}{per_bytes / 1024:>16.0f}{cond_bytes / 1024:>16.0f}")
+        print(f"{'load all (ms)':24}{per_load * 1000:>16.0f}{cond_load * 1000:>16.0f}")
+        print()
+        print(f"{'condition':24}{'KS per':>8}{'KS cond':>9}{'TVD per':>9}{'TVD cond':>10}{'acceptance':>12}")
+        for condition in conditions:
+            real = df[df['Condition'] == condition]
+            per_ks, per_tv = fidelity(real, per_models[condition].sample(args.rows))
+            synthetic, stats = sample_exact(conditional, args.rows, 'Condition', condition)
+            cond_ks, cond_tv = fidelity(real, synthetic)
+            print(f"{condition:24}{per_ks:>8.3f}{cond_ks:>9.3f}{per_tv:>9.3f}{cond_tv:>10.3f}{stats['acceptance_rate']:>12.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+import torch
+from torch import nn
+from torch.nn import functional
+
+FORMAT = "ctgan-compact"
+FORMAT_VERSION = 1
+COMPACT_SUFFIX = ".npz"
+META_KEY = "__meta__"
+WEIGHT_PREFIX = "generator/"
+
+# CTGAN's decoding constants (ClusterBasedNormalizer.STD_MULTIPLIER and the Gumbel-softmax temperature)
+STD_MULTIPLIER = 4
+GUMBEL_TAU = 0.2
+
+
+def _json_value(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def describe_transformer(model):
+    """Returns the JSON description of a fitted CTGAN's data transformer and condition sampler."""
+    columns = []
+    for info in model._transformer._column_transform_info_list:
+        transform = info.transform
+        dtype = str(model._transformer._column_raw_dtypes[info.column_name])
+        if info.column_type == "continuous":
+            if transform.null_transformer is not None and transform.null_transformer.models_missing_values():
+                raise ValueError(f"Column '{info.column_name}' models missing values, which the compact format does not support")
+            valid = np.asarray(transform.valid_component_indicator, dtype=bool)
+            bgm = transform._bgm_transformer
+            rounding = transform._rounding_digits if transform.learn_rounding_scheme else None
+            columns.append({
+                "name": info.column_name,
+                "type": "continuous",
+                "dtype": dtype,
+                "means": bgm.means_.reshape(-1)[valid].tolist(),
+                "stds": np.sqrt(bgm.covariances_).reshape(-1)[valid].tolist(),
+                "clip": [transform._min_value, transform._max_value] if transform.enforce_min_max_values else None,
+                "rounding": rounding,
+            })
+        else:
+            columns.append({
+                "name": info.column_name,
+                "type": "discrete",
+                "dtype": dtype,
+                "categories": [_json_value(category) for category in transform.dummies],
+            })
+
+    sampler = model._data_sampler
+    category_prob = sampler._discrete_column_category_prob.flatten()
+    return {
+        "columns": columns,
+        "n_categories": int(sampler._n_categories),
+        "cond_st": [int(st) for st in sampler._discrete_column_cond_st],
+        "category_freq": (category_prob[category_prob != 0] / category_prob.sum()).tolist(),
+    }
+
+
+def save_compact(model, path, float16=False):
+    """Writes a CTGAN model as an .npz of generator weights plus a JSON transformer description.
+
+    No Python objects are pickled, so the file loads with allow_pickle=False and does not
+    depend on the ctgan/rdt/sklearn versions that trained it. float16 halves the weights'
+    size; they are restored to float32 on load.
+    """
+    meta = {
+        "format": FORMAT,
+        "version": FORMAT_VERSION,
+        "embedding_dim": int(model._embedding_dim),
+        "generator_dim": [int(dim) for dim in model._generator_dim],
+        "data_dim": int(model._transformer.output_dimensions),
+        "batch_size": int(model._batch_size),
+        # CTGAN samples with the generator still in training mode (batch statistics in
+        # BatchNorm); keeping the flag keeps the sampled distribution unchanged
+        "generator_training": bool(model._generator.training),
+        "float16": bool(float16),
+        "transformer": describe_transformer(model),
+    }
+    arrays = {}
+    for name, tensor in model._generator.state_dict().items():
+        array = tensor.detach().cpu().numpy()
+        if float16 and array.dtype == np.float32:
+            array = array.astype(np.float16)
+        arrays[WEIGHT_PREFIX + name] = array
+    arrays[META_KEY] = np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+class Residual(nn.Module):
+    """Same layers and parameter names as ctgan's Residual, so state dicts load unchanged."""
+
+    def __init__(self, i, o):
+        super().__init__()
+        self.fc = nn.Linear(i, o)
+        self.bn = nn.BatchNorm1d(o)
+        self.relu = nn.ReLU()
+
+    def forward(self, input_):
+        return torch.cat([self.relu(self.bn(self.fc(input_))), input_], dim=1)
+
+
+class Generator(nn.Module):
+    """Mirror of ctgan's Generator; defined here so loading needs torch but not ctgan/rdt/sklearn."""
+
+    def __init__(self, embedding_dim, generator_dim, data_dim):
+        super().__init__()
+        dim = embedding_dim
+        seq = []
+        for item in generator_dim:
+            seq.append(Residual(dim, item))
+            dim += item
+        seq.append(nn.Linear(dim, data_dim))
+        self.seq = nn.Sequential(*seq)
+
+    def forward(self, input_):
+        return self.seq(input_)
+
+
+class CompactSynthesizer:
+    """Samples like a fitted CTGAN, rebuilt from a compact file.
+
+    Supports the parts of the CTGAN API the app uses: sample(n, condition_column,
+    condition_value), set_random_state/random_states and convert_column_name_value_to_id.
+    """
+
+    # Once seeded, sampling draws only from random_states, never the process-wide generators
+    owns_generators = True
+
+    def __init__(self, meta, state_dict):
+        self.meta = meta
+        self.columns = meta["transformer"]["columns"]
+        self._batch_size = meta["batch_size"]
+        self._embedding_dim = meta["embedding_dim"]
+        self._category_freq = np.asarray(meta["transformer"]["category_freq"])
+        self._n_categories = meta["transformer"]["n_categories"]
+        self.random_states = None
+
+        self._generator = Generator(self._embedding_dim + self._n_categories, meta["generator_dim"], meta["data_dim"])
+        self._generator.load_state_dict(state_dict)
+        self._generator.train(meta["generator_training"])
+
+        # (width, activation) spans of the generator output, in column order
+        self._spans = []
+        for column in self.columns:
+            if column["type"] == "continuous":
+                self._spans += [(1, "tanh"), (len(column["means"]), "softmax")]
+            else:
+                self._spans.append((len(column["categories"]), "softmax"))
+
+    def set_random_state(self, random_state):
+        if random_state is None:
+            self.random_states = None
+        else:
+            self.random_states = (np.random.RandomState(seed=random_state), torch.Generator().manual_seed(random_state))
+
+    def convert_column_name_value_to_id(self, column_name, value):
+        discrete_id = 0
+        for column in self.columns:
+            if column["type"] != "discrete":
+                continue
+            if column["name"] == column_name:
+                if value not in column["categories"]:
+                    raise ValueError(f"The value `{value}` doesn't exist in the column `{column_name}`.")
+                return {"discrete_column_id": discrete_id, "value_id": column["categories"].index(value)}
+            discrete_id += 1
+        raise ValueError(f"The column_name `{column_name}` doesn't exist in the data.")
+
+    def _condition_vector(self, column_name, value):
+        info = self.convert_column_name_value_to_id(column_name, value)
+        vec = np.zeros((self._batch_size, self._n_categories), dtype="float32")
+        # Offset into the condition vector (not into the data matrix)
+        vec[:, self.meta["transformer"]["cond_st"][info["discrete_column_id"]] + info["value_id"]] = 1
+        return vec
+
+    def _original_condvec(self, np_random):
+        if self._n_categories == 0:
+            return None
+        choice = np_random.choice if np_random is not None else np.random.choice
+        idx = choice(np.arange(len(self._category_freq)), self._batch_size, p=self._category_freq)
+        cond = np.zeros((self._batch_size, self._n_categories), dtype="float32")
+        cond[np.arange(self._batch_size), idx] = 1
+        return cond
+
+    def _activate(self, data, generator):
+        parts = []
+        st = 0
+        for width, activation in self._spans:
+            logits = data[:, st:st + width]
+            if activation == "tanh":
+                parts.append(torch.tanh(logits))
+            elif generator is None:
+                parts.append(functional.gumbel_softmax(logits, tau=GUMBEL_TAU))
+            else:
+                gumbels = -torch.empty_like(logits).exponential_(generator=generator).log()
+                parts.append(((logits + gumbels) / GUMBEL_TAU).softmax(-1))
+            st += width
+        return torch.cat(parts, dim=1)
+
+    def _decode(self, data):
+        result = {}
+        st = 0
+        for column in self.columns:
+            if column["type"] == "continuous":
+                width = 1 + len(column["means"])
+                normalized = np.clip(data[:, st], -1, 1)
+                component = np.argmax(data[:, st + 1:st + width], axis=1)
+                values = normalized * STD_MULTIPLIER * np.asarray(column["stds"])[component] + np.asarray(column["means"])[component]
+                if column["clip"] is not None:
+                    values = values.clip(*column["clip"])
+                if column["rounding"] is not None:
+                    values = values.round(column["rounding"])
+                elif pd.api.types.is_integer_dtype(np.dtype(column["dtype"])):
+                    values = values.round(0)
+            else:
+                width = len(column["categories"])
+                values = np.asarray(column["categories"], dtype=object)[np.argmax(data[:, st:st + width], axis=1)]
+            result[column["name"]] = values
+            st += width
+        return pd.DataFrame(result).astype({column["name"]: column["dtype"] for column in self.columns})
+
+    @torch.no_grad()
+    def sample(self, n, condition_column=None, condition_value=None):
+        np_random, generator = self.random_states if self.random_states is not None else (None, None)
+        global_condvec = None
+        if condition_column is not None and condition_value is not None:
+            global_condvec = self._condition_vector(condition_column, condition_value)
+
+        data = []
+        for _ in range(n // self._batch_size + 1):
+            mean = torch.zeros(self._batch_size, self._embedding_dim)
+            fakez = torch.normal(mean=mean, std=mean + 1, generator=generator)
+            condvec = global_condvec if global_condvec is not None else self._original_condvec(np_random)
+            if condvec is not None:
+                fakez = torch.cat([fakez, torch.from_numpy(condvec)], dim=1)
+            data.append(self._activate(self._generator(fakez), generator).numpy())
+        return self._decode(np.concatenate(data, axis=0)[:n])
+
+
+def load_compact(path):
+    """Loads a compact model file without unpickling anything."""
+    with np.load(path, allow_pickle=False) as archive:
+        meta = json.loads(archive[META_KEY].tobytes().decode("utf-8"))
+        if meta.get("format") != FORMAT or meta.get("version", 0) > FORMAT_VERSION:
+            raise ValueError(f"{path} is not a supported compact model (format {meta.get('format')} v{meta.get('version')})")
+        state_dict = {
+            name[len(WEIGHT_PREFIX):]: torch.from_numpy(archive[name].astype(np.float32) if archive[name].dtype == np.float16 else archive[name])
+            for name in archive.files if name.startswith(WEIGHT_PREFIX)
+        }
+    return CompactSynthesizer(meta, state_dict)
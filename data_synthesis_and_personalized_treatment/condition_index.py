@@ -0,0 +1,147 @@
+import bisect
+import hashlib
+import os
+import pickle
+import re
+import numpy as np
+from Levenshtein import ratio
+
+INDEX_FILE = "condition_index.pkl"
+
+# Lay terms, abbreviations and clinical synonyms for the conditions we ship models for
+DEFAULT_ALIASES = {
+    "Heart Disease": ["coronary artery disease", "cad", "cardiovascular disease", "heart problem"],
+    "Diabetes": ["diabetes mellitus", "dm", "high blood sugar", "type 2 diabetes"],
+    "Fractured Arm": ["broken arm", "arm fracture"],
+    "Stroke": ["cva", "cerebrovascular accident", "brain attack"],
+    "Cancer": ["tumor", "malignancy", "carcinoma"],
+    "Hypertension": ["high blood pressure", "htn"],
+    "Appendicitis": ["appendix inflammation"],
+    "Fractured Leg": ["broken leg", "leg fracture"],
+    "Heart Attack": ["myocardial infarction", "mi", "cardiac arrest"],
+    "Allergic Reaction": ["allergy", "anaphylaxis"],
+    "Respiratory Infection": ["chest infection", "pneumonia", "bronchitis", "uri"],
+    "Prostate Cancer": ["prostate carcinoma"],
+    "Childbirth": ["labor", "delivery", "pregnancy"],
+    "Kidney Stones": ["renal calculi", "nephrolithiasis", "kidney stone"],
+    "Osteoarthritis": ["degenerative joint disease", "arthritis", "oa"],
+}
+
+# Candidates taken from the trigram index before the exact Levenshtein rerank
+RERANK_CANDIDATES = 50
+
+
+def normalize(text):
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", str(text).lower()).split())
+
+
+def trigrams(term):
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class ConditionIndex:
+    """Fuzzy lookup over condition names and their aliases.
+
+    A trigram inverted index narrows a query to a few candidates in time proportional
+    to the matching postings, not the vocabulary; only those are scored with Levenshtein.
+    A sorted term list answers prefix (autocomplete) queries by binary search.
+    """
+
+    def __init__(self, conditions, aliases=None):
+        aliases = aliases or {}
+        self.conditions = [str(condition) for condition in conditions]
+        self.terms = []       # normalized searchable strings
+        self.term_owner = []  # index into self.conditions for each term
+        for owner, condition in enumerate(self.conditions):
+            for term in dict.fromkeys([normalize(condition)] + [normalize(a) for a in aliases.get(condition, [])]):
+                if term:
+                    self.terms.append(term)
+                    self.term_owner.append(owner)
+        self.term_owner = np.asarray(self.term_owner, dtype=np.int32)
+
+        postings = {}
+        self.term_trigrams = np.empty(len(self.terms), dtype=np.int32)
+        for term_id, term in enumerate(self.terms):
+            grams = trigrams(term)
+            self.term_trigrams[term_id] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(term_id)
+        self.postings = {gram: np.asarray(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+        order = sorted(range(len(self.terms)), key=self.terms.__getitem__)
+        self.sorted_terms = [self.terms[i] for i in order]
+        self.sorted_owner = [int(self.term_owner[i]) for i in order]
+        self.signature = index_signature(self.conditions, aliases)
+
+    def search(self, query, k=5):
+        """Returns up to k (condition, score) pairs, best first; score is a 0-1 similarity."""
+        query = normalize(query)
+        if not query:
+            return []
+        grams = trigrams(query)
+        hits = [self.postings[gram] for gram in grams if gram in self.postings]
+        if not hits:
+            return []
+
+        # Dice coefficient on trigram sets picks the candidates worth an exact comparison
+        shared = np.bincount(np.concatenate(hits), minlength=len(self.terms))
+        candidates = np.flatnonzero(shared)
+        if candidates.size > RERANK_CANDIDATES:
+            dice = shared[candidates] / (len(grams) + self.term_trigrams[candidates])
+            candidates = candidates[np.argpartition(-dice, RERANK_CANDIDATES)[:RERANK_CANDIDATES]]
+
+        best = {}
+        for term_id in candidates:
+            owner = int(self.term_owner[term_id])
+            score = ratio(query, self.terms[term_id])
+            if score > best.get(owner, -1.0):
+                best[owner] = score
+        ranked = sorted(best.items(), key=lambda item: (-item[1], item[0]))[:k]
+        return [(self.conditions[owner], round(score, 3)) for owner, score in ranked]
+
+    def best_match(self, query):
+        results = self.search(query, k=1)
+        return results[0] if results else (None, 0.0)
+
+    def complete(self, prefix, k=10):
+        """Returns up to k conditions with a name or alias starting with prefix."""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        matches = []
+        start = bisect.bisect_left(self.sorted_terms, prefix)
+        for position in range(start, len(self.sorted_terms)):
+            if not self.sorted_terms[position].startswith(prefix) or len(matches) >= k:
+                break
+            condition = self.conditions[self.sorted_owner[position]]
+            if condition not in matches:
+                matches.append(condition)
+        return matches
+
+
+def index_signature(conditions, aliases):
+    payload = repr((sorted(map(str, conditions)), sorted((c, sorted(a)) for c, a in (aliases or {}).items())))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def load_or_build_index(conditions, models_dir, aliases=DEFAULT_ALIASES):
+    """Loads the persisted index for these conditions, rebuilding and saving it if it is missing or stale."""
+    path = os.path.join(models_dir, INDEX_FILE)
+    aliases = {condition: aliases.get(condition, []) for condition in conditions}
+    try:
+        with open(path, "rb") as f:
+            index = pickle.load(f)
+        if index.signature == index_signature(conditions, aliases):
+            return index
+    except (OSError, pickle.UnpicklingError, AttributeError, EOFError, ImportError):
+        pass
+
+    index = ConditionIndex(conditions, aliases)
+    try:
+        with open(path + ".tmp", "wb") as f:
+            pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + ".tmp", path)
+    except OSError:
+        pass  # A read-only deployment still works from the in-memory index
+    return index
@@ -0,0 +1,144 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+
+CONSTRAINTS_FILE = "constraints.json"
+
+# Fixed rules for hospital_data.csv-shaped records (a bound of None is open)
+EHR_RANGES = {
+    "Age": (0, 110),
+    "Cost": (0, None),
+    "Length_of_Stay": (1, 365),
+    "Satisfaction": (1, 5),
+}
+EHR_INTEGERS = ["Age", "Length_of_Stay", "Satisfaction"]
+# Column pairs whose combinations must have been seen in the training data
+EHR_PAIRS = [("Condition", "Procedure")]
+
+
+class ConstraintSet:
+    """Declarative row rules: value ranges, whole numbers, allowed categories and allowed column pairs.
+
+    Every rule is checked on a whole batch at once as a NumPy mask (True = row passes), so
+    the cost per batch does not depend on Python-level loops over rows.
+    """
+
+    def __init__(self, ranges=None, integers=(), categories=None, pairs=None):
+        self.ranges = {column: tuple(bounds) for column, bounds in (ranges or {}).items()}
+        self.integers = list(integers)
+        self.categories = {column: list(values) for column, values in (categories or {}).items()}
+        self.pairs = {tuple(columns): [tuple(pair) for pair in allowed] for columns, allowed in (pairs or {}).items()}
+
+        # Allowed pairs as integer keys over each column's sorted levels
+        self._pair_index = {}
+        for (a, b), allowed in self.pairs.items():
+            levels_a = sorted({x for x, _ in allowed}, key=str)
+            levels_b = sorted({y for _, y in allowed}, key=str)
+            codes_a = pd.Categorical([x for x, _ in allowed], categories=levels_a).codes.astype(np.int64)
+            codes_b = pd.Categorical([y for _, y in allowed], categories=levels_b).codes.astype(np.int64)
+            self._pair_index[(a, b)] = (levels_a, levels_b, np.unique(codes_a * len(levels_b) + codes_b))
+
+    def masks(self, df):
+        """Returns {rule name: boolean array} for the rules whose columns are in df."""
+        masks = {}
+        for column, (low, high) in self.ranges.items():
+            if column in df:
+                values = df[column].to_numpy(dtype=float, na_value=np.nan)
+                valid = ~np.isnan(values)
+                if low is not None:
+                    valid &= values >= low
+                if high is not None:
+                    valid &= values <= high
+                masks[f"{column} range"] = valid
+        for column in self.integers:
+            if column in df:
+                values = df[column].to_numpy(dtype=float, na_value=np.nan)
+                masks[f"{column} integer"] = np.floor(values) == values
+        for column, allowed in self.categories.items():
+            if column in df:
+                masks[f"{column} category"] = df[column].isin(allowed).to_numpy()
+        for (a, b), (levels_a, levels_b, keys) in self._pair_index.items():
+            if a in df and b in df:
+                codes_a = pd.Categorical(df[a], categories=levels_a).codes.astype(np.int64)
+                codes_b = pd.Categorical(df[b], categories=levels_b).codes.astype(np.int64)
+                known = (codes_a >= 0) & (codes_b >= 0)
+                masks[f"{a}/{b} pair"] = known & np.isin(codes_a * len(levels_b) + codes_b, keys)
+        return masks
+
+    def valid_mask(self, df):
+        """Rows that pass every rule."""
+        return _all(self.masks(df), len(df))
+
+    def validity(self, df):
+        """Share of valid rows and the number of rows failing each rule."""
+        masks = self.masks(df)
+        valid = _all(masks, len(df))
+        return {
+            "rows": len(df),
+            "valid": int(valid.sum()),
+            "rate": float(valid.mean()) if len(df) else 1.0,
+            "violations": {rule: int((~mask).sum()) for rule, mask in masks.items()},
+        }
+
+    def to_dict(self):
+        return {
+            "ranges": {column: list(bounds) for column, bounds in self.ranges.items()},
+            "integers": self.integers,
+            "categories": self.categories,
+            "pairs": [{"columns": list(columns), "allowed": [list(pair) for pair in allowed]}
+                      for columns, allowed in self.pairs.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, spec):
+        return cls(spec.get("ranges"), spec.get("integers", ()), spec.get("categories"),
+                   {tuple(p["columns"]): p["allowed"] for p in spec.get("pairs", [])})
+
+
+def _all(masks, rows):
+    valid = np.ones(rows, dtype=bool)
+    for mask in masks.values():
+        valid &= mask
+    return valid
+
+
+def _plain(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def learn_constraints(df, categorical_columns, ranges=EHR_RANGES, integers=EHR_INTEGERS, pairs=EHR_PAIRS):
+    """Builds the constraints for a training table.
+
+    The fixed ranges, integer columns and pair rules apply to the columns df has; the
+    allowed categories and allowed pairs are the ones that occur in df.
+    """
+    categories = {column: sorted((_plain(v) for v in df[column].dropna().unique()), key=str)
+                  for column in categorical_columns if column in df}
+    allowed_pairs = {}
+    for a, b in pairs:
+        if a in df and b in df:
+            seen = df[[a, b]].dropna().drop_duplicates()
+            allowed_pairs[(a, b)] = [(_plain(x), _plain(y)) for x, y in seen.itertuples(index=False)]
+    return ConstraintSet(
+        {column: bounds for column, bounds in ranges.items() if column in df},
+        [column for column in integers if column in df],
+        categories,
+        allowed_pairs,
+    )
+
+
+def save_constraints(constraints, models_dir):
+    path = os.path.join(models_dir, CONSTRAINTS_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(constraints.to_dict(), f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def load_constraints(models_dir):
+    """Returns the constraints saved with the models, or None when there are none."""
+    try:
+        with open(os.path.join(models_dir, CONSTRAINTS_FILE)) as f:
+            return ConstraintSet.from_dict(json.load(f))
+    except (OSError, ValueError):
+        return None
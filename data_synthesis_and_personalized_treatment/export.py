@@ -0,0 +1,91 @@
+import os
+import shutil
+import tempfile
+import weakref
+from data_synthesis_and_personalized_treatment.streaming import FORMATS, ChunkWriter
+
+# Parquet and Arrow IPC keep column types (including categories) and load without parsing
+MIME_TYPES = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.file",
+}
+# Frames larger than this in memory are written to a file for download instead of an in-memory buffer
+FILE_BACKED_BYTES = 64 * 1024 * 1024
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        return pa
+    except ImportError as e:
+        raise RuntimeError("Parquet and Arrow export need pyarrow (pip install pyarrow).") from e
+
+
+def export_bytes(df, fmt):
+    """Serializes df in one of FORMATS straight from its columns, without a CSV text stage."""
+    if fmt == "csv":
+        return df.to_csv(index=False).encode("utf-8")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format '{fmt}'. Expected one of: {', '.join(FORMATS)}")
+
+    pa = _pyarrow()
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        pq.write_table(table, sink, compression="snappy")
+    else:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def read_later(path):
+    """A callable that reads path only when called, for st.download_button's deferred data.
+
+    Passing an open file instead makes Streamlit read all of it into memory on every rerun.
+    """
+    def read():
+        with open(path, "rb") as f:
+            return f.read()
+    return read
+
+
+class ExportDir:
+    """A private temp directory for one session's generated files.
+
+    Files are written under names no other session uses, and the directory is removed
+    when close() is called or the object is garbage collected (e.g. with the session state).
+    """
+
+    def __init__(self, parent=None):
+        self.path = tempfile.mkdtemp(prefix="ehr_export_", dir=parent)
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.path, ignore_errors=True)
+
+    def path_for(self, file_name):
+        return os.path.join(self.path, file_name)
+
+    def clear(self):
+        """Removes the files of earlier generations, whose download buttons are gone."""
+        for entry in os.scandir(self.path):
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path, ignore_errors=True)
+            else:
+                os.remove(entry.path)
+
+    def close(self):
+        self._finalizer()
+
+
+def export_file(df, path, fmt):
+    """Writes df to path in one of FORMATS (atomically, like streamed output)."""
+    writer = ChunkWriter(path, fmt)
+    try:
+        writer.write(df)
+    except BaseException:
+        writer.close(success=False)
+        raise
+    writer.close()
+    return path
+
@@ -0,0 +1,14 @@
+import os
+import joblib
+
+
+def atomic_dump(obj, path):
+    """Writes obj with joblib to a temp file and renames it, so readers never see a half-written model."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        joblib.dump(obj, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
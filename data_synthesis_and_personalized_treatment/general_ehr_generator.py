@@ -1,16 +1,43 @@
 import os
+import shutil
+import uuid
 import streamlit as st
 import pandas as pd
-from Levenshtein import distance  # For Levenshtein distance calculation
-import joblib  # For loading the models
-import pickle  
-from io import BytesIO, StringIO
-from ctgan import CTGAN
+from data_synthesis_and_personalized_treatment.constraints import learn_constraints, load_constraints
+from data_synthesis_and_personalized_treatment.export import FILE_BACKED_BYTES, MIME_TYPES, ExportDir, export_bytes, export_file, read_later
+from data_synthesis_and_personalized_treatment.ingestion import load_dataset, stratified_sample, training_frame
+from data_synthesis_and_personalized_treatment.model_registry import MODELS_DIR, get_registry
+from data_synthesis_and_personalized_treatment.sampling import sample_exact
+from data_synthesis_and_personalized_treatment.streaming import DEFAULT_CHUNK_ROWS, FORMATS, OUTPUT_DIR, stream_samples
+from data_synthesis_and_personalized_treatment.training import train_per_condition, train_single
+
+# Larger requests are generated in chunks and streamed to disk instead of held in memory
+IN_MEMORY_ROWS = 100_000
+# Streamed files larger than this are moved to OUTPUT_DIR rather than offered as a download
+MAX_DOWNLOAD_BYTES = 200 * 1024 * 1024
+
+# Uploads larger than this can be trained on a stratified subsample
+TRAINING_SUBSAMPLE_ROWS = 50_000
+
+# Matches below this similarity are flagged with the other candidates
+LOW_CONFIDENCE_SCORE = 0.6
 
 # Function to automatically detect categorical columns
 def detect_categorical_columns(df):
     return df.select_dtypes(include=['object', 'category']).columns.tolist()
 
+# Function to parse an upload once: reruns after widget changes reuse the parsed frame.
+# Kept in the session state by the upload's id, so reruns get the same object rather than an
+# unpickled copy; only the latest upload is kept, and the frame must be treated as read-only.
+def load_upload(uploaded_file):
+    cached = st.session_state.get("upload")
+    if cached is None or cached[0] != uploaded_file.file_id:
+        # Free the previous upload before parsing the next one
+        st.session_state.upload = None
+        with st.spinner("Loading dataset..."):
+            st.session_state.upload = (uploaded_file.file_id, load_dataset(uploaded_file))
+    return st.session_state.upload[1]
+
 def app():
     # Dropdown to select between "General" or "Specific" synthesizer
     synthesizer_type = st.selectbox(
@@ -18,19 +45,45 @@ def app():
         options=["General Health Record Synthesizer", "Specific Record Synthesizer"]
     )
 
-    # Path to the models directory
-    models_dir = r'data_synthesis_and_personalized_treatment\models'
+    # Path to the models directory (resolved from this file, so it works on any OS and working directory)
+    models_dir = MODELS_DIR
+
+    # Shared index of trained models; loaded models stay in memory across reruns
+    registry = get_registry()
+
+    # Generated files go to this session's own temp directory, removed when the session ends
+    if "export_dir" not in st.session_state:
+        st.session_state.export_dir = ExportDir()
+    export_dir = st.session_state.export_dir
+
+    # Function to offer a generated dataset for download in the chosen format.
+    # Parquet/Arrow are written straight from the columns; large frames are written to a file
+    # in the session's directory that is read only when the user actually clicks download.
+    def offer_download(data, name, label, output_format):
+        file_name = f"{name}.{output_format}"
+        try:
+            if data.memory_usage(deep=True).sum() <= FILE_BACKED_BYTES:
+                st.download_button(label=label, data=export_bytes(data, output_format),
+                                   file_name=file_name, mime=MIME_TYPES[output_format])
+                return
+            path = export_file(data, export_dir.path_for(file_name), output_format)
+        except RuntimeError as e:
+            st.error(str(e))
+            return
+        st.download_button(label=label, data=read_later(path), file_name=file_name, mime=MIME_TYPES[output_format])
+
+    # Function to summarize how many generated rows broke the constraints and which rules they broke
+    def describe_violations(validity_rate, violations):
+        broken = sorted(((count, rule) for rule, count in violations.items() if count), reverse=True)
+        details = ", ".join(f"{rule}: {count:,}" for count, rule in broken[:3])
+        return f"{validity_rate:.1%} of generated rows met the constraints" + (f" (most often broken: {details})" if details else "")
 
     if synthesizer_type == "General Health Record Synthesizer":
-        # Load unique conditions from the pickle file in the models directory
-        conditions_filename = os.path.join(models_dir, 'unique_conditions.pkl')
-        with open(conditions_filename, 'rb') as f:
-            unique_conditions = pickle.load(f)
+        # Unique conditions come from the registry's manifest instead of re-reading the pickle
+        unique_conditions = registry.conditions()
 
-        # Function to find the most similar condition using Levenshtein distance
-        def find_most_similar_condition(user_input, conditions):
-            closest_condition = min(conditions, key=lambda x: distance(user_input.lower(), x.lower()))
-            return closest_condition
+        # Fuzzy lookup index over conditions and their aliases (built once, persisted with the models)
+        condition_index = registry.condition_index()
 
         # Streamlit UI setup
         st.title("General Health Record Synthesizer")
@@ -38,42 +91,118 @@ def app():
 
         # User input for condition and number of records
         user_input = st.text_input("Enter the disease/condition you want to research:")
-        num_records = st.number_input("Enter the number of synthetic records you want to generate:", min_value=1, max_value=1000, value=10)
+        if user_input:
+            completions = condition_index.complete(user_input)
+            if completions:
+                st.caption(f"Matching conditions: {', '.join(completions)}")
+        num_records = st.number_input("Enter the number of synthetic records you want to generate:", min_value=1, value=10, step=1000)
+
+        # A single conditional model, when trained, can serve every condition
+        use_conditional = registry.has_conditional_model() and st.radio(
+            "Model", options=("Per-condition models", "Single conditional model")
+        ) == "Single conditional model"
+
+        output_format = st.selectbox("Output format", FORMATS, help="Parquet and Arrow keep column types and load much faster than CSV.")
+
+        # Ranges, categories and Procedure/Condition pairs saved with the models by train_ehr_generator
+        constraints = load_constraints(models_dir)
+        if constraints is not None and not st.checkbox(
+            "Enforce clinical constraints", value=True,
+            help="Rows with impossible values (e.g. negative cost, satisfaction outside 1-5, or a procedure "
+                 "never seen with the condition) are dropped and resampled."
+        ):
+            constraints = None
+
+        # Settings for large requests, which are streamed to a file chunk by chunk
+        if num_records > IN_MEMORY_ROWS:
+            col1, col2 = st.columns(2)
+            chunk_rows = col1.number_input("Rows per chunk", min_value=1000, value=DEFAULT_CHUNK_ROWS, step=10000)
+            seed = col2.number_input("Random seed", min_value=0, value=0, step=1)
+
+        # Function to generate a large dataset in fixed-size chunks straight to disk
+        def stream_to_disk(model, condition):
+            file_name = f"synthetic_data_{condition}_{num_records}_{seed}.{output_format}"
+            path = export_dir.path_for(file_name)
+            progress_bar = st.progress(0.0)
+            status = st.empty()
+
+            def report(written, total, rows_per_sec):
+                progress_bar.progress(written / total)
+                status.write(f"{written:,} / {total:,} rows ({rows_per_sec:,.0f} rows/sec)")
+
+            try:
+                stats = stream_samples(model, num_records, path, output_format, chunk_rows, seed,
+                                       'Condition', condition, progress=report, constraints=constraints)
+            except (ValueError, RuntimeError) as e:
+                st.error(f"Could not generate records for '{condition}': {e}")
+                return
+            summary = (f"{stats['rows']:,} rows in {stats['chunks']} chunks "
+                       f"({stats['bytes'] / (1024 * 1024):.1f} MB, {stats['rows_per_sec']:,.0f} rows/sec)")
+
+            # Small enough files are downloaded from the session's directory; the file is read only when the button is clicked
+            if stats['bytes'] <= MAX_DOWNLOAD_BYTES:
+                st.success(f"Generated {summary}")
+                st.download_button(
+                    label="Download Synthetic Data",
+                    data=read_later(path),
+                    file_name=file_name,
+                    mime=MIME_TYPES[output_format]
+                )
+                return
+
+            # Larger files are kept on the server under a name no other request uses
+            os.makedirs(OUTPUT_DIR, exist_ok=True)
+            kept_path = os.path.join(OUTPUT_DIR, f"{os.path.splitext(file_name)[0]}_{uuid.uuid4().hex[:8]}.{output_format}")
+            shutil.move(path, kept_path)
+            st.success(f"Wrote {summary} to {kept_path}")
 
         # Button to submit and generate the data
         if st.button("Generate Data"):
+            # Files of the previous generation can no longer be downloaded
+            export_dir.clear()
             if user_input and num_records:
-                # Find the most similar condition
-                closest_condition = find_most_similar_condition(user_input, unique_conditions)
-                st.write(f"Most similar condition found: **{closest_condition}**")
-
-                # Load the CTGAN model for the closest condition
-                model_filename = os.path.join(models_dir, f'ctgan_model_{closest_condition}.pkl')
-                model = joblib.load(model_filename)
+                # Find the most similar conditions, best first
+                matches = condition_index.search(user_input, k=5)
+                if not matches:
+                    st.error(f"No condition resembles '{user_input}'. Available conditions: {', '.join(unique_conditions)}")
+                    return
+                closest_condition, score = matches[0]
+                st.write(f"Most similar condition found: **{closest_condition}** (similarity {score:.0%})")
+                if score < LOW_CONFIDENCE_SCORE and len(matches) > 1:
+                    others = ", ".join(f"{condition} ({match:.0%})" for condition, match in matches[1:])
+                    st.warning(f"This is a weak match. Other candidates: {others}")
+
+                # Get the CTGAN model for the closest condition (deserialized only on first use)
+                model = registry.get_conditional_model() if use_conditional else registry.get_model(closest_condition)
                 st.write(f"Model for condition '{closest_condition}' loaded successfully.")
 
-                # Generate synthetic data
-                synthetic_data = model.sample(num_records)
-
-                # Filter synthetic data for the closest condition
-                filtered_synthetic_data = synthetic_data[synthetic_data['Condition'] == closest_condition]
+                if num_records > IN_MEMORY_ROWS:
+                    stream_to_disk(model, closest_condition)
+                    return
+
+                # Generate exactly num_records rows of the closest condition
+                try:
+                    filtered_synthetic_data, stats = sample_exact(model, num_records, 'Condition', closest_condition,
+                                                                  constraints=constraints)
+                except ValueError as e:
+                    st.error(f"Could not generate records for '{closest_condition}': {e}")
+                    return
+                st.caption(
+                    f"Sampled {stats['sampled']} rows in {stats['passes']} pass(es), "
+                    f"{stats['acceptance_rate']:.1%} matched '{closest_condition}'"
+                    + (" and the constraints" if constraints is not None else "")
+                    + (" (conditional sampling)" if stats['conditional'] else "")
+                )
+                if constraints is not None:
+                    st.caption(describe_violations(stats['validity_rate'], stats['violations']))
 
                 # Show a preview of the generated synthetic data
                 st.write("Preview of the generated synthetic data:")
                 st.dataframe(filtered_synthetic_data.head())  # Show only the first few rows
 
-                # Save the filtered data to a CSV file in memory for download
-                buffer = BytesIO()
-                filtered_synthetic_data.to_csv(buffer, index=False)
-                buffer.seek(0)
-
-                # Download button for the user to download the synthetic data as a CSV
-                st.download_button(
-                    label="Download Synthetic Data",
-                    data=buffer,
-                    file_name=f"synthetic_data_{closest_condition}.csv",
-                    mime="text/csv"
-                )
+                # Download button for the user to download the synthetic data
+                offer_download(filtered_synthetic_data, f"synthetic_data_{closest_condition}",
+                               "Download Synthetic Data", output_format)
             else:
                 st.write("Please enter a valid condition and number of records.")
 
@@ -84,7 +213,16 @@ def app():
         uploaded_file = st.file_uploader("Upload your dataset (CSV)", type="csv")
         
         if uploaded_file is not None:
-            df = pd.read_csv(uploaded_file)
+            # Parsed in chunks into compact dtypes (narrow numbers, categories), so large extracts fit in memory
+            try:
+                df, _, memory = load_upload(uploaded_file)
+            except Exception as e:
+                st.error(f"Error reading the CSV file: {e}")
+                st.stop()
+            st.caption(
+                f"Loaded {memory['rows']:,} rows using {memory['bytes'] / 2**20:.1f} MB"
+                + (f" (about {memory['default_bytes'] / 2**20:.1f} MB with default types)" if 'default_bytes' in memory else "")
+            )
             st.write("Dataset preview:")
             st.write(df.head())
 
@@ -111,11 +249,40 @@ def app():
                 help="If selected, CTGAN will train a separate model for each unique value in this column."
             )
 
+            # Large uploads can be trained on a smaller sample that keeps each condition's share of rows
+            if len(df) > TRAINING_SUBSAMPLE_ROWS and st.checkbox(
+                f"Train on a stratified subsample of {TRAINING_SUBSAMPLE_ROWS:,} rows",
+                value=True,
+                help="Rows are drawn per value of the selected condition column (or at random without one)."
+            ):
+                df = stratified_sample(df, condition_column, TRAINING_SUBSAMPLE_ROWS)
+
+            # CTGAN casts samples to the training dtypes; train on full-width numbers
+            df = training_frame(df)
+
             # Get the number of synthetic rows to generate
             num_rows = st.number_input("Number of synthetic data rows to generate", min_value=1, value=100, step=1)
+            output_format = st.selectbox("Output format", FORMATS, help="Parquet and Arrow keep column types and load much faster than CSV.")
+
+            # Categories and pairs learned from the upload, plus the EHR value ranges for columns it shares
+            constraints = learn_constraints(df, categorical_features) if st.checkbox(
+                "Enforce constraints learned from this dataset", value=True,
+                help="Generated rows must use categories (and Condition/Procedure pairs) seen in the data and "
+                     "plausible ranges for Age, Cost, Length_of_Stay and Satisfaction."
+            ) else None
+
+            # Models are reused when the same data, columns and settings were trained before
+            force_retrain = st.checkbox("Retrain even if an up-to-date model exists")
+            warm_start = st.checkbox(
+                "Fine-tune existing condition models on new rows only",
+                help="Models trained on an earlier version of this data are updated for a few epochs "
+                     "instead of being retrained from scratch."
+            )
 
             # Start synthetic data generation when button is clicked
             if st.button("Generate Synthetic Data"):
+                # Files of the previous generation can no longer be downloaded
+                export_dir.clear()
                 st.write("Training CTGAN model...")
 
                 # Path to the models directory
@@ -125,71 +292,58 @@ def app():
                 if condition_column:
                     unique_conditions = df[condition_column].unique()
 
-                    # Initialize a dictionary to store synthetic data for each condition
-                    synthetic_data_dict = {}
+                    # Train a model for each unique condition, several conditions at once
+                    progress_bar = st.progress(0.0)
+
+                    def report(result, done, total):
+                        progress_bar.progress(done / total)
+                        action = "Reused existing" if result['reused'] else "Fine-tuned" if result['updated'] else "Trained"
+                        st.write(f"{action} CTGAN model for condition: {result['condition']} ({result['seconds']:.1f}s)")
+
+                    results = train_per_condition(
+                        df, condition_column, categorical_features, models_dir,
+                        epochs=5, sample_rows=num_rows, progress=report, force=force_retrain,
+                        warm_start=warm_start, constraints=constraints
+                    )
+
+                    transformer = next((r['transformer'] for r in results.values() if r['transformer']), None)
+                    if transformer is not None:
+                        source = "Reused the cached" if transformer['cached'] else "Fitted and cached the"
+                        st.write(f"{source} column transforms for this dataset ({transformer['seconds']:.2f}s)")
 
-                    # Train a model for each unique condition
+                    # Show the synthetic data in the original condition order
                     for condition in unique_conditions:
-                        st.write(f"Training CTGAN model for condition: {condition}")
-                        
-                        # Filter the data for the current condition
-                        condition_df = df[df[condition_column] == condition]
-                        
-                        # Train the CTGAN model
-                        model = CTGAN()
-                        model.fit(condition_df, categorical_features, epochs=5)
-                        
-                        # Save the trained model for the current condition in the models directory
-                        model_filename = os.path.join(models_dir, f'ctgan_model_{condition}.pkl')
-                        joblib.dump(model, model_filename)
-                        
-                        # Generate synthetic data for the current condition
-                        synthetic_data = model.sample(num_rows)
-                        synthetic_data_dict[condition] = synthetic_data
-                        
+                        synthetic_data = results[condition]["sample"]
+
                         # Display preview for each condition
                         st.write(f"Synthetic Data Preview for condition: {condition}")
                         st.write(synthetic_data.head())
-
-                        # Convert synthetic data to CSV format for download
-                        csv_buffer = StringIO()
-                        synthetic_data.to_csv(csv_buffer, index=False)
-                        csv_data = csv_buffer.getvalue()
+                        if constraints is not None:
+                            validity = constraints.validity(synthetic_data)
+                            if validity['rate'] < 1:
+                                st.warning(describe_violations(validity['rate'], validity['violations']))
 
                         # Provide a download button for each condition
-                        st.download_button(
-                            label=f"Download synthetic data for condition: {condition}",
-                            data=csv_data,
-                            file_name=f'synthetic_data_{condition}.csv',
-                            mime='text/csv'
-                        )
+                        offer_download(synthetic_data, f"synthetic_data_{condition}",
+                                       f"Download synthetic data for condition: {condition}", output_format)
                 else:
-                    # No conditional column: Train a single CTGAN model for the entire dataset
-                    model = CTGAN()
-                    model.fit(df, categorical_features, epochs=5)
-
-                    # Save the trained model
-                    model_filename = os.path.join(models_dir, 'ctgan_model.pkl')
-                    joblib.dump(model, model_filename)
-                    st.write("CTGAN model training completed.")
+                    # No conditional column: Train (or reuse) a single CTGAN model for the entire dataset
+                    model, reused = train_single(df, categorical_features, models_dir, epochs=5, force=force_retrain)
+                    st.write("Reused the CTGAN model trained on this data." if reused else "CTGAN model training completed.")
 
                     # Generate synthetic data
                     st.write(f"Generating {num_rows} synthetic rows...")
-                    synthetic_data = model.sample(num_rows)
+                    try:
+                        synthetic_data, stats = sample_exact(model, num_rows, constraints=constraints)
+                    except ValueError as e:
+                        st.error(f"Could not generate records: {e}")
+                        return
+                    if constraints is not None:
+                        st.caption(describe_violations(stats['validity_rate'], stats['violations']))
 
                     # Display synthetic data
                     st.write("Synthetic Data Preview:")
                     st.write(synthetic_data.head())
 
-                    # Convert synthetic data to CSV format for download
-                    csv_buffer = StringIO()
-                    synthetic_data.to_csv(csv_buffer, index=False)
-                    csv_data = csv_buffer.getvalue()
-
                     # Provide a download button
-                    st.download_button(
-                        label="Download synthetic data as CSV",
-                        data=csv_data,
-                        file_name='synthetic_data.csv',
-                        mime='text/csv'
-                    )
+                    offer_download(synthetic_data, "synthetic_data", "Download synthetic data", output_format)
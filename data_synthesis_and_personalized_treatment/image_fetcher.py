@@ -0,0 +1,287 @@
+import hashlib
+import ipaddress
+import json
+import os
+import socket
+import threading
+import time
+from contextlib import suppress
+from urllib.parse import urlparse
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# (connect, read) timeouts in seconds; the read timeout applies to each socket read
+REQUEST_TIMEOUT = (3.05, 5)
+# Deadline for the whole fetch, retries included; a fetch ends within this plus at most one read timeout
+TOTAL_TIMEOUT = 12
+# One more attempt after a connection error or one of these statuses, if the deadline allows
+RETRIES = 1
+RETRY_STATUSES = (502, 503, 504)
+RETRY_BACKOFF = 0.3
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+# Cached images younger than this are reused without asking the server again
+FRESH_SECONDS = 300
+# Disk cache size; the least recently used images are removed beyond this
+MAX_CACHE_BYTES = 100 * 1024 * 1024
+
+# URLs come from users, so only hosts on the public internet may be fetched (no loopback,
+# private, link-local or cloud metadata addresses); tests serving images locally turn this on
+ALLOW_PRIVATE_ADDRESSES = False
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "image_cache")
+
+# Magic numbers of the image formats the vision model accepts
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+class ImageFetchError(Exception):
+    pass
+
+
+def _check_address(address):
+    """Raises ImageFetchError unless address (an IP string) is a public internet address."""
+    if ALLOW_PRIVATE_ADDRESSES:
+        return
+    ip = ipaddress.ip_address(address.split("%")[0])  # IPv6 link-local addresses carry a %scope
+    if not ip.is_global:
+        raise ImageFetchError("The image URL points to a private or local network address.")
+
+
+def _check_host(host, port):
+    """Resolves host and rejects it if any of its addresses is not public, before connecting."""
+    try:
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except socket.gaierror as e:
+        raise ImageFetchError(f"Could not resolve the image host '{host}'.") from e
+    for *_, sockaddr in infos:
+        _check_address(sockaddr[0])
+
+
+class _PublicOnlyConnection:
+    """Checks the address actually connected to, before any request is sent.
+
+    Covers what resolving the URL's host up front cannot: redirects to other hosts and
+    DNS answers that change between the check and the connection.
+    """
+
+    def _new_conn(self):
+        sock = super()._new_conn()
+        try:
+            _check_address(sock.getpeername()[0])
+        except ImageFetchError:
+            sock.close()
+            raise
+        return sock
+
+
+class _PublicHTTPConnection(_PublicOnlyConnection, HTTPConnection):
+    pass
+
+
+class _PublicHTTPSConnection(_PublicOnlyConnection, HTTPSConnection):
+    pass
+
+
+class _PublicHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _PublicHTTPConnection
+
+
+class _PublicHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _PublicHTTPSConnection
+
+
+class _PublicOnlyAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _PublicHTTPConnectionPool,
+                                                   "https": _PublicHTTPSConnectionPool}
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Returns the shared HTTP session so connections to image hosts are pooled across turns."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            # Retries are done by _get, within the fetch's deadline
+            adapter = _PublicOnlyAdapter(pool_connections=8, pool_maxsize=8)
+            _session = requests.Session()
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+            _session.headers["User-Agent"] = "medical-multimodal-genai/1.0"
+        return _session
+
+
+def sniff_image_type(data):
+    """Returns the image MIME type from the file's leading bytes, or None if it is not a supported image."""
+    for signature, mime_type in IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return mime_type
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def _cache_paths(url, cache_dir):
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, f"{key}.img"), os.path.join(cache_dir, f"{key}.json")
+
+
+def _read_cache(url, cache_dir):
+    data_path, meta_path = _cache_paths(url, cache_dir)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        with open(data_path, "rb") as f:
+            data = f.read()
+    except (OSError, ValueError):
+        return None, None
+    with suppress(OSError):
+        os.utime(data_path)  # Marks it recently used for pruning
+    return data, meta
+
+
+def _prune(cache_dir, max_bytes=MAX_CACHE_BYTES):
+    """Removes the least recently used images until the cache fits in max_bytes."""
+    entries = sorted((entry for entry in os.scandir(cache_dir) if entry.name.endswith(".img")),
+                     key=lambda entry: entry.stat().st_mtime, reverse=True)
+    total = 0
+    for entry in entries:
+        total += entry.stat().st_size
+        if total > max_bytes:
+            with suppress(OSError):
+                os.remove(entry.path)
+                os.remove(entry.path[:-len(".img")] + ".json")
+
+
+def _write_cache(url, cache_dir, data, meta):
+    os.makedirs(cache_dir, exist_ok=True)
+    data_path, meta_path = _cache_paths(url, cache_dir)
+    if data is not None:
+        with open(data_path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(data_path + ".tmp", data_path)
+    with open(meta_path + ".tmp", "w") as f:
+        json.dump(meta, f)
+    os.replace(meta_path + ".tmp", meta_path)
+    if data is not None:
+        _prune(cache_dir)
+
+
+def _get(url, headers, deadline):
+    """GET with streaming, retried once on connection errors and 502/503/504, never past the deadline."""
+    for attempt in range(RETRIES + 1):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise ImageFetchError("Image download took too long.")
+        timeout = (min(REQUEST_TIMEOUT[0], remaining), min(REQUEST_TIMEOUT[1], remaining))
+        try:
+            response = get_session().get(url, headers=headers, stream=True, timeout=timeout)
+        except requests.exceptions.ConnectionError:
+            if attempt == RETRIES:
+                raise
+        else:
+            if response.status_code not in RETRY_STATUSES or attempt == RETRIES:
+                return response
+            response.close()
+        time.sleep(max(0, min(RETRY_BACKOFF, deadline - time.monotonic())))
+
+
+def _download(response, max_bytes, deadline):
+    declared = response.headers.get("Content-Length")
+    if declared and declared.isdigit() and int(declared) > max_bytes:
+        raise ImageFetchError(f"Image is larger than {max_bytes / (1024 * 1024):g} MB.")
+
+    # read1 returns after a single socket read, so a host sending a few bytes at a time is
+    # still checked against the deadline (iter_content waits for a full chunk)
+    read1 = getattr(response.raw, "read1", None)
+    stream = (iter(lambda: read1(64 * 1024, decode_content=True), b"") if read1 is not None
+              else response.iter_content(chunk_size=64 * 1024))
+    chunks = []
+    size = 0
+    try:
+        for chunk in stream:
+            size += len(chunk)
+            if size > max_bytes:
+                raise ImageFetchError(f"Image is larger than {max_bytes / (1024 * 1024):g} MB.")
+            if time.monotonic() > deadline:
+                raise ImageFetchError("Image download took too long.")
+            chunks.append(chunk)
+    except urllib3.exceptions.HTTPError as e:
+        raise ImageFetchError(f"Could not download the image: {e}") from e
+    return b"".join(chunks)
+
+
+def fetch_image(url, cache_dir=CACHE_DIR, max_bytes=MAX_IMAGE_BYTES):
+    """Downloads an image URL with bounded time and size, using an ETag-aware disk cache.
+
+    The whole fetch, a retry included, shares one TOTAL_TIMEOUT deadline. Only http(s)
+    URLs of public hosts are fetched (see ALLOW_PRIVATE_ADDRESSES). Returns
+    (image_bytes, mime_type). Raises ImageFetchError with a user-facing message when the
+    URL is not a reachable, supported image.
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        raise ImageFetchError("Only http(s) image URLs are supported.")
+
+    cached, meta = _read_cache(url, cache_dir)
+    if cached is not None and time.time() - meta.get("checked_at", 0) < FRESH_SECONDS:
+        return cached, meta["content_type"]
+
+    try:
+        port = parsed.port or (443 if parsed.scheme == "https" else 80)
+    except ValueError as e:
+        raise ImageFetchError("The image URL has an invalid port.") from e
+    _check_host(parsed.hostname, port)
+
+    deadline = time.monotonic() + TOTAL_TIMEOUT
+    headers = {}
+    if cached is not None:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    try:
+        with _get(url, headers, deadline) as response:
+            if response.status_code == 304 and cached is not None:
+                meta["checked_at"] = time.time()
+                _write_cache(url, cache_dir, None, meta)
+                return cached, meta["content_type"]
+            if response.status_code != 200:
+                raise ImageFetchError(f"The image URL returned HTTP {response.status_code}.")
+
+            declared_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+            if declared_type and not declared_type.startswith("image/") and declared_type != "application/octet-stream":
+                raise ImageFetchError(f"The URL does not point to an image ({declared_type}).")
+
+            data = _download(response, max_bytes, deadline)
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+    except requests.exceptions.RequestException as e:
+        raise ImageFetchError(f"Could not download the image: {e}") from e
+
+    # Trust the bytes, not the header
+    content_type = sniff_image_type(data)
+    if content_type is None:
+        raise ImageFetchError("The downloaded file is not a JPEG, PNG, GIF or WEBP image.")
+
+    _write_cache(url, cache_dir, data, {
+        "url": url,
+        "etag": etag,
+        "last_modified": last_modified,
+        "content_type": content_type,
+        "checked_at": time.time(),
+    })
+    return data, content_type
@@ -0,0 +1,41 @@
+import base64
+from io import BytesIO
+from PIL import Image, ImageOps
+from langchain_core.messages import HumanMessage
+
+# Vision models downsample large images anyway; sending more pixels only costs upload time
+MAX_IMAGE_SIDE = 1024
+JPEG_QUALITY = 85
+
+
+def prepare_image(image_bytes, max_side=MAX_IMAGE_SIDE, quality=JPEG_QUALITY):
+    """Downscales an image so its longest side is at most max_side and recompresses it as JPEG."""
+    image = Image.open(BytesIO(image_bytes))
+    if image.format == "JPEG" and max(image.size) <= max_side:
+        return image_bytes  # Already small enough; re-encoding would only lose quality
+
+    image = ImageOps.exif_transpose(image)  # Keep phone photos upright once EXIF is stripped
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def image_data_url(image_bytes):
+    """Returns a base64 data URL for the prepared (downscaled JPEG) version of the image."""
+    encoded = base64.b64encode(prepare_image(image_bytes)).decode("utf-8")
+    return f"data:image/jpeg;base64,{encoded}"
+
+
+def image_message(text, image_url):
+    """Builds a multimodal human message with a text part and an image part.
+
+    image_url may be an http(s) URL or a data URL from image_data_url.
+    """
+    return HumanMessage(content=[
+        {"type": "text", "text": text},
+        {"type": "image_url", "image_url": {"url": image_url}},
+    ])
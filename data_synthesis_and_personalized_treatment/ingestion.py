@@ -0,0 +1,194 @@
+import numpy as np
+import pandas as pd
+
+# Rows read up front to decide each column's type
+SCHEMA_SAMPLE_ROWS = 10_000
+# Rows parsed and compacted at a time; bounds the parser's peak memory independently of the file size
+CHUNK_ROWS = 100_000
+# Text columns with at most this share of distinct values in the sample are stored as categories
+MAX_CATEGORY_RATIO = 0.5
+
+
+def _rewind(source):
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+
+def infer_schema(source, sample_rows=SCHEMA_SAMPLE_ROWS):
+    """Reads the first rows of a CSV and classifies each column as numeric, category or text."""
+    _rewind(source)
+    sample = pd.read_csv(source, nrows=sample_rows)
+    _rewind(source)
+    schema = {}
+    for column in sample.columns:
+        values = sample[column]
+        if pd.api.types.is_bool_dtype(values):
+            schema[column] = "category"
+        elif pd.api.types.is_numeric_dtype(values):
+            schema[column] = "numeric"
+        elif values.nunique() <= max(1, MAX_CATEGORY_RATIO * values.notna().sum()):
+            schema[column] = "category"
+        else:
+            schema[column] = "text"
+    return schema, sample
+
+
+def compact_numeric(values):
+    """Smallest lossless dtype for a numeric column: an integer type when every value is whole, else float32 or float64."""
+    array = values.to_numpy(dtype="float64", na_value=np.nan)
+    if len(array) and not np.isnan(array).any() and np.array_equal(array, np.round(array)):
+        return pd.to_numeric(pd.Series(array.astype("int64"), index=values.index, name=values.name), downcast="integer")
+    as_float32 = array.astype("float32")
+    if np.array_equal(as_float32.astype("float64"), array, equal_nan=True):
+        return pd.Series(as_float32, index=values.index, name=values.name)
+    return pd.Series(array, index=values.index, name=values.name)
+
+
+def _compact_chunk(chunk, schema):
+    for column, kind in schema.items():
+        if kind == "numeric":
+            chunk[column] = compact_numeric(chunk[column])
+        elif kind == "category":
+            chunk[column] = chunk[column].astype("category")
+    return chunk
+
+
+def _iter_arrow_chunks(source, schema, chunk_rows):
+    import pyarrow as pa
+    from pyarrow import csv
+
+    # Fixed column types: Arrow otherwise infers them from the first block only
+    column_types = {column: pa.float64() if kind == "numeric" else pa.string() for column, kind in schema.items()}
+    reader = csv.open_csv(source, read_options=csv.ReadOptions(block_size=1 << 24),
+                          convert_options=csv.ConvertOptions(column_types=column_types, strings_can_be_null=True))
+    pending = []
+    rows = 0
+    for batch in reader:
+        pending.append(batch)
+        rows += batch.num_rows
+        if rows >= chunk_rows:
+            yield pa.Table.from_batches(pending).to_pandas()
+            pending, rows = [], 0
+    if pending:
+        yield pa.Table.from_batches(pending).to_pandas()
+
+
+def _iter_pandas_chunks(source, schema, chunk_rows):
+    dtypes = {column: "float64" if kind == "numeric" else "str" for column, kind in schema.items()}
+    yield from pd.read_csv(source, dtype=dtypes, chunksize=chunk_rows)
+
+
+def iter_chunks(source, schema, chunk_rows=CHUNK_ROWS):
+    """Yields the CSV in compacted DataFrame chunks, parsed with Arrow when pyarrow is installed."""
+    _rewind(source)
+    try:
+        import pyarrow.csv  # noqa: F401
+        chunks = _iter_arrow_chunks(source, schema, chunk_rows)
+    except ImportError:
+        chunks = _iter_pandas_chunks(source, schema, chunk_rows)
+    for chunk in chunks:
+        yield _compact_chunk(chunk, schema)
+
+
+def non_numeric_columns(source, schema, chunk_rows=CHUNK_ROWS):
+    """Columns classified numeric from the sample that hold a non-numeric value further down the file."""
+    columns = [column for column, kind in schema.items() if kind == "numeric"]
+    if not columns:
+        return []
+    _rewind(source)
+    found = set()
+    for chunk in pd.read_csv(source, usecols=columns, dtype=str, chunksize=chunk_rows):
+        for column in columns:
+            values = chunk[column]
+            if (pd.to_numeric(values, errors="coerce").isna() & values.notna()).any():
+                found.add(column)
+    _rewind(source)
+    return [column for column in columns if column in found]
+
+
+def _combine(chunks, schema):
+    if len(chunks) == 1:
+        return chunks[0]
+    combined = {}
+    for column in chunks[0].columns:
+        parts = [chunk[column] for chunk in chunks]
+        if schema[column] == "category":
+            # Chunks have different category sets; concat would fall back to object
+            combined[column] = pd.Series(pd.api.types.union_categoricals(parts), name=column)
+        elif len({pd.api.types.is_integer_dtype(part) for part in parts}) > 1:
+            # Whole numbers in some chunks only: concat could cast large integers to float32
+            combined[column] = compact_numeric(pd.concat([part.astype("float64") for part in parts], ignore_index=True))
+        else:
+            combined[column] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(combined)
+
+
+def memory_report(df, sample=None):
+    """Bytes used by df per column, plus an estimate of what a default pd.read_csv would have used."""
+    per_column = df.memory_usage(deep=True, index=False)
+    report = {"rows": len(df), "bytes": int(per_column.sum()), "columns": {c: int(b) for c, b in per_column.items()}}
+    if sample is not None and len(sample):
+        per_row = sample.memory_usage(deep=True, index=False).sum() / len(sample)
+        report["default_bytes"] = int(per_row * len(df))
+    return report
+
+
+def load_dataset(source, chunk_rows=CHUNK_ROWS, sample_rows=SCHEMA_SAMPLE_ROWS):
+    """Loads a CSV path or file object chunk by chunk into compact dtypes.
+
+    Numeric columns are narrowed to the smallest lossless type, repetitive text columns
+    become categories. A column that looked numeric in the sample but holds other values
+    later on is loaded as text, like pd.read_csv would. Returns (df, schema, memory_report).
+    """
+    schema, sample = infer_schema(source, sample_rows)
+    try:
+        chunks = list(iter_chunks(source, schema, chunk_rows))
+    except ValueError:
+        # Arrow and pandas both raise a ValueError when a fixed numeric column gets a non-number
+        mismatched = non_numeric_columns(source, schema, chunk_rows)
+        if not mismatched:
+            raise
+        schema = {column: "text" if column in mismatched else kind for column, kind in schema.items()}
+        chunks = list(iter_chunks(source, schema, chunk_rows))
+    df = _combine(chunks, schema) if chunks else _compact_chunk(sample.iloc[:0].copy(), schema)
+    return df, schema, memory_report(df, sample)
+
+
+def training_frame(df):
+    """Widens compacted numeric columns back to int64/float64 for CTGAN.
+
+    CTGAN casts its samples to the training dtypes, and a narrow integer type would
+    overflow on values beyond the training range. Categories are kept as they are.
+    """
+    widened = {}
+    for column in df.columns:
+        if pd.api.types.is_integer_dtype(df[column]) and df[column].dtype != "int64":
+            widened[column] = "int64"
+        elif pd.api.types.is_float_dtype(df[column]) and df[column].dtype != "float64":
+            widened[column] = "float64"
+    return df.astype(widened) if widened else df
+
+
+def stratified_sample(df, column, n, seed=0):
+    """Draws about n rows, keeping every value of column at its share of the rows (at least one row each).
+
+    Without a column, draws a plain random sample.
+    """
+    if n >= len(df):
+        return df
+    rng = np.random.default_rng(seed)
+    if column is None:
+        return df.iloc[np.sort(rng.choice(len(df), n, replace=False))].reset_index(drop=True)
+
+    codes, uniques = pd.factorize(df[column], use_na_sentinel=False)
+    counts = np.bincount(codes, minlength=len(uniques))
+    quota = np.maximum(1, np.round(counts * n / len(df))).astype(int)
+    # Rank rows within their group in a random order and keep the first quota of each
+    order = rng.permutation(len(df))
+    shuffled = codes[order]
+    by_group = np.argsort(shuffled, kind="stable")
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    rank = np.empty(len(df), dtype=np.int64)
+    rank[by_group] = np.arange(len(df)) - np.repeat(starts, counts)
+    keep = order[rank < quota[shuffled]]
+    return df.iloc[np.sort(keep)].reset_index(drop=True)
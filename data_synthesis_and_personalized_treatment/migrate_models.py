@@ -0,0 +1,88 @@
+# Converts the pickled CTGAN models in models/ to the compact, pickle-free .npz format.
+# Run from the project root: python -m data_synthesis_and_personalized_treatment.migrate_models
+import argparse
+import os
+import time
+import joblib
+import pandas as pd
+from data_synthesis_and_personalized_treatment.compact_model import COMPACT_SUFFIX, load_compact, save_compact
+from data_synthesis_and_personalized_treatment.model_registry import MODEL_SUFFIX, MODELS_DIR, _is_model_file
+
+# Rows compared between the pickled and the compact model for the same seed
+VERIFY_ROWS = 200
+VERIFY_SEED = 0
+
+
+def same_samples(original, compact, rows=VERIFY_ROWS, seed=VERIFY_SEED):
+    """Whether both models draw identical rows for the same random seed."""
+    original.set_random_state(seed)
+    compact.set_random_state(seed)
+    try:
+        expected = original.sample(rows)
+        actual = compact.sample(rows)
+    finally:
+        original.set_random_state(None)
+        compact.set_random_state(None)
+    try:
+        pd.testing.assert_frame_equal(expected.reset_index(drop=True), actual, check_dtype=False, atol=1e-4)
+        return True
+    except AssertionError:
+        return False
+
+
+def migrate(path, float16=False, verify=True):
+    """Writes the compact form of one pickled model next to it and returns a report."""
+    started = time.perf_counter()
+    model = joblib.load(path)
+    pickle_load = time.perf_counter() - started
+
+    compact_path = path[:-len(MODEL_SUFFIX)] + COMPACT_SUFFIX
+    save_compact(model, compact_path, float16=float16)
+    started = time.perf_counter()
+    compact = load_compact(compact_path)
+    compact_load = time.perf_counter() - started
+
+    return {
+        "path": compact_path,
+        "pickle_bytes": os.path.getsize(path),
+        "compact_bytes": os.path.getsize(compact_path),
+        "pickle_load": pickle_load,
+        "compact_load": compact_load,
+        # float16 weights round the outputs, so only float32 files can match exactly
+        "verified": same_samples(model, compact) if verify and not float16 else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert pickled CTGAN models to the compact .npz format.")
+    parser.add_argument("--models-dir", default=MODELS_DIR)
+    parser.add_argument("--float16", action="store_true", help="Store generator weights as float16 (about half the size)")
+    parser.add_argument("--no-verify", action="store_true", help="Skip the same-seed sample comparison")
+    parser.add_argument("--remove-pickles", action="store_true",
+                        help="Delete each pickle once its compact file is written (and verified, unless --no-verify); "
+                             "training then retrains those models instead of reusing them")
+    args = parser.parse_args()
+
+    names = sorted(name for name in os.listdir(args.models_dir) if _is_model_file(name) and name.endswith(MODEL_SUFFIX))
+    total_pickle = total_compact = 0
+    for name in names:
+        path = os.path.join(args.models_dir, name)
+        try:
+            report = migrate(path, float16=args.float16, verify=not args.no_verify)
+        except ValueError as e:
+            print(f"{name}: skipped ({e})")
+            continue
+        total_pickle += report["pickle_bytes"]
+        total_compact += report["compact_bytes"]
+        check = {True: "identical samples", False: "SAMPLES DIFFER", None: "not verified"}[report["verified"]]
+        print(f"{name}: {report['pickle_bytes'] / 1024:.0f} KB -> {report['compact_bytes'] / 1024:.0f} KB, "
+              f"load {report['pickle_load'] * 1000:.0f} ms -> {report['compact_load'] * 1000:.0f} ms, {check}")
+        if args.remove_pickles and report["verified"] is not False:
+            os.remove(path)
+
+    if names:
+        print(f"Total: {total_pickle / 1024:.0f} KB -> {total_compact / 1024:.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
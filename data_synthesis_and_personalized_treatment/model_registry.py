@@ -0,0 +1,214 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+import joblib
+from data_synthesis_and_personalized_treatment.condition_index import load_or_build_index
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+MANIFEST_FILE = "manifest.json"
+CONDITIONS_FILE = "unique_conditions.pkl"
+MODEL_PREFIX = "ctgan_model_"
+MODEL_SUFFIX = ".pkl"
+# Pickle-free models written by compact_model / migrate_models; preferred when up to date
+COMPACT_SUFFIX = ".npz"
+# One generator over every condition, sampled with CTGAN's conditional vector
+CONDITIONAL_STEM = "ctgan_conditional"
+CONDITIONAL_FILE = CONDITIONAL_STEM + MODEL_SUFFIX
+
+# Loaded generators kept in memory; each CTGAN is a few MB once unpickled
+MAX_LOADED_MODELS = 8
+
+
+def model_filename(condition):
+    return f"{MODEL_PREFIX}{condition}{MODEL_SUFFIX}"
+
+
+def _is_model_file(name):
+    return name.endswith((MODEL_SUFFIX, COMPACT_SUFFIX)) and (
+        name.startswith(MODEL_PREFIX) or name.startswith(CONDITIONAL_STEM + "."))
+
+
+def _is_indexed(name):
+    return name == CONDITIONS_FILE or _is_model_file(name)
+
+
+def directory_signature(models_dir=MODELS_DIR):
+    """Cheap fingerprint of the indexed files (names, sizes, mtimes) used to detect a stale manifest."""
+    entries = sorted(
+        (entry.name, entry.stat().st_size, entry.stat().st_mtime_ns)
+        for entry in os.scandir(models_dir) if _is_indexed(entry.name)
+    )
+    return hashlib.sha256(repr(entries).encode("utf-8")).hexdigest()
+
+
+def build_manifest(models_dir=MODELS_DIR):
+    """Scans the models directory and returns the index of per-condition model files.
+
+    When a model exists as both a pickle and a compact file, the compact one is used
+    unless the pickle is newer (i.e. the model was retrained after migration).
+    """
+    files = {}
+    for name in sorted(os.listdir(models_dir)):
+        if _is_model_file(name):
+            stem, suffix = os.path.splitext(name)
+            stat = os.stat(os.path.join(models_dir, name))
+            entry = {"file": name, "format": "compact" if suffix == COMPACT_SUFFIX else "pickle",
+                     "bytes": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+            files.setdefault(stem, {})[entry["format"]] = entry
+
+    def preferred(forms):
+        compact, pickled = forms.get("compact"), forms.get("pickle")
+        if compact is not None and (pickled is None or compact["mtime_ns"] >= pickled["mtime_ns"]):
+            return compact
+        return pickled
+
+    files = {stem: preferred(forms) for stem, forms in files.items()}
+
+    conditional = files.pop(CONDITIONAL_STEM, None)
+    models = {stem[len(MODEL_PREFIX):]: entry for stem, entry in files.items()}
+
+    conditions = []
+    conditions_path = os.path.join(models_dir, CONDITIONS_FILE)
+    if os.path.exists(conditions_path):
+        with open(conditions_path, "rb") as f:
+            conditions = [str(condition) for condition in pickle.load(f)]
+
+    return {"signature": directory_signature(models_dir), "conditions": conditions, "models": models,
+            "conditional": conditional}
+
+
+def write_manifest(manifest, models_dir=MODELS_DIR):
+    path = os.path.join(models_dir, MANIFEST_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+class ModelRegistry:
+    """Index of the trained CTGAN models plus an in-process LRU of loaded ones.
+
+    The manifest is rebuilt only when an indexed file is added, replaced or removed,
+    and a loaded model is reused until its file's mtime changes, so repeated
+    generations for the same condition never unpickle the model again.
+    """
+
+    def __init__(self, models_dir=MODELS_DIR, max_loaded=MAX_LOADED_MODELS):
+        self.models_dir = models_dir
+        self.max_loaded = max_loaded
+        self._manifest = None
+        self._index = None
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def manifest(self):
+        """Returns the manifest, rebuilding it only when an indexed file has changed."""
+        with self._lock:
+            return self._current_manifest()
+
+    def _current_manifest(self):
+        signature = directory_signature(self.models_dir)
+        if self._manifest is not None and self._manifest["signature"] == signature:
+            return self._manifest
+
+        manifest = None
+        try:
+            with open(os.path.join(self.models_dir, MANIFEST_FILE)) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            pass
+        if manifest is None or manifest.get("signature") != signature:
+            manifest = build_manifest(self.models_dir)
+            try:
+                write_manifest(manifest, self.models_dir)
+            except OSError:
+                pass  # A read-only deployment still works from the in-memory index
+        self._manifest = manifest
+        return manifest
+
+    def conditions(self):
+        """Returns the conditions the general synthesizer offers."""
+        return list(self.manifest()["conditions"])
+
+    def condition_index(self):
+        """Returns the fuzzy lookup index over the conditions, persisted next to the models."""
+        conditions = self.conditions()
+        with self._lock:
+            if self._index is None or self._index.conditions != conditions:
+                self._index = load_or_build_index(conditions, self.models_dir)
+            return self._index
+
+    def has_model(self, condition):
+        return condition in self.manifest()["models"]
+
+    def has_conditional_model(self):
+        return self.manifest().get("conditional") is not None
+
+    def get_model(self, condition):
+        """Returns the loaded model for a condition, loading it from disk only on the first use."""
+        with self._lock:
+            entry = self._current_manifest()["models"].get(condition)
+            if entry is None:
+                raise KeyError(f"No trained model for condition '{condition}'")
+            return self._load(entry)
+
+    def get_conditional_model(self):
+        """Returns the single conditional model trained over all conditions."""
+        with self._lock:
+            entry = self._current_manifest().get("conditional")
+            if entry is None:
+                raise KeyError("No conditional model has been trained")
+            return self._load(entry)
+
+    def _load(self, entry):
+        path = os.path.join(self.models_dir, entry["file"])
+        key = (path, entry["mtime_ns"])
+
+        model = self._loaded.get(key)
+        if model is not None:
+            self._loaded.move_to_end(key)
+            self.hits += 1
+            return model
+
+        self.misses += 1
+        if entry.get("format") == "compact":
+            # Imported lazily: only torch is needed, and only once a model is used
+            from data_synthesis_and_personalized_treatment.compact_model import load_compact
+            model = load_compact(path)
+        else:
+            model = joblib.load(path)
+        # Drop any stale copy of the same file before caching the new one
+        for stale in [k for k in self._loaded if k[0] == path]:
+            del self._loaded[stale]
+        self._loaded[key] = model
+        while len(self._loaded) > self.max_loaded:
+            self._loaded.popitem(last=False)
+        return model
+
+    def evict(self, condition=None):
+        """Forgets loaded models (all of them, or one condition's) and the cached manifest."""
+        with self._lock:
+            if condition is None:
+                self._loaded.clear()
+            else:
+                stem = os.path.join(self.models_dir, model_filename(condition))[:-len(MODEL_SUFFIX)]
+                for key in [k for k in self._loaded if os.path.splitext(k[0])[0] == stem]:
+                    del self._loaded[key]
+            self._manifest = None
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Returns the process-wide registry, shared by every Streamlit session and rerun."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+        return _registry
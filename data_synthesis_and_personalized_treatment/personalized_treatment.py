@@ -1,98 +1,68 @@
-import os
-import base64
-from dotenv import load_dotenv
 import streamlit as st
-from groq import Groq
-from langchain.chains import LLMChain
-from langchain_core.prompts import (
-    ChatPromptTemplate,
-    HumanMessagePromptTemplate,
-    MessagesPlaceholder,
+from data_synthesis_and_personalized_treatment.image_fetcher import fetch_image, ImageFetchError
+from data_synthesis_and_personalized_treatment.image_payload import image_data_url, image_message
+from personalized_treatment.chat_session import ChatSession
+from personalized_treatment.llm import get_chat_model
+
+TEXT_MODEL = 'llama3-8b-8192'
+VISION_MODEL = 'llama-3.2-11b-vision-preview'
+
+# Token budget for the remembered conversation sent with each question
+MEMORY_TOKEN_BUDGET = 1500
+
+# Construct the system prompt to focus on medical conversations
+SYSTEM_PROMPT = (
+    'You are a medical assistant chatbot. Only answer medical-related questions '
+    'and neglect non-medical ones. If the user asks non-medical questions, respond '
+    'with: "I can only assist with medical questions." '
+    'For medical questions, provide personalized suggestions, including '
+    'possible diagnoses, treatments, exercises, and dietary advice.'
 )
-from langchain_core.messages import SystemMessage
-from langchain.chains.conversation.memory import ConversationBufferWindowMemory
-from langchain_groq import ChatGroq
-import requests
-
-# Load the .env file for the API key
-load_dotenv()
 
 def app():
-    # Initialize the Groq client with the API key
-    client = Groq(
-        api_key=os.environ.get("GROQ_API_KEY"),
-    )
-
-    # Function to encode the image to base64 for local files
-    def encode_image(image_path):
-        try:
-            with open(image_path, "rb") as image_file:
-                return base64.b64encode(image_file.read()).decode('utf-8')
-        except FileNotFoundError:
-            return None
-
-    # Function to validate the URL
-    def validate_url(image_url):
-        try:
-            response = requests.head(image_url)
-            return response.status_code == 200
-        except requests.exceptions.RequestException:
-            return False
-
     # Function to handle medical-specific chat interactions with memory
-    def chat_with_memory(model, memory, user_input, image_path=None, image_url=None):
-        # Construct the system prompt to focus on medical conversations
-        system_prompt = (
-            'You are a medical assistant chatbot. Only answer medical-related questions '
-            'and neglect non-medical ones. If the user asks non-medical questions, respond '
-            'with: "I can only assist with medical questions." '
-            'For medical questions, provide personalized suggestions, including '
-            'possible diagnoses, treatments, exercises, and dietary advice.'
-        )
-
-        # Construct a chat prompt template using various components
-        prompt = ChatPromptTemplate.from_messages(
-            [
-                SystemMessage(content=system_prompt),  # System prompt for medical-only behavior
-                MessagesPlaceholder(variable_name="chat_history"),  # Placeholder for chat history
-                HumanMessagePromptTemplate.from_template("{human_input}"),  # User input template
-            ]
-        )
-
-        # Create a conversation chain using the LLM (Language Learning Model)
-        conversation = LLMChain(
-            llm=model,  # The Groq LangChain chat object initialized earlier
-            prompt=prompt,  # The constructed prompt template
-            verbose=False,  # Enables verbose output for debugging
-            memory=memory,  # The conversational memory object to store chat history
-        )
-
+    def chat_with_memory(model, memory, user_input, image_bytes=None, image_url=None):
         # Handle text-only conversations
-        if image_path is None and image_url is None:
-            response = conversation.predict(human_input=user_input)
-
-        # Handle local image input
-        elif image_path is not None:
-            base64_image = encode_image(image_path)
-            if base64_image is None:
-                return "Invalid local image path. Please try again."
-            response = conversation.predict(human_input=f"{user_input} with image data {base64_image}")
-
-        # Handle image URL input
-        elif image_url is not None:
-            if not validate_url(image_url):
-                return "Invalid image URL. Please check the URL and try again."
-            response = conversation.predict(human_input=f"{user_input} with image at {image_url}")
+        if image_bytes is None and image_url is None:
+            response = model.invoke(memory.messages(user_input)).content
+            memory.add_exchange(user_input, response)
+            return response
+
+        # Handle image URL input: fetched once (with timeouts and a size cap) and cached locally
+        if image_bytes is None:
+            try:
+                image_bytes, _ = fetch_image(image_url)
+            except ImageFetchError as e:
+                return f"Invalid image URL: {e}"
+
+        # Local and fetched images are sent as a downscaled JPEG image part, not as text
+        try:
+            image_part_url = image_data_url(image_bytes)
+        except Exception:
+            return "Invalid image file. Please upload a JPG or PNG image."
+
+        # The vision model does not accept a system message alongside images,
+        # so the instructions travel in the text part of the image message
+        message = image_message(f"{SYSTEM_PROMPT}\n\n{user_input}", image_part_url)
+        response = model.invoke(memory.history_messages() + [message]).content
 
+        # Only a short marker of the image is remembered, never the image itself
+        memory.add_exchange(f"{user_input} [image attached]", response)
         return response
 
     # Main Streamlit app
     st.title("Personalized Medical Treatment")
     st.write("Feel free to state your medical symptoms here and get treatment plans")
 
-    # Initialize conversational memory (stores last 5 interactions)
-    conversational_memory_length = 5
-    memory = ConversationBufferWindowMemory(k=conversational_memory_length, memory_key="chat_history", return_messages=True)
+    # Conversational memory lives in the session as compact turns, bounded by tokens
+    memory = ChatSession.from_dict(st.session_state.get("treatment_chat_memory"), SYSTEM_PROMPT, MEMORY_TOKEN_BUDGET)
+
+    # Display chat history if exists
+    for turn in memory.turns:
+        if turn["role"] == "user":
+            st.write(f"You: {turn['content']}")
+        else:
+            st.write(f"Bot: {turn['content']}")
 
     # Collect user input
     user_input = st.text_input("You: ", placeholder="Enter your symptoms..")
@@ -100,37 +70,39 @@ def app():
     # Select the image option
     image_option = st.radio("Would you like to provide an image?", options=("No Image", "Local Image", "Image URL"))
 
-    # Variables to store image paths or URLs
-    image_path = None
+    # Variables to store image bytes or URLs
+    image_bytes = None
     image_url = None
 
     # Handling image option
     if image_option == "Local Image":
-        image_path = st.file_uploader("Upload an image", type=["jpg", "jpeg", "png"])
-        if image_path:
-            image_path = image_path.name
+        uploaded_image = st.file_uploader("Upload an image", type=["jpg", "jpeg", "png"])
+        if uploaded_image:
+            image_bytes = uploaded_image.getvalue()
     elif image_option == "Image URL":
         image_url = st.text_input("Enter the image URL:")
 
     # Create a button to submit the query
     if st.button("Submit"):
-        # Basic personalized interaction model
+        response = None
+
+        # Basic personalized interaction model (clients are shared across reruns)
         if image_option == "No Image":
             response = chat_with_memory(
-                model=ChatGroq(groq_api_key=os.environ['GROQ_API_KEY'], model_name='llama3-8b-8192'),
+                model=get_chat_model(TEXT_MODEL),
                 memory=memory,
                 user_input=user_input,
             )
-        elif image_option == "Local Image" and image_path:
+        elif image_option == "Local Image" and image_bytes:
             response = chat_with_memory(
-                model=ChatGroq(groq_api_key=os.environ['GROQ_API_KEY'], model_name='llama-3.2-11b-vision-preview'),
+                model=get_chat_model(VISION_MODEL),
                 memory=memory,
                 user_input=user_input,
-                image_path=image_path,
+                image_bytes=image_bytes,
             )
         elif image_option == "Image URL" and image_url:
             response = chat_with_memory(
-                model=ChatGroq(groq_api_key=os.environ['GROQ_API_KEY'], model_name='llama-3.2-11b-vision-preview'),
+                model=get_chat_model(VISION_MODEL),
                 memory=memory,
                 user_input=user_input,
                 image_url=image_url,
@@ -138,6 +110,9 @@ def app():
         else:
             st.error("Invalid input or missing image. Please try again.")
 
+        # Save the updated memory for the next rerun
+        st.session_state["treatment_chat_memory"] = memory.to_dict()
+
         # Display the response with enhanced formatting
         if response:
             st.markdown(f"Response:")
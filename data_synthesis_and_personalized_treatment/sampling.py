@@ -0,0 +1,127 @@
+import math
+import threading
+import numpy as np
+import pandas as pd
+
+# Upper bound on rows drawn in a single pass, to keep memory bounded at low acceptance
+MAX_PASS_ROWS = 100_000
+MAX_PASSES = 20
+# Smallest draw per pass, so a small request does not hinge on a handful of rows
+MIN_PASS_ROWS = 100
+# Acceptance rate below this, once at least 1 / MIN_ACCEPTANCE rows were drawn, means the
+# model practically never produces the value
+MIN_ACCEPTANCE = 1e-4
+
+# Pickled CTGANs sample from NumPy's and torch's process-wide generators (their own random
+# state is swapped in for the call), so two of them sampling at once draw from each
+# other's streams. Compact models draw from their own generators and need no lock.
+_global_rng_lock = threading.Lock()
+
+
+def supports_condition(model, column, value):
+    """Whether the CTGAN model can steer sampling towards column == value."""
+    try:
+        # Compact models answer directly; pickled CTGANs through their data transformer
+        getattr(model, "_transformer", model).convert_column_name_value_to_id(column, value)
+        return True
+    except (ValueError, AttributeError, KeyError):
+        return False
+
+
+def seeded_copy(model, seed):
+    """A shallow copy of model that samples from its own random state, seeded with seed.
+
+    Registry models are shared by every session: seeding a copy instead of the model keeps
+    concurrent callers from resetting each other's random state. The weights are shared.
+    """
+    clone = object.__new__(type(model))
+    clone.__dict__.update(model.__dict__)
+    clone.set_random_state(seed)
+    return clone
+
+
+def _draw(model, n, **condition):
+    if getattr(model, "owns_generators", False) and model.random_states is not None:
+        return model.sample(n, **condition)
+    with _global_rng_lock:
+        return model.sample(n, **condition)
+
+
+def rows_to_request(remaining, acceptance):
+    """Rows to draw so that, at the measured acceptance rate, one pass almost surely yields enough.
+
+    Adds a three-standard-deviation binomial margin instead of a fixed oversampling factor.
+    """
+    expected = remaining / acceptance
+    margin = 3 * math.sqrt(remaining * (1 - acceptance)) / acceptance
+    return min(MAX_PASS_ROWS, max(remaining, math.ceil(expected + margin)))
+
+
+def sample_exact(model, num_rows, column=None, value=None, max_passes=MAX_PASSES, constraints=None):
+    """Returns exactly num_rows synthetic rows with column == value, plus sampling stats.
+
+    Uses CTGAN's conditional sampling when the model knows the value, then keeps drawing
+    with an adaptive oversampling factor until enough rows pass the filter. With
+    constraints (a ConstraintSet), rows breaking any rule are dropped and replaced the same
+    way; the stats then also report the validity rate and the violations per rule.
+    """
+    if column is None and constraints is None:
+        data = _draw(model, num_rows)
+        return data, {"requested": num_rows, "sampled": num_rows, "accepted": num_rows,
+                      "passes": 1, "acceptance_rate": 1.0, "conditional": False}
+
+    conditional = column is not None and supports_condition(model, column, value)
+    condition = {"condition_column": column, "condition_value": value} if conditional else {}
+
+    batches = []
+    accepted = 0
+    sampled = 0
+    matched = 0
+    violations = {}
+    passes = 0
+    acceptance = 1.0  # Optimistic prior; corrected after the first pass
+    while accepted < num_rows and passes < max_passes:
+        size = max(MIN_PASS_ROWS, rows_to_request(num_rows - accepted, acceptance))
+        batch = _draw(model, size, **condition)
+        if column is not None:
+            batch = batch[batch[column] == value]
+        matched += len(batch)
+        if constraints is not None:
+            masks = constraints.masks(batch)
+            for rule, mask in masks.items():
+                violations[rule] = violations.get(rule, 0) + int((~mask).sum())
+            valid = np.ones(len(batch), dtype=bool)
+            for mask in masks.values():
+                valid &= mask
+            batch = batch[valid]
+        passes += 1
+        sampled += size
+        accepted += len(batch)
+        batches.append(batch)
+
+        # Too few rows drawn to tell a rare value from one the model never produces: keep going
+        if accepted / sampled < MIN_ACCEPTANCE and sampled >= 1 / MIN_ACCEPTANCE:
+            break
+        # Before the first accepted row, plan the next pass as if one more row would pass
+        acceptance = max(accepted, 1) / sampled
+
+    stats = {
+        "requested": num_rows,
+        "sampled": sampled,
+        "accepted": accepted,
+        "passes": passes,
+        "acceptance_rate": accepted / sampled if sampled else 0.0,
+        "conditional": conditional,
+    }
+    if constraints is not None:
+        stats["validity_rate"] = accepted / matched if matched else 0.0
+        stats["violations"] = violations
+    if accepted < num_rows:
+        requirements = ([f"had {column} = {value}"] if column is not None else []) + (
+            ["met every constraint"] if constraints is not None else [])
+        raise ValueError(
+            f"Only {accepted} of {num_rows} rows {' and '.join(requirements)} after {passes} passes "
+            f"({stats['acceptance_rate']:.2%} acceptance)."
+        )
+    data = pd.concat(batches, ignore_index=True).head(num_rows)
+    return data, stats
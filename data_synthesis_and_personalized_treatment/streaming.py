@@ -0,0 +1,105 @@
+import os
+import time
+import numpy as np
+from data_synthesis_and_personalized_treatment.sampling import sample_exact, seeded_copy
+
+# Rows sampled, converted and written at a time; bounds peak memory independently of the total
+DEFAULT_CHUNK_ROWS = 50_000
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "generated_data")
+FORMATS = ("csv", "parquet", "arrow")
+
+
+class ChunkWriter:
+    """Appends DataFrame chunks to a CSV, Parquet or Arrow IPC file, writing to a temp file until closed."""
+
+    def __init__(self, path, fmt):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported format '{fmt}'. Expected one of: {', '.join(FORMATS)}")
+        self.path = path
+        self.tmp_path = path + ".part"
+        self.fmt = fmt
+        self._file = None
+        self._writer = None
+        self._schema = None
+
+    def write(self, chunk):
+        if self.fmt == "csv":
+            if self._file is None:
+                self._file = open(self.tmp_path, "w", newline="")
+                chunk.to_csv(self._file, index=False)
+            else:
+                chunk.to_csv(self._file, index=False, header=False)
+            return
+
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise RuntimeError("Parquet and Arrow output need pyarrow (pip install pyarrow).") from e
+        if self._writer is None:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            self._schema = table.schema
+            if self.fmt == "parquet":
+                self._writer = pq.ParquetWriter(self.tmp_path, self._schema, compression="snappy")
+            else:
+                self._writer = pa.ipc.new_file(self.tmp_path, self._schema)
+        else:
+            # Later chunks are cast to the first chunk's schema so every row group/batch matches
+            table = pa.Table.from_pandas(chunk, schema=self._schema, preserve_index=False)
+        self._writer.write_table(table)
+
+    def close(self, success=True):
+        if self._file is not None:
+            self._file.close()
+        if self._writer is not None:
+            self._writer.close()
+        if success:
+            os.replace(self.tmp_path, self.path)
+        elif os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+def chunk_seed(seed, chunk):
+    """Model seed for one chunk, derived from (seed, chunk) so runs with nearby seeds share no chunks."""
+    return int(np.random.default_rng([seed, chunk]).integers(2**31 - 1))
+
+
+def stream_samples(model, total_rows, path, fmt="csv", chunk_rows=DEFAULT_CHUNK_ROWS, seed=0,
+                   column=None, value=None, progress=None, constraints=None):
+    """Samples total_rows rows chunk by chunk and streams them to path.
+
+    Chunk i is sampled from a copy of the model seeded with chunk_seed(seed, i), so the same
+    arguments always produce the same file, whoever else is sampling the shared model. progress(rows_written, total_rows, rows_per_sec)
+    is called after every chunk. With constraints, only rows meeting them are written.
+    Returns throughput stats.
+    """
+    writer = ChunkWriter(path, fmt)
+    started = time.perf_counter()
+    written = 0
+    chunks = 0
+    sampled = 0
+    try:
+        while written < total_rows:
+            size = min(chunk_rows, total_rows - written)
+            chunk, stats = sample_exact(seeded_copy(model, chunk_seed(seed, chunks)), size, column, value, constraints=constraints)
+            writer.write(chunk)
+            written += len(chunk)
+            sampled += stats["sampled"]
+            chunks += 1
+            if progress is not None:
+                progress(written, total_rows, written / (time.perf_counter() - started))
+    except BaseException:
+        writer.close(success=False)
+        raise
+    writer.close()
+
+    seconds = time.perf_counter() - started
+    return {
+        "rows": written,
+        "chunks": chunks,
+        "sampled": sampled,
+        "seconds": seconds,
+        "rows_per_sec": written / seconds if seconds else float("inf"),
+        "bytes": os.path.getsize(path),
+        "path": path,
+    }
@@ -0,0 +1,48 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from ctgan import CTGAN
+from compact_model import load_compact, save_compact
+
+def tiny_model():
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({
+        "Age": rng.integers(20, 80, 200),
+        "Cost": rng.normal(5000, 800, 200).round(2),
+        "Condition": rng.choice(["Diabetes", "Stroke", "Asthma"], 200),
+    })
+    model = CTGAN(epochs=1, batch_size=100)
+    model.fit(data, ["Condition"])
+    return model
+
+class TestCompactModel(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.model = tiny_model()
+
+    def testing_round_trip_matches_pickled_samples(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "model.npz")
+            save_compact(self.model, path)
+            compact = load_compact(path)
+        self.model.set_random_state(7)
+        compact.set_random_state(7)
+        expected = self.model.sample(150)
+        actual = compact.sample(150)
+        pd.testing.assert_frame_equal(expected.reset_index(drop=True), actual, check_dtype=False, atol=1e-4)
+
+    def testing_conditional_sampling_and_unknown_values(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "model.npz")
+            save_compact(self.model, path, float16=True)
+            compact = load_compact(path)
+        data = compact.sample(20, "Condition", "Stroke")
+        self.assertEqual(list(data.columns), ["Age", "Cost", "Condition"])
+        self.assertEqual(len(data), 20)
+        with self.assertRaises(ValueError):
+            compact.convert_column_name_value_to_id("Condition", "Unknown")
+
+if __name__ == "__main__":
+    unittest.main()
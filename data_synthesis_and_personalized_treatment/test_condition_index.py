@@ -0,0 +1,41 @@
+import tempfile
+import unittest
+from condition_index import ConditionIndex, DEFAULT_ALIASES, load_or_build_index
+
+CONDITIONS = list(DEFAULT_ALIASES)
+
+class TestConditionIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = ConditionIndex(CONDITIONS, DEFAULT_ALIASES)
+
+    def testing_typos_and_aliases(self):
+        self.assertEqual(self.index.best_match("diabetis")[0], "Diabetes")
+        self.assertEqual(self.index.best_match("Heart  attack!")[0], "Heart Attack")
+        self.assertEqual(self.index.best_match("myocardial infarction"), ("Heart Attack", 1.0))
+        self.assertEqual(self.index.best_match("high blood presure")[0], "Hypertension")
+        self.assertEqual(self.index.search("zzzz"), [])
+
+    def testing_top_k_scores(self):
+        results = self.index.search("fractured", k=3)
+        self.assertEqual(len(results), 3)
+        self.assertEqual({results[0][0], results[1][0]}, {"Fractured Arm", "Fractured Leg"})
+        scores = [score for _, score in results]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertTrue(all(0 < score <= 1 for score in scores))
+
+    def testing_prefix_completion(self):
+        self.assertEqual(self.index.complete("heart"), ["Heart Attack", "Heart Disease"])
+        self.assertEqual(self.index.complete("broken"), ["Fractured Arm", "Fractured Leg"])
+        self.assertEqual(self.index.complete("xyz"), [])
+
+    def testing_persisted_index_is_reused(self):
+        with tempfile.TemporaryDirectory() as models_dir:
+            first = load_or_build_index(CONDITIONS, models_dir)
+            second = load_or_build_index(CONDITIONS, models_dir)
+            self.assertEqual(first.signature, second.signature)
+            self.assertIsNot(first, second)
+            rebuilt = load_or_build_index(CONDITIONS + ["Migraine"], models_dir)
+            self.assertEqual(rebuilt.best_match("migrane")[0], "Migraine")
+
+if __name__ == '__main__':
+    unittest.main()
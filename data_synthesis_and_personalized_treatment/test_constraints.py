@@ -0,0 +1,61 @@
+import unittest
+import numpy as np
+import pandas as pd
+from constraints import ConstraintSet, learn_constraints
+from sampling import sample_exact
+
+TRAINING = pd.DataFrame({
+    "Age": [30, 45, 60],
+    "Condition": ["Diabetes", "Stroke", "Diabetes"],
+    "Procedure": ["Insulin Therapy", "CT Scan and Medication", "Insulin Therapy"],
+    "Satisfaction": [3, 4, 5],
+})
+
+class NoisyModel:
+    """Emits rows where Age is out of range for roughly every third row."""
+
+    def __init__(self):
+        self.rng = np.random.default_rng(0)
+
+    def sample(self, n):
+        return pd.DataFrame({
+            "Age": self.rng.choice([-5, 40, 50], size=n),
+            "Condition": ["Diabetes"] * n,
+            "Procedure": ["Insulin Therapy"] * n,
+            "Satisfaction": [4] * n,
+        })
+
+class TestConstraints(unittest.TestCase):
+    def testing_masks_per_rule(self):
+        constraints = learn_constraints(TRAINING, ["Condition", "Procedure"])
+        generated = pd.DataFrame({
+            "Age": [50, -1, 40.5, 70, 70],
+            "Condition": ["Diabetes", "Diabetes", "Stroke", "Stroke", "Flu"],
+            "Procedure": ["Insulin Therapy", "Insulin Therapy", "CT Scan and Medication", "Insulin Therapy", "Insulin Therapy"],
+            "Satisfaction": [3, 4, 5, 6, 2],
+        })
+        self.assertEqual(list(constraints.valid_mask(generated)), [True, False, False, False, False])
+        validity = constraints.validity(generated)
+        self.assertEqual(validity["violations"]["Age range"], 1)
+        self.assertEqual(validity["violations"]["Age integer"], 1)
+        self.assertEqual(validity["violations"]["Satisfaction range"], 1)
+        self.assertEqual(validity["violations"]["Condition category"], 1)
+        self.assertEqual(validity["violations"]["Condition/Procedure pair"], 2)
+        self.assertAlmostEqual(validity["rate"], 0.2)
+
+    def testing_round_trip_through_dict(self):
+        constraints = learn_constraints(TRAINING, ["Condition", "Procedure"])
+        restored = ConstraintSet.from_dict(constraints.to_dict())
+        self.assertEqual(list(restored.valid_mask(TRAINING)), [True, True, True])
+        self.assertEqual(restored.pairs, constraints.pairs)
+
+    def testing_sampling_replaces_violating_rows(self):
+        constraints = learn_constraints(TRAINING, ["Condition", "Procedure"])
+        data, stats = sample_exact(NoisyModel(), 300, constraints=constraints)
+        self.assertEqual(len(data), 300)
+        self.assertTrue((data["Age"] >= 0).all())
+        self.assertAlmostEqual(stats["validity_rate"], 2 / 3, delta=0.1)
+        self.assertGreater(stats["violations"]["Age range"], 0)
+
+if __name__ == "__main__":
+    unittest.main()
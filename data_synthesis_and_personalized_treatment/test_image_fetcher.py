@@ -0,0 +1,92 @@
+import http.server
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+import image_fetcher
+from image_fetcher import ImageFetchError, fetch_image
+
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(1000)
+
+class ImageHandler(http.server.BaseHTTPRequestHandler):
+    """Serves a PNG at any path; /drip trickles it out, /flaky fails with 503 on its first request."""
+    flaky_requests = 0
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == "/flaky":
+            ImageHandler.flaky_requests += 1
+            if ImageHandler.flaky_requests == 1:
+                self.send_response(503)
+                self.end_headers()
+                return
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        if self.path == "/drip":
+            self.end_headers()
+            for i in range(0, len(PNG), 10):
+                self.wfile.write(PNG[i:i + 10])
+                self.wfile.flush()
+                time.sleep(0.2)
+            return
+        self.send_header("Content-Length", str(len(PNG)))
+        self.end_headers()
+        self.wfile.write(PNG)
+
+class TestImageFetcher(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), ImageHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        # The test server is on loopback, which fetch_image otherwise refuses
+        allow_local = patch.object(image_fetcher, "ALLOW_PRIVATE_ADDRESSES", True)
+        allow_local.start()
+        self.addCleanup(allow_local.stop)
+
+    def testing_private_addresses_are_refused(self):
+        with patch.object(image_fetcher, "ALLOW_PRIVATE_ADDRESSES", False):
+            for url in (f"{self.base}/image", "http://169.254.169.254/latest/meta-data/",
+                        "http://10.0.0.1/x.png", "http://[::1]/x.png", "file:///etc/passwd"):
+                with self.assertRaises(ImageFetchError):
+                    fetch_image(url, self.cache_dir)
+            # The connected address is checked too (redirects, DNS answers changing after the check)
+            with patch.object(image_fetcher, "_check_host", lambda host, port: None):
+                with self.assertRaisesRegex(ImageFetchError, "private or local"):
+                    fetch_image(f"{self.base}/image", self.cache_dir)
+
+    def testing_slow_host_stops_at_deadline(self):
+        started = time.monotonic()
+        with patch.object(image_fetcher, "TOTAL_TIMEOUT", 1):
+            with self.assertRaises(ImageFetchError):
+                fetch_image(f"{self.base}/drip", self.cache_dir)
+        self.assertLess(time.monotonic() - started, 2)
+
+    def testing_retries_once_on_unavailable(self):
+        data, mime_type = fetch_image(f"{self.base}/flaky", self.cache_dir)
+        self.assertEqual((data, mime_type), (PNG, "image/png"))
+        self.assertEqual(ImageHandler.flaky_requests, 2)
+
+    def testing_cache_evicts_least_recently_used(self):
+        for i in range(4):
+            fetch_image(f"{self.base}/image{i}", self.cache_dir)
+            os.utime(image_fetcher._cache_paths(f"{self.base}/image{i}", self.cache_dir)[0], (i, i))
+        # Reading an image makes it the most recently used
+        image_fetcher._read_cache(f"{self.base}/image0", self.cache_dir)
+        image_fetcher._prune(self.cache_dir, max_bytes=2 * len(PNG))
+        kept = [i for i in range(4) if image_fetcher._read_cache(f"{self.base}/image{i}", self.cache_dir)[0]]
+        self.assertEqual(kept, [0, 3])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+from io import BytesIO
+from PIL import Image
+from image_payload import JPEG_QUALITY, MAX_IMAGE_SIDE, prepare_image
+
+def encode(image, format, **params):
+    buffer = BytesIO()
+    image.save(buffer, format=format, **params)
+    return buffer.getvalue()
+
+def gradient(size, mode="RGB"):
+    """A smooth image, so JPEG quality shows up in the file size."""
+    image = Image.linear_gradient("L").resize(size)
+    return Image.merge("RGB", (image, image.transpose(Image.FLIP_LEFT_RIGHT), image)).convert(mode)
+
+class TestImagePayload(unittest.TestCase):
+    def testing_large_image_is_downscaled(self):
+        prepared = Image.open(BytesIO(prepare_image(encode(gradient((3000, 1500)), "PNG"))))
+        self.assertEqual(prepared.format, "JPEG")
+        # The longest side is capped and the aspect ratio kept
+        self.assertEqual(prepared.size, (MAX_IMAGE_SIDE, MAX_IMAGE_SIDE // 2))
+
+    def testing_small_jpeg_is_passed_through(self):
+        data = encode(gradient((800, 600)), "JPEG", quality=95)
+        self.assertIs(prepare_image(data), data)
+
+    def testing_reencoded_at_jpeg_quality(self):
+        image = gradient((2048, 2048))
+        prepared = prepare_image(encode(image, "JPEG", quality=100))
+        resized = image.resize((MAX_IMAGE_SIDE, MAX_IMAGE_SIDE), Image.LANCZOS)
+        expected = encode(resized, "JPEG", quality=JPEG_QUALITY, optimize=True)
+        self.assertEqual(len(prepared), len(expected))
+        self.assertLess(len(prepared), len(encode(resized, "JPEG", quality=100)))
+
+    def testing_transparent_and_palette_images_become_rgb(self):
+        rgba = gradient((300, 200), "RGBA")
+        rgba.putalpha(0)
+        palette = gradient((300, 200)).convert("P", palette=Image.ADAPTIVE, colors=16)
+        for image in (rgba, palette):
+            prepared = Image.open(BytesIO(prepare_image(encode(image, "PNG"))))
+            self.assertEqual((prepared.format, prepared.mode, prepared.size), ("JPEG", "RGB", (300, 200)))
+            # Colours survive the conversion, even where the image is fully transparent
+            expected = image.convert("RGB").getpixel((150, 100))
+            for got, want in zip(prepared.getpixel((150, 100)), expected):
+                self.assertAlmostEqual(got, want, delta=12)
+
+if __name__ == '__main__':
+    unittest.main()
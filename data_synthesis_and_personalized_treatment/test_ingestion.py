@@ -0,0 +1,55 @@
+import io
+import unittest
+import numpy as np
+import pandas as pd
+from ingestion import load_dataset, stratified_sample, training_frame
+
+def csv_source(n=1000):
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({
+        "Patient_ID": np.arange(n) + 100_000,
+        "Age": rng.integers(0, 100, n),
+        "Condition": rng.choice(["Diabetes", "Stroke", "Asthma"], n, p=[0.6, 0.3, 0.1]),
+        "Cost": rng.integers(1000, 9000, n).astype(float),
+        "Note": [f"note {i}" for i in range(n)],
+    })
+    data.loc[n - 1, "Cost"] = 1234.5
+    return data, io.BytesIO(data.to_csv(index=False).encode("utf-8"))
+
+class TestIngestion(unittest.TestCase):
+    def testing_chunked_load_compacts_losslessly(self):
+        data, source = csv_source()
+        df, schema, memory = load_dataset(source, chunk_rows=300, sample_rows=200)
+        self.assertEqual(schema["Condition"], "category")
+        self.assertEqual(schema["Note"], "text")
+        self.assertEqual(df["Age"].dtype, np.int8)
+        self.assertEqual(df["Patient_ID"].dtype, np.int32)
+        self.assertEqual(str(df["Condition"].dtype), "category")
+        # Only the last chunk has a fractional cost; the column must not lose the whole numbers
+        self.assertTrue(np.array_equal(df["Cost"].to_numpy(dtype=float), data["Cost"].to_numpy()))
+        self.assertEqual(list(df["Condition"].astype(str)), list(data["Condition"]))
+        self.assertLess(memory["bytes"], memory["default_bytes"])
+        self.assertEqual(training_frame(df)["Age"].dtype, np.int64)
+
+    def testing_late_non_numeric_values_load_as_text(self):
+        data, _ = csv_source(600)
+        data["Age"] = data["Age"].astype(str)
+        data.loc[450, "Age"] = "unknown"
+        source = io.BytesIO(data.to_csv(index=False).encode("utf-8"))
+        df, schema, _ = load_dataset(source, chunk_rows=100, sample_rows=200)
+        self.assertEqual(schema["Age"], "text")
+        self.assertEqual(list(df["Age"].astype(str)), list(data["Age"]))
+        # The other numeric columns are still compacted
+        self.assertEqual(df["Patient_ID"].dtype, np.int32)
+
+    def testing_stratified_sample_keeps_shares(self):
+        data, _ = csv_source(10_000)
+        sample = stratified_sample(data, "Condition", 1000)
+        self.assertAlmostEqual(len(sample), 1000, delta=3)
+        shares = sample["Condition"].value_counts(normalize=True)
+        expected = data["Condition"].value_counts(normalize=True)
+        self.assertLess((shares - expected).abs().max(), 0.005)
+        self.assertEqual(len(stratified_sample(data, None, 500)), 500)
+
+if __name__ == "__main__":
+    unittest.main()
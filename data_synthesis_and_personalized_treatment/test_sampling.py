@@ -0,0 +1,88 @@
+import unittest
+import numpy as np
+import pandas as pd
+from sampling import MIN_ACCEPTANCE, sample_exact, rows_to_request, seeded_copy
+
+class FakeTransformer:
+    def __init__(self, values):
+        self.values = values
+
+    def convert_column_name_value_to_id(self, column_name, value):
+        if column_name != "Condition" or value not in self.values:
+            raise ValueError(f"The value `{value}` doesn't exist in the column `{column_name}`.")
+        return {"value_id": self.values.index(value)}
+
+class FakeModel:
+    """Draws conditions at fixed rates; conditional sampling raises the target's rate to 90%."""
+
+    def __init__(self, rates, conditional=True, seed=0):
+        self.rates = rates
+        self._transformer = FakeTransformer(list(rates) if conditional else [])
+        self.calls = []
+        self.rng = np.random.default_rng(seed)
+
+    def sample(self, n, condition_column=None, condition_value=None):
+        self.calls.append((n, condition_value))
+        names = list(self.rates)
+        p = np.array(list(self.rates.values()))
+        if condition_value is not None:
+            p = np.where(np.array(names) == condition_value, 0.9, 0.1 * p / p[np.array(names) != condition_value].sum())
+        return pd.DataFrame({"Condition": self.rng.choice(names, size=n, p=p / p.sum()), "Age": np.arange(n)})
+
+class SeededModel(FakeModel):
+    random_states = None
+
+    def set_random_state(self, random_state):
+        self.random_states = random_state
+        self.rng = np.random.default_rng(random_state)
+
+class TestSampling(unittest.TestCase):
+    def testing_exact_count_with_oversampling(self):
+        model = FakeModel({"Diabetes": 0.05, "Stroke": 0.95}, conditional=False)
+        data, stats = sample_exact(model, 500, "Condition", "Diabetes")
+        self.assertEqual(len(data), 500)
+        self.assertTrue((data["Condition"] == "Diabetes").all())
+        self.assertFalse(stats["conditional"])
+        self.assertLessEqual(stats["passes"], 3)
+        self.assertAlmostEqual(stats["acceptance_rate"], 0.05, delta=0.02)
+
+    def testing_conditional_sampling_is_used(self):
+        model = FakeModel({"Diabetes": 0.05, "Stroke": 0.95})
+        data, stats = sample_exact(model, 200, "Condition", "Diabetes")
+        self.assertEqual(len(data), 200)
+        self.assertTrue(stats["conditional"])
+        self.assertTrue(all(value == "Diabetes" for _, value in model.calls))
+        self.assertGreater(stats["acceptance_rate"], 0.8)
+
+    def testing_value_never_generated(self):
+        model = FakeModel({"Stroke": 1.0}, conditional=False)
+        with self.assertRaises(ValueError):
+            sample_exact(model, 10, "Condition", "Diabetes")
+        # Gives up only once enough rows were drawn to rule out a rare value, in a few passes
+        self.assertGreaterEqual(sum(n for n, _ in model.calls), 1 / MIN_ACCEPTANCE)
+        self.assertLessEqual(len(model.calls), 4)
+
+    def testing_small_requests_at_low_acceptance(self):
+        for seed in range(20):
+            model = FakeModel({"Diabetes": 0.5, "Stroke": 0.5}, conditional=False, seed=seed)
+            data, _ = sample_exact(model, 1, "Condition", "Diabetes")
+            self.assertEqual(list(data["Condition"]), ["Diabetes"])
+            model = FakeModel({"Diabetes": 0.01, "Stroke": 0.99}, conditional=False, seed=seed)
+            data, _ = sample_exact(model, 64, "Condition", "Diabetes")
+            self.assertEqual(len(data), 64)
+
+    def testing_seeded_copy_leaves_shared_model_alone(self):
+        model = SeededModel({"Diabetes": 0.5, "Stroke": 0.5})
+        first, _ = sample_exact(seeded_copy(model, 3), 50, "Condition", "Diabetes")
+        # Someone else reseeding the shared model in between changes nothing
+        model.set_random_state(99)
+        second, _ = sample_exact(seeded_copy(model, 3), 50, "Condition", "Diabetes")
+        self.assertTrue(first.equals(second))
+        self.assertEqual(model.random_states, 99)
+
+    def testing_request_margin(self):
+        self.assertEqual(rows_to_request(100, 1.0), 100)
+        self.assertGreater(rows_to_request(100, 0.5), 200)
+
+if __name__ == '__main__':
+    unittest.main()
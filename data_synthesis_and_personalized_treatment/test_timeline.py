@@ -0,0 +1,94 @@
+import os
+import sys
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+# timeline imports its siblings through the package, so the project root must be importable too
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from timeline import timeline_batch, write_timelines
+
+class StubModel:
+    """Draws EHR-shaped rows for one condition; readmits at a fixed rate."""
+
+    def __init__(self, condition, readmission_rate):
+        self.condition = condition
+        self.readmission_rate = readmission_rate
+        self.random_states = None
+
+    def set_random_state(self, random_state):
+        self.random_states = np.random.default_rng(random_state)
+
+    def sample(self, n, condition_column=None, condition_value=None):
+        rng = self.random_states
+        return pd.DataFrame({
+            "Age": rng.integers(20, 80, n),
+            "Gender": rng.choice(["Female", "Male"], n),
+            "Condition": self.condition,
+            "Length_of_Stay": rng.integers(1, 20, n),
+            "Readmission": np.where(rng.random(n) < self.readmission_rate, "Yes", "No"),
+        })
+
+class StubRegistry:
+    def __init__(self, models):
+        self.models = models
+
+    def conditions(self):
+        return list(self.models)
+
+    def has_model(self, condition):
+        return condition in self.models
+
+    def get_model(self, condition):
+        return self.models[condition]
+
+def stub_models():
+    return [StubModel("Asthma", 0.0), StubModel("Stroke", 0.5), StubModel("Heart Attack", 1.0)]
+
+class TestTimeline(unittest.TestCase):
+    def testing_visit_histories(self):
+        models = stub_models()
+        timeline = timeline_batch(models, [m.condition for m in models], [1 / 3] * 3, 300, 1,
+                                  np.random.default_rng(0), max_visits=5)
+        self.assertEqual(timeline["Patient_ID"].nunique(), 300)
+        for _, visits in timeline.groupby("Patient_ID"):
+            self.assertEqual(list(visits["Visit"]), list(range(1, len(visits) + 1)))
+            self.assertEqual(visits["Gender"].nunique(), 1)
+            self.assertEqual(visits["Condition"].nunique(), 1)
+            # Age moves only with the years since the first admission
+            elapsed_years = (visits["Admission_Date"] - visits["Admission_Date"].iloc[0]).dt.days // 365
+            self.assertTrue((visits["Age"] == visits["Age"].iloc[0] + elapsed_years).all())
+            # Every visit but the last follows a readmission, and starts after the previous discharge
+            self.assertTrue((visits["Readmission"].iloc[:-1] == "Yes").all())
+            gaps = visits["Days_Since_Last_Discharge"]
+            self.assertTrue(pd.isna(gaps.iloc[0]))
+            expected = (visits["Admission_Date"].iloc[1:].to_numpy() - visits["Discharge_Date"].iloc[:-1].to_numpy())
+            self.assertEqual(list(gaps.iloc[1:]), list(expected.astype("timedelta64[D]").astype(int)))
+            self.assertTrue((gaps.iloc[1:] >= 1).all())
+
+    def testing_max_visits_cap(self):
+        models = stub_models()
+        timeline = timeline_batch(models, [m.condition for m in models], [0, 0, 1], 50, 1,
+                                  np.random.default_rng(0), max_visits=4)
+        # Heart Attack always readmits, so every history runs up to the cap
+        self.assertTrue((timeline.groupby("Patient_ID")["Visit"].max() == 4).all())
+        self.assertEqual(len(timeline), 200)
+
+    def testing_same_seed_same_file(self):
+        registry = StubRegistry({m.condition: m for m in stub_models()})
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = [os.path.join(tmp, name) for name in ("a.parquet", "b.parquet", "c.parquet")]
+            stats = write_timelines(250, paths[0], registry, seed=7, batch_patients=100)
+            write_timelines(250, paths[1], registry, seed=7, batch_patients=100)
+            write_timelines(250, paths[2], registry, seed=8, batch_patients=100)
+            first, second, other = (pd.read_parquet(path) for path in paths)
+        self.assertTrue(first.equals(second))
+        self.assertFalse(first.equals(other))
+        self.assertEqual(stats["patients"], 250)
+        self.assertEqual(stats["visits"], len(first))
+        self.assertEqual(list(first["Patient_ID"].unique()), list(range(1, 251)))
+        # The shared models are never reseeded; each draw uses a seeded copy
+        self.assertTrue(all(m.random_states is None for m in registry.models.values()))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import os
+import sys
+import unittest
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+import torch
+from ctgan import CTGAN
+# warm_start imports its siblings through the package, so the project root must be importable too
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import data_synthesis_and_personalized_treatment.transformer_cache as transformer_cache
+from warm_start import fine_tune, is_compatible
+
+def ehr_rows(n, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Age": rng.integers(20, 80, n),
+        "Cost": rng.normal(5000, 800, n).round(2),
+        "Condition": rng.choice(["Diabetes", "Stroke", "Asthma"], n),
+    })
+
+class TestWarmStart(unittest.TestCase):
+    def testing_fine_tune_keeps_the_trained_generator(self):
+        model = CTGAN(epochs=2, batch_size=100)
+        model.fit(ehr_rows(200, 0), ["Condition"])
+        generator, transformer = model._generator, model._transformer
+        trained = {name: tensor.clone() for name, tensor in generator.state_dict().items()}
+
+        new_rows = ehr_rows(100, 1)
+        self.assertTrue(is_compatible(model, new_rows, ["Condition"]))
+        fine_tune(model, new_rows, ["Condition"], epochs=1)
+
+        # The same generator and transformer, trained further from their weights rather than rebuilt
+        self.assertIs(model._generator, generator)
+        self.assertIs(model._transformer, transformer)
+        self.assertEqual(model._epochs, 2)
+        tuned = generator.state_dict()
+        self.assertTrue(any(not torch.equal(trained[name], tuned[name]) for name in trained))
+        fresh = CTGAN(epochs=1, batch_size=100)
+        fresh.fit(new_rows, ["Condition"])
+        weight = "seq.0.fc.weight"
+        self.assertLess((tuned[weight] - trained[weight]).norm(), (fresh._generator.state_dict()[weight] - trained[weight]).norm())
+
+    def testing_unsupported_ctgan_retrains_in_full(self):
+        model = CTGAN(epochs=1, batch_size=100)
+        model.fit(ehr_rows(200, 0), ["Condition"])
+        with patch.object(transformer_cache, "SUPPORTED_CTGAN", "0.0"):
+            self.assertFalse(is_compatible(model, ehr_rows(50, 1), ["Condition"]))
+
+if __name__ == '__main__':
+    unittest.main()
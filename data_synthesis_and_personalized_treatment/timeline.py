@@ -0,0 +1,172 @@
+# Generates multi-visit patient histories from the per-condition CTGAN models and writes them to Parquet.
+# Run from the project root: python -m data_synthesis_and_personalized_treatment.timeline --patients 1000000
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+from data_synthesis_and_personalized_treatment.constraints import load_constraints
+from data_synthesis_and_personalized_treatment.model_registry import get_registry
+from data_synthesis_and_personalized_treatment.sampling import sample_exact, seeded_copy
+from data_synthesis_and_personalized_treatment.streaming import OUTPUT_DIR, ChunkWriter
+
+# Patients generated and written at a time; bounds memory independently of the cohort size
+DEFAULT_BATCH_PATIENTS = 100_000
+# A history stops here even if the last visit still ends in a readmission
+MAX_VISITS = 12
+# First admissions fall uniformly in this window
+START_DATE = np.datetime64("2020-01-01")
+ENROLMENT_DAYS = 3 * 365
+# Mean days between a discharge and the readmission that follows it
+READMISSION_GAP_DAYS = 30
+REQUIRED_COLUMNS = ("Age", "Gender", "Length_of_Stay", "Readmission")
+
+
+def _sample_records(models, conditions, codes, rng, constraints):
+    """One synthetic record per entry of codes (condition indices), in the same order."""
+    frames, positions = [], []
+    for code in np.unique(codes):
+        rows = np.flatnonzero(codes == code)
+        model = seeded_copy(models[code], int(rng.integers(2**31 - 1)))
+        frame, _ = sample_exact(model, len(rows), 'Condition', conditions[code], constraints=constraints)
+        frames.append(frame)
+        positions.append(rows)
+    records = pd.concat(frames, ignore_index=True)
+    return records.iloc[np.argsort(np.concatenate(positions), kind="stable")].reset_index(drop=True)
+
+
+def timeline_batch(models, conditions, weights, n_patients, first_id, rng, constraints=None, max_visits=MAX_VISITS):
+    """Generates the visit histories of n_patients patients as one DataFrame sorted by patient and visit.
+
+    All patients are advanced one visit per round: every round samples one record per
+    still-active patient from its condition's model, and a patient stays active while its
+    latest record says it was readmitted. Dates, gaps and ages are NumPy array operations
+    over the active patients, so the Python work per round does not grow with the cohort.
+    """
+    codes = rng.choice(len(conditions), size=n_patients, p=weights)
+    admission = START_DATE + rng.integers(0, ENROLMENT_DAYS, n_patients).astype("timedelta64[D]")
+    first_admission = admission.copy()
+    last_discharge = np.full(n_patients, np.datetime64("NaT"), dtype="datetime64[D]")
+    gender = None
+    base_age = None
+
+    active = np.arange(n_patients)
+    visits = []
+    for visit in range(1, max_visits + 1):
+        if not len(active):
+            break
+        records = _sample_records(models, conditions, codes[active], rng, constraints)
+        if visit == 1:
+            # Sex and age at first admission stay fixed for the patient
+            gender = records['Gender'].to_numpy()
+            base_age = records['Age'].to_numpy(dtype=np.int64)
+        else:
+            records['Gender'] = gender[active]
+            elapsed_years = (admission[active] - first_admission[active]).astype(np.int64) // 365
+            records['Age'] = base_age[active] + elapsed_years
+
+        stay = records['Length_of_Stay'].to_numpy(dtype=np.int64).astype("timedelta64[D]")
+        discharge = admission[active] + stay
+        records.insert(0, 'Patient_ID', first_id + active)
+        records.insert(1, 'Visit', np.full(len(active), visit, dtype=np.int16))
+        records['Admission_Date'] = admission[active]
+        records['Discharge_Date'] = discharge
+        if visit == 1:
+            records['Days_Since_Last_Discharge'] = pd.array([pd.NA] * len(active), dtype="Int32")
+        else:
+            gap = (admission[active] - last_discharge[active]).astype(np.int64)
+            records['Days_Since_Last_Discharge'] = pd.array(gap, dtype="Int32")
+        visits.append(records)
+
+        readmitted = records['Readmission'].to_numpy() == "Yes"
+        next_active = active[readmitted]
+        last_discharge[next_active] = discharge[readmitted]
+        gaps = np.ceil(rng.exponential(READMISSION_GAP_DAYS, len(next_active))).astype(np.int64)
+        admission[next_active] = discharge[readmitted] + gaps.astype("timedelta64[D]")
+        active = next_active
+
+    timeline = pd.concat(visits, ignore_index=True)
+    order = np.lexsort((timeline['Visit'].to_numpy(), timeline['Patient_ID'].to_numpy()))
+    return timeline.iloc[order].reset_index(drop=True)
+
+
+def write_timelines(n_patients, path, registry=None, conditions=None, weights=None, seed=0,
+                    batch_patients=DEFAULT_BATCH_PATIENTS, max_visits=MAX_VISITS, constraints=None, progress=None):
+    """Generates n_patients visit histories batch by batch and streams them to a Parquet file.
+
+    Patients are spread over conditions (default: every condition with a model) by weights
+    (default: uniform). Batch i uses random seed (seed, i), so the same arguments always
+    produce the same file. progress(patients_done, n_patients) is called after every batch.
+    Returns the cohort stats.
+    """
+    registry = registry or get_registry()
+    conditions = list(conditions or [c for c in registry.conditions() if registry.has_model(c)])
+    if not conditions:
+        raise ValueError("No per-condition models are available")
+    weights = np.full(len(conditions), 1 / len(conditions)) if weights is None else np.asarray(weights, float) / np.sum(weights)
+    models = [registry.get_model(condition) for condition in conditions]
+
+    writer = ChunkWriter(path, "parquet")
+    started = time.perf_counter()
+    done = 0
+    visits = 0
+    try:
+        for batch in range(-(-n_patients // batch_patients)):
+            size = min(batch_patients, n_patients - done)
+            rng = np.random.default_rng([seed, batch])
+            timeline = timeline_batch(models, conditions, weights, size, done + 1, rng, constraints, max_visits)
+            missing = [column for column in REQUIRED_COLUMNS if column not in timeline]
+            if missing:
+                raise ValueError(f"The models do not generate the columns a timeline needs: {', '.join(missing)}")
+            writer.write(timeline)
+            done += size
+            visits += len(timeline)
+            if progress is not None:
+                progress(done, n_patients)
+    except BaseException:
+        writer.close(success=False)
+        raise
+    writer.close()
+
+    seconds = time.perf_counter() - started
+    return {
+        "patients": done,
+        "visits": visits,
+        "visits_per_patient": visits / done if done else 0.0,
+        "seconds": seconds,
+        "patients_per_sec": done / seconds if seconds else float("inf"),
+        "bytes": os.path.getsize(path),
+        "path": path,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic multi-visit patient histories as Parquet.")
+    parser.add_argument("--patients", type=int, default=10_000)
+    parser.add_argument("--out", help="Parquet file to write (default: generated_data/timelines_<patients>_<seed>.parquet)")
+    parser.add_argument("--conditions", nargs="+", help="Conditions to draw patients from (default: all)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-patients", type=int, default=DEFAULT_BATCH_PATIENTS)
+    parser.add_argument("--max-visits", type=int, default=MAX_VISITS)
+    parser.add_argument("--no-constraints", action="store_true", help="Keep records that break the saved constraints")
+    args = parser.parse_args()
+
+    registry = get_registry()
+    constraints = None if args.no_constraints else load_constraints(registry.models_dir)
+    path = args.out or os.path.join(OUTPUT_DIR, f"timelines_{args.patients}_{args.seed}.parquet")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def report(done, total):
+        print(f"{done:,} / {total:,} patients")
+
+    stats = write_timelines(args.patients, path, registry, args.conditions, seed=args.seed,
+                            batch_patients=args.batch_patients, max_visits=args.max_visits,
+                            constraints=constraints, progress=report)
+    print(f"Wrote {stats['patients']:,} patients with {stats['visits']:,} visits "
+          f"({stats['visits_per_patient']:.2f} per patient) to {stats['path']} "
+          f"in {stats['seconds']:.1f}s ({stats['patients_per_sec']:,.0f} patients/sec, "
+          f"{stats['bytes'] / (1024 * 1024):.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
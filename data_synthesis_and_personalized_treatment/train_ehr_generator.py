@@ -1,44 +1,87 @@
+# Trains one CTGAN model per condition in hospital_data.csv, in parallel.
+# Run from the project root: python -m data_synthesis_and_personalized_treatment.train_ehr_generator
+import argparse
 import os
-import pandas as pd
-from ctgan import CTGAN
-import joblib  # For saving the models
 import pickle  # For saving unique conditions
+import time
+import pandas as pd
+from data_synthesis_and_personalized_treatment.constraints import learn_constraints, save_constraints
+from data_synthesis_and_personalized_treatment.model_registry import MODELS_DIR, CONDITIONS_FILE
+from data_synthesis_and_personalized_treatment.training import (
+    DEFAULT_EPOCHS, DEFAULT_REPLAY, DEFAULT_UPDATE_EPOCHS, train_conditional, train_per_condition)
 
-# Path to the models directory
-models_dir = r'models'
-
-# Ensure the models directory exists
-os.makedirs(models_dir, exist_ok=True)
-
-# Load the dataset
-df = pd.read_csv(r'datasets/hospital_data.csv')
-df = df.drop(columns=['Patient_ID'])
+DATASET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "datasets", "hospital_data.csv")
 
 # Define categorical features
 categorical_features = ['Gender', 'Procedure', 'Readmission', 'Outcome', 'Satisfaction', 'Condition']
 
-# Get unique conditions
-unique_conditions = df['Condition'].unique()
-
-# Save the unique conditions to a pickle file
-conditions_filename = os.path.join(models_dir, 'unique_conditions.pkl')
-with open(conditions_filename, 'wb') as f:
-    pickle.dump(unique_conditions, f)
-print(f"Unique conditions saved to: {conditions_filename}")
-
-# Train a separate CTGAN model for each condition
-for condition in unique_conditions:
-    print(f"Training CTGAN model for condition: {condition}")
-    
-    # Filter the data for the current condition
-    condition_df = df[df['Condition'] == condition]
-    
-    # Train the CTGAN model
-    model = CTGAN()
-    model.fit(condition_df, categorical_features, epochs=2)  # Train for 20 epochs
-    
-    # Save the trained model for the current condition in the models directory
-    model_filename = os.path.join(models_dir, f'ctgan_model_{condition}.pkl')
-    joblib.dump(model, model_filename)
-
-print("Training for all conditions completed.")
+
+def main():
+    parser = argparse.ArgumentParser(description="Train a CTGAN model for every condition in the hospital dataset.")
+    parser.add_argument("--epochs", type=int, default=DEFAULT_EPOCHS)
+    parser.add_argument("--workers", type=int, help="Training processes (default: one per core)")
+    parser.add_argument("--threads-per-worker", type=int, default=1, help="Torch threads in each process")
+    parser.add_argument("--force", action="store_true", help="Retrain conditions whose data has not changed")
+    parser.add_argument("--conditional", action="store_true",
+                        help="Train one conditional model over all conditions instead of one model per condition")
+    parser.add_argument("--update", action="store_true",
+                        help="Fine-tune existing condition models on their new or changed rows instead of retraining")
+    parser.add_argument("--update-epochs", type=int, default=DEFAULT_UPDATE_EPOCHS)
+    parser.add_argument("--replay", type=float, default=DEFAULT_REPLAY, help="Old rows replayed per new row when updating")
+    parser.add_argument("--no-shared-transformer", action="store_true",
+                        help="Fit the continuous-column transforms for every model instead of reusing the cached ones")
+    args = parser.parse_args()
+
+    # Ensure the models directory exists
+    os.makedirs(MODELS_DIR, exist_ok=True)
+
+    # Load the dataset
+    df = pd.read_csv(DATASET)
+    df = df.drop(columns=['Patient_ID'])
+
+    # Get unique conditions
+    unique_conditions = df['Condition'].unique()
+
+    # Save the unique conditions to a pickle file
+    conditions_filename = os.path.join(MODELS_DIR, CONDITIONS_FILE)
+    with open(conditions_filename, 'wb') as f:
+        pickle.dump(unique_conditions, f)
+    print(f"Unique conditions saved to: {conditions_filename}")
+
+    # Ranges, categories and Procedure/Condition pairs the generated records are checked against
+    save_constraints(learn_constraints(df, categorical_features), MODELS_DIR)
+
+    if args.conditional:
+        started = time.perf_counter()
+        _, reused = train_conditional(df, categorical_features, MODELS_DIR, epochs=args.epochs, force=args.force,
+                                      shared_transformer=not args.no_shared_transformer)
+        print("Conditional model unchanged, reusing it." if reused
+              else f"Conditional model trained in {time.perf_counter() - started:.1f}s.")
+        return
+
+    # Train a separate CTGAN model for each condition, several at a time
+    def report(result, done, total):
+        if result['reused']:
+            print(f"[{done}/{total}] {result['condition']}: unchanged, reusing {result['path']}")
+        elif result['updated']:
+            print(f"[{done}/{total}] {result['condition']}: fine-tuned on {result['new_rows']} new rows "
+                  f"in {result['seconds']:.1f}s -> {result['path']}")
+        else:
+            print(f"[{done}/{total}] {result['condition']}: {result['rows']} rows in {result['seconds']:.1f}s -> {result['path']}")
+
+    started = time.perf_counter()
+    results = train_per_condition(df, 'Condition', categorical_features, MODELS_DIR, epochs=args.epochs,
+                        workers=args.workers, threads_per_worker=args.threads_per_worker, progress=report,
+                        force=args.force, shared_transformer=not args.no_shared_transformer, warm_start=args.update,
+                        update_epochs=args.update_epochs, replay=args.replay)
+    print(f"Training for all conditions completed in {time.perf_counter() - started:.1f}s.")
+
+    # Shows what sharing the fitted continuous-column transforms saved
+    transformer = next((r['transformer'] for r in results.values() if r['transformer']), None)
+    if transformer is not None:
+        source = "loaded from cache" if transformer['cached'] else "fitted once and cached"
+        print(f"Continuous-column transforms {source} in {transformer['seconds']:.2f}s.")
+
+
+if __name__ == "__main__":
+    main()
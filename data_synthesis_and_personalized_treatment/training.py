@@ -0,0 +1,297 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+import joblib
+import numpy as np
+import pandas as pd
+from data_synthesis_and_personalized_treatment.file_utils import atomic_dump
+from data_synthesis_and_personalized_treatment.model_registry import CONDITIONAL_FILE, MODELS_DIR, model_filename
+
+DEFAULT_EPOCHS = 2
+# Torch threads per training process; workers * threads never exceeds the core budget
+DEFAULT_THREADS_PER_WORKER = 1
+TRAINING_MANIFEST = "training_manifest.json"
+# Per-model hashes of the rows it was trained on, used to find new rows for warm-start updates
+ROW_HASHES_SUBDIR = "row_hashes"
+# Fine-tuning epochs over the new rows (plus replayed old ones) in a warm-start update
+DEFAULT_UPDATE_EPOCHS = 5
+# Old rows replayed per new row, so fine-tuning does not drift towards the new rows alone
+DEFAULT_REPLAY = 1.0
+
+
+def _library_versions():
+    import ctgan
+    import torch
+    return {"ctgan": ctgan.__version__, "torch": torch.__version__.split("+")[0]}
+
+
+def data_hash(data):
+    """Content hash of a DataFrame: column names, dtypes and every row, independent of the index."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([[str(c), str(t)] for c, t in data.dtypes.items()]).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(data, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def row_hashes(data):
+    """Sorted 64-bit hashes of data's rows (values only, independent of the index)."""
+    return np.sort(pd.util.hash_pandas_object(data, index=False).to_numpy())
+
+
+def row_hashes_path(model_path):
+    models_dir, name = os.path.split(model_path)
+    return os.path.join(models_dir, ROW_HASHES_SUBDIR, os.path.splitext(name)[0] + ".npy")
+
+
+def save_row_hashes(model_path, data):
+    path = row_hashes_path(model_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, row_hashes(data))
+    os.replace(tmp_path, path)
+
+
+def training_fingerprint(data, categorical_features, epochs, ctgan_kwargs, shared_transformer=False):
+    """Identifies a training run: the data slice, categorical set, hyperparameters and library versions."""
+    payload = {
+        "data": data_hash(data),
+        "categorical": sorted(map(str, categorical_features)),
+        "hyperparameters": {"epochs": epochs, **ctgan_kwargs},
+        "shared_transformer": shared_transformer,
+        "versions": _library_versions(),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def load_training_manifest(models_dir):
+    try:
+        with open(os.path.join(models_dir, TRAINING_MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def record_training(models_dir, file_name, fingerprint, rows, method="full"):
+    """Stores the fingerprint a model file was trained from (re-reads first; other runs may have written).
+
+    method is "full" for training from scratch and "warm_start" for a fine-tuned update.
+    """
+    manifest = load_training_manifest(models_dir)
+    manifest[file_name] = {
+        "fingerprint": fingerprint,
+        "rows": rows,
+        "method": method,
+        "trained_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    path = os.path.join(models_dir, TRAINING_MANIFEST)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def is_current(manifest, models_dir, file_name, fingerprint):
+    entry = manifest.get(file_name)
+    return (entry is not None and entry["fingerprint"] == fingerprint
+            and os.path.exists(os.path.join(models_dir, file_name)))
+
+
+def _init_worker(threads):
+    import torch
+    torch.set_num_threads(threads)
+
+
+def _sample(model, rows, constraints):
+    if not rows:
+        return None
+    from data_synthesis_and_personalized_treatment.sampling import sample_exact
+    try:
+        return sample_exact(model, rows, constraints=constraints)[0]
+    except ValueError:
+        # The model barely ever meets the constraints; return its raw rows and let the caller report validity
+        return model.sample(rows)
+
+
+def _train_one(condition, data, categorical_features, epochs, path, sample_rows, ctgan_kwargs, transforms=None,
+               constraints=None):
+    # Imported here so the parent process does not pay for torch unless it trains itself
+    from ctgan import CTGAN
+    from data_synthesis_and_personalized_treatment.transformer_cache import fit_with_transforms
+
+    started = time.perf_counter()
+    model = CTGAN(epochs=epochs, **ctgan_kwargs)
+    fit_with_transforms(model, data, categorical_features, transforms)
+    atomic_dump(model, path)
+    save_row_hashes(path, data)
+    sample = _sample(model, sample_rows, constraints)
+    return {"condition": condition, "path": path, "rows": len(data), "reused": False, "updated": False,
+            "new_rows": len(data), "seconds": time.perf_counter() - started, "sample": sample}
+
+
+def _update_one(condition, data, categorical_features, epochs, path, sample_rows, ctgan_kwargs, transforms,
+                update_epochs, replay, constraints=None):
+    from data_synthesis_and_personalized_treatment.warm_start import fine_tune, is_compatible, refresh_sampler
+
+    started = time.perf_counter()
+    model = joblib.load(path)
+    if not is_compatible(model, data, categorical_features):
+        # New columns or categories need a new transformer, and so a full retrain
+        return _train_one(condition, data, categorical_features, epochs, path, sample_rows, ctgan_kwargs, transforms,
+                          constraints)
+
+    fresh = ~np.isin(pd.util.hash_pandas_object(data, index=False).to_numpy(), np.load(row_hashes_path(path)))
+    new_rows = data[fresh]
+    if len(new_rows):
+        old_rows = data[~fresh]
+        replayed = old_rows.sample(n=min(len(old_rows), int(len(new_rows) * replay)), random_state=0)
+        fine_tune(model, pd.concat([new_rows, replayed]), categorical_features, update_epochs)
+    # Sampled category frequencies follow the whole slice, not just the rows fine-tuned on
+    refresh_sampler(model, data)
+    atomic_dump(model, path)
+    save_row_hashes(path, data)
+    sample = _sample(model, sample_rows, constraints)
+    return {"condition": condition, "path": path, "rows": len(data), "reused": False, "updated": True,
+            "new_rows": len(new_rows), "seconds": time.perf_counter() - started, "sample": sample}
+
+
+def _reuse_one(condition, rows, path, sample_rows, constraints=None):
+    started = time.perf_counter()
+    sample = _sample(joblib.load(path), sample_rows, constraints) if sample_rows else None
+    return {"condition": condition, "path": path, "rows": rows, "reused": True, "updated": False,
+            "new_rows": 0, "seconds": time.perf_counter() - started, "sample": sample}
+
+
+def plan_workers(n_jobs, workers=None, threads_per_worker=DEFAULT_THREADS_PER_WORKER):
+    """Returns how many processes to start so that workers * threads_per_worker fits the machine."""
+    cores = os.cpu_count() or 1
+    if workers is None:
+        workers = max(1, cores // threads_per_worker)
+    return max(1, min(workers, n_jobs))
+
+
+def train_per_condition(df, condition_column, categorical_features, models_dir=MODELS_DIR,
+                        epochs=DEFAULT_EPOCHS, workers=None, threads_per_worker=DEFAULT_THREADS_PER_WORKER,
+                        sample_rows=0, progress=None, force=False, shared_transformer=True, warm_start=False,
+                        update_epochs=DEFAULT_UPDATE_EPOCHS, replay=DEFAULT_REPLAY, constraints=None, **ctgan_kwargs):
+    """Trains one CTGAN per value of condition_column in parallel processes.
+
+    A condition whose data slice, columns and hyperparameters match the fingerprint its
+    saved model was trained from is reused instead of retrained, unless force is set.
+    With shared_transformer, the mode-specific normalizers of the continuous columns (a
+    Bayesian GMM each) are fitted once over the whole table, or taken from the transformer
+    cache, and reused by every condition's model; each result's "transformer" entry reports
+    whether they were cached and the seconds they took.
+
+    With warm_start, a condition whose model was trained before is updated instead of
+    retrained: its model is fine-tuned for update_epochs on the rows not seen in its last
+    training, mixed with replay old rows per new row. Models whose columns or categories
+    changed are retrained in full. With constraints, the sample_rows returned per condition
+    all meet them.
+    Each worker runs torch with threads_per_worker threads and writes its model atomically
+    into models_dir. progress(result, done, total) is called as each condition finishes,
+    in completion order. Returns the results keyed by condition; with sample_rows, each
+    result also carries that many synthetic rows.
+    """
+    os.makedirs(models_dir, exist_ok=True)
+    manifest = load_training_manifest(models_dir)
+
+    jobs = []
+    for condition in df[condition_column].unique():
+        data = df[df[condition_column] == condition]
+        file_name = model_filename(condition)
+        fingerprint = training_fingerprint(data, categorical_features, epochs, ctgan_kwargs, shared_transformer)
+        jobs.append((condition, data, file_name, fingerprint,
+                     not force and is_current(manifest, models_dir, file_name, fingerprint)))
+
+    def can_update(file_name):
+        path = os.path.join(models_dir, file_name)
+        return warm_start and os.path.exists(path) and os.path.exists(row_hashes_path(path))
+
+    # Nothing to train and nothing to sample: answer without starting any process
+    if not sample_rows and all(reused for *_, reused in jobs):
+        results = {}
+        for condition, data, file_name, _, _ in jobs:
+            results[condition] = {"condition": condition, "path": os.path.join(models_dir, file_name),
+                                  "rows": len(data), "reused": True, "updated": False, "new_rows": 0,
+                                  "seconds": 0.0, "sample": None, "transformer": None}
+            if progress is not None:
+                progress(results[condition], len(results), len(jobs))
+        return results
+
+    transforms, transformer_info = None, None
+    if shared_transformer and not all(reused or can_update(file_name) for _, _, file_name, _, reused in jobs):
+        from data_synthesis_and_personalized_treatment.transformer_cache import CACHE_SUBDIR, get_continuous_transforms
+        transforms, transformer_info = get_continuous_transforms(
+            df, categorical_features, os.path.join(models_dir, CACHE_SUBDIR))
+
+    results = {}
+    fingerprints = {condition: (file_name, fingerprint) for condition, _, file_name, fingerprint, _ in jobs}
+    # spawn, not fork: forking a process that already ran torch can deadlock its thread pools
+    with ProcessPoolExecutor(max_workers=plan_workers(len(jobs), workers, threads_per_worker),
+                             mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_worker, initargs=(threads_per_worker,)) as executor:
+        futures = []
+        for condition, data, file_name, _, reused in jobs:
+            path = os.path.join(models_dir, file_name)
+            if reused:
+                futures.append(executor.submit(_reuse_one, condition, len(data), path, sample_rows, constraints))
+            elif can_update(file_name):
+                futures.append(executor.submit(_update_one, condition, data, categorical_features, epochs, path,
+                                               sample_rows, ctgan_kwargs, transforms, update_epochs, replay,
+                                               constraints))
+            else:
+                futures.append(executor.submit(_train_one, condition, data, categorical_features, epochs,
+                                               path, sample_rows, ctgan_kwargs, transforms, constraints))
+        for future in as_completed(futures):
+            result = future.result()
+            result["transformer"] = None if result["reused"] or result["updated"] else transformer_info
+            if not result["reused"]:
+                file_name, fingerprint = fingerprints[result["condition"]]
+                record_training(models_dir, file_name, fingerprint, result["rows"],
+                                "warm_start" if result["updated"] else "full")
+            results[result["condition"]] = result
+            if progress is not None:
+                progress(result, len(results), len(jobs))
+    return results
+
+
+def train_single(df, categorical_features, models_dir=MODELS_DIR, file_name="ctgan_model.pkl",
+                 epochs=DEFAULT_EPOCHS, force=False, shared_transformer=True, **ctgan_kwargs):
+    """Trains (or reuses, when its fingerprint matches) one CTGAN over the whole table in this process.
+
+    With shared_transformer, a retrain reuses the cached continuous column transforms for
+    this schema. Returns (model, reused).
+    """
+    from ctgan import CTGAN
+    from data_synthesis_and_personalized_treatment.transformer_cache import (
+        CACHE_SUBDIR, fit_with_transforms, get_continuous_transforms)
+
+    os.makedirs(models_dir, exist_ok=True)
+    path = os.path.join(models_dir, file_name)
+    fingerprint = training_fingerprint(df, categorical_features, epochs, ctgan_kwargs, shared_transformer)
+    if not force and is_current(load_training_manifest(models_dir), models_dir, file_name, fingerprint):
+        return joblib.load(path), True
+
+    transforms = None
+    if shared_transformer:
+        transforms, _ = get_continuous_transforms(df, categorical_features, os.path.join(models_dir, CACHE_SUBDIR))
+    model = CTGAN(epochs=epochs, **ctgan_kwargs)
+    fit_with_transforms(model, df, categorical_features, transforms)
+    atomic_dump(model, path)
+    record_training(models_dir, file_name, fingerprint, len(df))
+    return model, False
+
+
+def train_conditional(df, categorical_features, models_dir=MODELS_DIR, epochs=DEFAULT_EPOCHS, force=False,
+                      shared_transformer=True, **ctgan_kwargs):
+    """Trains one generator over every condition, to be sampled per condition with condition_column.
+
+    CTGAN's training-by-sampling already conditions the generator on each categorical value,
+    so a single model can stand in for the per-condition ones. Returns (model, reused).
+    """
+    return train_single(df, categorical_features, models_dir, CONDITIONAL_FILE, epochs, force,
+                        shared_transformer, **ctgan_kwargs)
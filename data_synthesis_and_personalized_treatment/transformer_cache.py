@@ -0,0 +1,185 @@
+import copy
+import hashlib
+import json
+import os
+import time
+from contextlib import contextmanager, suppress
+import joblib
+import numpy as np
+import ctgan
+from ctgan import CTGAN
+from ctgan.data_transformer import DataTransformer
+from data_synthesis_and_personalized_treatment.file_utils import atomic_dump
+from data_synthesis_and_personalized_treatment.model_registry import MODELS_DIR
+
+# Subdirectory of a models directory holding its fitted transformers
+CACHE_SUBDIR = "transformers"
+CACHE_DIR = os.path.join(MODELS_DIR, CACHE_SUBDIR)
+# Fitted transformers kept on disk; the least recently used ones are removed beyond this
+MAX_CACHED_TRANSFORMERS = 16
+# A cached transformer is refitted when new values fall this far (relative to the fitted range) outside it
+RANGE_TOLERANCE = 0.1
+# ctgan release (major.minor) whose private fit internals this module relies on: CTGAN.fit
+# building self._transformer and self._generator, and DataTransformer._fit_continuous.
+# Other releases train with a plain fit (see fit_replacements_supported)
+SUPPORTED_CTGAN = "0.12"
+
+
+def fit_replacements_supported():
+    """Whether the installed ctgan is the release the fit replacements were written against."""
+    return ctgan.__version__.split(".")[:2] == SUPPORTED_CTGAN.split(".")
+
+
+def schema_key(data, discrete_columns):
+    """Identifies what the cached column transforms depend on: the continuous columns and their dtypes.
+
+    Row values are deliberately left out, so adding rows or taking a condition subset
+    reuses the fitted transforms (see covers() for the drift check).
+    """
+    payload = {
+        "continuous": [[str(c), str(t)] for c, t in data.dtypes.items() if c not in set(discrete_columns)],
+        "ctgan": ctgan.__version__,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def continuous_ranges(data, discrete_columns):
+    return {str(c): [float(data[c].min()), float(data[c].max())]
+            for c in data.columns if c not in set(discrete_columns)}
+
+
+def covers(ranges, data, tolerance=RANGE_TOLERANCE):
+    """Whether data's continuous values stay within the fitted ranges, widened by tolerance."""
+    for column, (low, high) in ranges.items():
+        margin = (high - low) * tolerance
+        values = data[column].to_numpy(dtype=float)
+        if np.nanmin(values) < low - margin or np.nanmax(values) > high + margin:
+            return False
+    return True
+
+
+def _prune(cache_dir, keep=MAX_CACHED_TRANSFORMERS):
+    entries = sorted((entry for entry in os.scandir(cache_dir) if entry.name.endswith(".pkl")),
+                     key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in entries[keep:]:
+        os.remove(entry.path)
+
+
+def get_continuous_transforms(data, discrete_columns, cache_dir=CACHE_DIR, refit=False):
+    """Returns the fitted mode-specific normalizers of data's continuous columns, from the cache when possible.
+
+    These Bayesian GMM fits are most of a DataTransformer's fitting time; the one-hot
+    encoders are cheap and stay fitted per training set, so a condition subset only has
+    the categories it contains. Returns (transforms, info), where transforms maps column
+    name to ctgan's ColumnTransformInfo and info has the cache key, whether the transforms
+    came from the cache, and the seconds spent fitting or loading them. With an unsupported
+    ctgan release, returns (None, None) and models are fitted in full.
+    """
+    if not fit_replacements_supported():
+        return None, None
+    started = time.perf_counter()
+    key = schema_key(data, discrete_columns)
+    path = os.path.join(cache_dir, f"{key}.pkl")
+    if not refit and os.path.exists(path):
+        try:
+            entry = joblib.load(path)
+            if covers(entry["ranges"], data):
+                with suppress(OSError):
+                    os.utime(path)  # Marks it recently used for pruning
+                return entry["transforms"], {"key": key, "cached": True, "seconds": time.perf_counter() - started}
+        except (OSError, EOFError, KeyError, ImportError):
+            pass  # Unreadable or from another ctgan layout: refit below
+
+    fitter = DataTransformer()
+    transforms = {str(c): fitter._fit_continuous(data[[c]]) for c in data.columns if c not in set(discrete_columns)}
+    os.makedirs(cache_dir, exist_ok=True)
+    atomic_dump({"transforms": transforms, "ranges": continuous_ranges(data, discrete_columns), "rows": len(data)}, path)
+    _prune(cache_dir)
+    return transforms, {"key": key, "cached": False, "seconds": time.perf_counter() - started}
+
+
+class _PrefittedTransformer(DataTransformer):
+    """A DataTransformer that takes its continuous columns' transforms from the cache instead of fitting them."""
+
+    def __init__(self, transforms):
+        super().__init__()
+        self._prefitted = transforms
+
+    def _fit_continuous(self, data):
+        prefitted = self._prefitted.get(str(data.columns[0]))
+        return super()._fit_continuous(data) if prefitted is None else copy.deepcopy(prefitted)
+
+
+class _KeptTransformer(DataTransformer):
+    """Class swapped onto an already fitted transformer so that CTGAN.fit leaves it as it is."""
+
+    def fit(self, raw_data, discrete_columns=()):
+        pass
+
+
+class _ReplacingCTGAN(CTGAN):
+    """Class swapped onto a CTGAN for one fit, so that fit keeps given objects instead of some it builds."""
+
+    def __setattr__(self, name, value):
+        replace = self.__dict__["_replacements"].get(name)
+        if replace is not None:
+            self.__dict__["_replaced"].add(name)
+            value = replace(value)
+        super().__setattr__(name, value)
+
+
+@contextmanager
+def replaced_in_fit(model, **replacements):
+    """Makes model.fit store replacements[name](built) instead of the object it builds for attribute name.
+
+    CTGAN.fit creates its data transformer and generator inline; swapping this model's
+    class while it fits confines the change to the model, leaving ctgan's module and
+    other models (in any thread) untouched. Can be nested. Raises RuntimeError with an
+    unsupported ctgan release, or after a fit that never set one of the attributes (a
+    ctgan change that would otherwise make the replacement silently do nothing).
+    """
+    if not fit_replacements_supported():
+        raise RuntimeError(f"ctgan {ctgan.__version__} is not supported here (expected {SUPPORTED_CTGAN}.x)")
+    previous = model.__dict__.get("_replacements")
+    original = model.__class__
+    model.__dict__["_replacements"] = {**(previous or {}), **replacements}
+    replaced = model.__dict__.setdefault("_replaced", set())
+    model.__class__ = _ReplacingCTGAN
+    try:
+        yield
+        unused = sorted(set(replacements) - replaced)
+        if unused:
+            raise RuntimeError(f"CTGAN.fit in ctgan {ctgan.__version__} never set {', '.join(unused)}; "
+                               "the replacement had no effect")
+    finally:
+        model.__class__ = original
+        if previous is None:
+            del model.__dict__["_replacements"]
+            del model.__dict__["_replaced"]
+        else:
+            model.__dict__["_replacements"] = previous
+
+
+@contextmanager
+def kept_transformer(model):
+    """Makes model.fit keep using the model's already fitted data transformer."""
+    transformer = model._transformer
+    transformer.__class__ = _KeptTransformer
+    try:
+        with replaced_in_fit(model, _transformer=lambda built: transformer):
+            yield
+    finally:
+        transformer.__class__ = DataTransformer
+
+
+def fit_with_transforms(model, data, discrete_columns, transforms):
+    """Fits a CTGAN reusing already fitted continuous column transforms (None fits them as usual)."""
+    if transforms is None or not fit_replacements_supported():
+        model.fit(data, discrete_columns)
+        return model
+    with replaced_in_fit(model, _transformer=lambda built: _PrefittedTransformer(transforms)):
+        model.fit(data, discrete_columns)
+    # Saved models reference ctgan's own class, so loading them never needs this module
+    model._transformer.__class__ = DataTransformer
+    del model._transformer._prefitted
+    return model
@@ -0,0 +1,59 @@
+from ctgan.data_sampler import DataSampler
+from data_synthesis_and_personalized_treatment.training import DEFAULT_UPDATE_EPOCHS
+from data_synthesis_and_personalized_treatment.transformer_cache import fit_replacements_supported, kept_transformer, replaced_in_fit
+
+
+def is_compatible(model, data, discrete_columns):
+    """Whether model can be fine-tuned on data instead of retrained in full.
+
+    Needs a fitted transformer that can encode data (same columns, no unseen categories)
+    and a ctgan release that supports keeping the generator (see fit_replacements_supported).
+    """
+    if not fit_replacements_supported():
+        return False
+    infos = model._transformer._column_transform_info_list
+    if [info.column_name for info in infos] != list(data.columns):
+        return False
+    for info in infos:
+        discrete = info.column_name in discrete_columns
+        if discrete != (info.column_type == "discrete"):
+            return False
+        if discrete and not set(data[info.column_name].dropna().unique()) <= set(info.transform.dummies):
+            return False
+    return True
+
+
+def _kept_generator(model):
+    """Makes model.fit keep training the model's existing generator instead of the fresh one it builds."""
+    generator = model._generator
+
+    def keep(built):
+        if (built.seq[0].fc.in_features != generator.seq[0].fc.in_features
+                or built.seq[-1].out_features != generator.seq[-1].out_features):
+            raise ValueError("The existing generator does not match the model's data layout")
+        return generator
+
+    return replaced_in_fit(model, _generator=keep)
+
+
+def refresh_sampler(model, data):
+    """Rebuilds the condition sampler from data, so sampled category frequencies follow all of it."""
+    model._data_sampler = DataSampler(model._transformer.transform(data), model._transformer.output_info_list,
+                                      model._log_frequency)
+
+
+def fine_tune(model, data, discrete_columns, epochs=DEFAULT_UPDATE_EPOCHS):
+    """Continues training model's generator on data for a few epochs.
+
+    Runs CTGAN's own training loop with the existing transformer and generator in place of
+    fresh ones; the discriminator (which CTGAN does not keep) starts anew. data must be
+    compatible with the model (see is_compatible).
+    """
+    trained_epochs = model._epochs
+    model._epochs = epochs
+    try:
+        with kept_transformer(model), _kept_generator(model):
+            model.fit(data, discrete_columns)
+    finally:
+        model._epochs = trained_epochs
+    return model
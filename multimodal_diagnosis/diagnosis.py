@@ -6,6 +6,17 @@ import google.generativeai as genai
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
 from datetime import datetime
 from groq import Groq
+import multimodal_diagnosis.report_store as report_store
+
+# Analysis results starting with these are errors and must not be stored as reports
+ANALYSIS_FAILURE_PREFIXES = (
+    "Unsupported file type",
+    "Failed to upload image",
+    "No analysis results",
+    "An error occurred during analysis",
+)
+
+REPORTS_PER_PAGE = 10
 
 def app():
     # Setup logging
@@ -207,7 +218,7 @@ def app():
     # Dropdown selection for mode
     mode = st.selectbox(
         "Select Mode",
-        ("Image Analysis", "Chat Bot"),
+        ("Image Analysis", "Report History", "Chat Bot"),
         index=0,
         key="mode_select",
         label_visibility="hidden"  # Hide the label for a cleaner look
@@ -229,39 +240,92 @@ def app():
             key="image_upload",
         )
 
+        # Optional patient key so reports can be looked up per patient later
+        patient_id = st.text_input("Patient ID (optional)", key="image_patient_id").strip()
+
         if uploaded_file is not None:
             # Display the uploaded image in a smaller size
             st.markdown('<div class="image-container">', unsafe_allow_html=True)
             st.image(uploaded_file, caption='Uploaded Image', use_column_width=True)
             st.markdown('</div>', unsafe_allow_html=True)
 
-            # Save the uploaded file to a temporary location
-            with st.spinner("Analyzing the image..."):
-                try:
-                    # Save to a temporary file
-                    temp_file_path = os.path.join("temp_images", f"{uploaded_file.name}")
-                    os.makedirs("temp_images", exist_ok=True)
-                    with open(temp_file_path, "wb") as f:
-                        f.write(uploaded_file.getbuffer())
-
-                    # Analyze the image
-                    analysis_result = analyze_image(temp_file_path)
+            image_bytes = uploaded_file.getvalue()
+            image_hash = report_store.hash_image(image_bytes)
+            conn = report_store.connect()
 
-                    print('the analysis result we got is as follows:')
-                    print(type(analysis_result))
-                    print(analysis_result)
-                    print('finished printing the naalysis report')
+            try:
+                # Serve previously analysed images straight from the report store, whichever patient they were uploaded for
+                cached_report = report_store.find_or_attach(conn, image_hash, patient_id, uploaded_file.name)
+                reanalyze = cached_report is not None and st.button("Re-analyze image")
 
-                    # Remove the temporary file
-                    os.remove(temp_file_path)
+                if cached_report is not None and not reanalyze:
+                    st.markdown("### **Analysis Results:**")
+                    st.caption(f"Loaded from report history ({cached_report['created_at']})")
+                    st.text(cached_report["report"])
+                else:
+                    # Save the uploaded file to a temporary location
+                    with st.spinner("Analyzing the image..."):
+                        # Save to a temporary file
+                        temp_file_path = os.path.join("temp_images", f"{uploaded_file.name}")
+                        os.makedirs("temp_images", exist_ok=True)
+                        with open(temp_file_path, "wb") as f:
+                            f.write(image_bytes)
+
+                        # Analyze the image
+                        analysis_result = analyze_image(temp_file_path)
+
+                        # Remove the temporary file
+                        os.remove(temp_file_path)
+
+                    # Keep successful analyses so the image never has to be sent to the model again
+                    if not analysis_result.startswith(ANALYSIS_FAILURE_PREFIXES):
+                        report_store.save_report(conn, image_hash, analysis_result, patient_id, uploaded_file.name)
 
                     # Display the analysis result
                     st.markdown("### **Analysis Results:**")
                     st.text(analysis_result)
 
-                except Exception as e:
-                    logger.error(f"Error during image upload and analysis: {e}")
-                    st.error(f"An error occurred: {e}")
+            except Exception as e:
+                logger.error(f"Error during image upload and analysis: {e}")
+                st.error(f"An error occurred: {e}")
+            finally:
+                conn.close()
+
+    # ==========================
+    # Report History Interface
+    # ==========================
+    elif mode == "Report History":
+        st.header("🗂️ Report History")
+        st.markdown("Search previous analysis reports by keyword, patient or image.")
+
+        keywords = st.text_input("Keywords", placeholder="e.g. fracture, opacity, lesion", key="history_keywords")
+        patient_filter = st.text_input("Patient ID", key="history_patient_id").strip()
+        lookup_file = st.file_uploader(
+            "Find reports for an image",
+            type=['png', 'jpg', 'jpeg', 'webp'],
+            key="history_image",
+        )
+        image_hash = report_store.hash_image(lookup_file.getvalue()) if lookup_file is not None else None
+
+        conn = report_store.connect()
+        try:
+            total = report_store.count_reports(conn, keywords, patient_filter, image_hash)
+            num_pages = max((total + REPORTS_PER_PAGE - 1) // REPORTS_PER_PAGE, 1)
+            page = st.number_input("Page", min_value=1, max_value=num_pages, value=1, step=1, key="history_page")
+            rows = report_store.search_reports(
+                conn, keywords, patient_filter, image_hash, page=page, page_size=REPORTS_PER_PAGE
+            )
+        finally:
+            conn.close()
+
+        st.write(f"{total} report(s) found - page {page} of {num_pages}")
+        for row in rows:
+            title = f"{row['created_at']} - {row['file_name'] or 'image'}"
+            if row["patient_id"]:
+                title += f" - patient {row['patient_id']}"
+            with st.expander(title):
+                st.markdown(row["snippet"])
+                st.text(row["report"])
 
     # ==========================
     # Chat Bot Interface
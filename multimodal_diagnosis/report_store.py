@@ -0,0 +1,154 @@
+import os
+import sqlite3
+import hashlib
+from datetime import datetime
+
+# Default location of the local report database (next to this module)
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reports.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY,
+    image_hash TEXT NOT NULL,
+    patient_id TEXT,
+    file_name TEXT,
+    created_at TEXT NOT NULL,
+    report TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_reports_image_hash ON reports(image_hash, created_at);
+CREATE INDEX IF NOT EXISTS idx_reports_patient_id ON reports(patient_id, created_at);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS reports_fts USING fts5(
+    report, file_name, patient_id,
+    content='reports', content_rowid='id'
+);
+
+CREATE TRIGGER IF NOT EXISTS reports_ai AFTER INSERT ON reports BEGIN
+    INSERT INTO reports_fts(rowid, report, file_name, patient_id)
+    VALUES (new.id, new.report, new.file_name, new.patient_id);
+END;
+CREATE TRIGGER IF NOT EXISTS reports_ad AFTER DELETE ON reports BEGIN
+    INSERT INTO reports_fts(reports_fts, rowid, report, file_name, patient_id)
+    VALUES ('delete', old.id, old.report, old.file_name, old.patient_id);
+END;
+"""
+
+
+def connect(db_path=DEFAULT_DB_PATH):
+    """Opens the report database, creating the tables and full-text index if needed."""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def hash_image(image_bytes):
+    """Returns the SHA-256 hex digest used to key reports by image content."""
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def save_report(conn, image_hash, report, patient_id=None, file_name=None):
+    """Stores an analysis report and returns its row id."""
+    created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    with conn:
+        cursor = conn.execute(
+            "INSERT INTO reports (image_hash, patient_id, file_name, created_at, report) VALUES (?, ?, ?, ?, ?)",
+            (image_hash, patient_id or None, file_name, created_at, report),
+        )
+    return cursor.lastrowid
+
+
+def find_by_image(conn, image_hash, patient_id=None):
+    """Returns the most recent report for an image (optionally for one patient), or None."""
+    if patient_id:
+        return conn.execute(
+            "SELECT * FROM reports WHERE image_hash = ? AND patient_id = ? ORDER BY created_at DESC, id DESC LIMIT 1",
+            (image_hash, patient_id),
+        ).fetchone()
+    return conn.execute(
+        "SELECT * FROM reports WHERE image_hash = ? ORDER BY created_at DESC, id DESC LIMIT 1",
+        (image_hash,),
+    ).fetchone()
+
+
+def find_or_attach(conn, image_hash, patient_id=None, file_name=None):
+    """Returns the report for an image analysed before under any patient, or None.
+
+    The image content alone decides whether it was seen: a patient's own latest report
+    wins, otherwise another patient's report is copied under patient_id so it shows up
+    in that patient's history without the image being analysed again.
+    """
+    if patient_id:
+        own = find_by_image(conn, image_hash, patient_id)
+        if own is not None:
+            return own
+    report = find_by_image(conn, image_hash)
+    if report is None or not patient_id:
+        return report
+    report_id = save_report(conn, image_hash, report["report"], patient_id, file_name)
+    return conn.execute("SELECT * FROM reports WHERE id = ?", (report_id,)).fetchone()
+
+
+def to_match_query(keywords):
+    """Turns free-text keywords into a safe FTS5 query (every term must match, last term as a prefix)."""
+    terms = [term.replace('"', '""') for term in keywords.split()]
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def _build_filters(keywords, patient_id, image_hash):
+    """Returns the FROM/WHERE clause and parameters shared by searches and counts."""
+    match = to_match_query(keywords) if keywords else None
+    filters = []
+    params = []
+    if match:
+        filters.append("reports_fts MATCH ?")
+        params.append(match)
+    if patient_id:
+        filters.append("r.patient_id = ?")
+        params.append(patient_id)
+    if image_hash:
+        filters.append("r.image_hash = ?")
+        params.append(image_hash)
+
+    source = "reports_fts JOIN reports r ON r.id = reports_fts.rowid" if match else "reports r"
+    where = f"WHERE {' AND '.join(filters)}" if filters else ""
+    return f"{source} {where}", params, match is not None
+
+
+def count_reports(conn, keywords=None, patient_id=None, image_hash=None):
+    """Returns how many stored reports match the given filters."""
+    clause, params, _ = _build_filters(keywords, patient_id, image_hash)
+    return conn.execute(f"SELECT COUNT(*) FROM {clause}", params).fetchone()[0]
+
+
+def search_reports(conn, keywords=None, patient_id=None, image_hash=None, page=1, page_size=10):
+    """Returns one page of stored reports matching the given filters.
+
+    Keyword searches are served from the FTS5 index and ranked by relevance,
+    other lookups use the image-hash/patient indexes and are ordered newest first.
+    Each row carries a short 'snippet' of the report text (matches in bold).
+    """
+    page = max(int(page), 1)
+    clause, params, is_match = _build_filters(keywords, patient_id, image_hash)
+    if is_match:
+        columns = "r.*, snippet(reports_fts, 0, '**', '**', '...', 24) AS snippet"
+        order = "bm25(reports_fts), r.id DESC"
+    else:
+        columns = "r.*, substr(r.report, 1, 200) AS snippet"
+        order = "r.created_at DESC, r.id DESC"
+
+    return conn.execute(
+        f"SELECT {columns} FROM {clause} ORDER BY {order} LIMIT ? OFFSET ?",
+        params + [page_size, (page - 1) * page_size],
+    ).fetchall()
+
+
+def delete_report(conn, report_id):
+    """Removes a report (and its index entry)."""
+    with conn:
+        conn.execute("DELETE FROM reports WHERE id = ?", (report_id,))
@@ -0,0 +1,79 @@
+import unittest
+import os
+import tempfile
+from report_store import *
+
+class TestReportStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.conn = connect(os.path.join(self.tmp_dir.name, "reports.db"))
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmp_dir.cleanup()
+
+    def testing_find_by_image(self):
+        image_hash = hash_image(b"fake image bytes")
+        self.assertIsNone(find_by_image(self.conn, image_hash))
+
+        save_report(self.conn, image_hash, "First report", patient_id="p1", file_name="scan.png")
+        save_report(self.conn, image_hash, "Second report", patient_id="p2", file_name="scan.png")
+
+        self.assertEqual(find_by_image(self.conn, image_hash)["report"], "Second report")
+        self.assertEqual(find_by_image(self.conn, image_hash, "p1")["report"], "First report")
+        self.assertIsNone(find_by_image(self.conn, hash_image(b"other image")))
+
+    def testing_find_or_attach_reuses_other_patients_report(self):
+        image_hash = hash_image(b"fake image bytes")
+        self.assertIsNone(find_or_attach(self.conn, image_hash, "p1"))
+        save_report(self.conn, image_hash, "First report", patient_id="p1", file_name="scan.png")
+
+        # The same image under a new patient is served from the store and filed under that patient
+        report = find_or_attach(self.conn, image_hash, "p2", "copy.png")
+        self.assertEqual((report["report"], report["patient_id"]), ("First report", "p2"))
+        self.assertEqual(count_reports(self.conn, patient_id="p2"), 1)
+
+        # Only attached once, and patients' own reports are not copied
+        find_or_attach(self.conn, image_hash, "p2", "copy.png")
+        find_or_attach(self.conn, image_hash, "p1")
+        find_or_attach(self.conn, image_hash)
+        self.assertEqual(count_reports(self.conn, image_hash=image_hash), 2)
+
+    def testing_keyword_search(self):
+        save_report(self.conn, hash_image(b"a"), "Hairline fracture of the left radius.", patient_id="p1")
+        save_report(self.conn, hash_image(b"b"), "No abnormal findings in the chest X-ray.", patient_id="p2")
+        save_report(self.conn, hash_image(b"c"), "Displaced fracture of the tibia.", patient_id="p2")
+
+        rows = search_reports(self.conn, "fracture")
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(count_reports(self.conn, "fracture"), 2)
+        self.assertIn("**fracture**", rows[0]["snippet"])
+
+        # Prefix matching on the last term, combined with a patient filter
+        rows = search_reports(self.conn, "fract", patient_id="p2")
+        self.assertEqual([row["report"] for row in rows], ["Displaced fracture of the tibia."])
+
+        # Quotes and FTS operators in user input must not break the query
+        self.assertEqual(search_reports(self.conn, 'x-ray "chest'), search_reports(self.conn, "x-ray chest"))
+
+    def testing_pagination(self):
+        for i in range(25):
+            save_report(self.conn, hash_image(str(i).encode()), f"Report number {i} with effusion")
+
+        self.assertEqual(count_reports(self.conn), 25)
+        first_page = search_reports(self.conn, page=1, page_size=10)
+        last_page = search_reports(self.conn, page=3, page_size=10)
+        self.assertEqual(len(first_page), 10)
+        self.assertEqual(len(last_page), 5)
+        self.assertEqual(first_page[0]["report"], "Report number 24 with effusion")
+
+        keyword_ids = {row["id"] for page in (1, 2, 3) for row in search_reports(self.conn, "effusion", page=page, page_size=10)}
+        self.assertEqual(len(keyword_ids), 25)
+
+    def testing_delete_removes_index_entry(self):
+        report_id = save_report(self.conn, hash_image(b"a"), "Small pleural effusion")
+        delete_report(self.conn, report_id)
+        self.assertEqual(count_reports(self.conn, "effusion"), 0)
+
+if __name__ == "__main__":
+    unittest.main()
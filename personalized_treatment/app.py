@@ -2,11 +2,13 @@
 
 def app():
     import streamlit as st
-    from personalized_treatment.firebaseConfig import auth, db  # Import Firebase authentication and database
+    from personalized_treatment.firebaseConfig import auth  # Import Firebase authentication
+    from personalized_treatment.user_repository import get_repository  # Cached access to users/<id> records
     from personalized_treatment.medical_chatbot import medical_chatbot  # Import your chatbot function
-    from personalized_treatment.monthly_goals import monthly_goals
-    from personalized_treatment.diet import diet
-    from personalized_treatment.workout import workout
+    from personalized_treatment.monthly_goals import monthly_goals, generate_monthly_goals, MODEL as MONTHLY_GOALS_MODEL
+    from personalized_treatment.diet import diet, generate_diet, MODEL as DIET_MODEL
+    from personalized_treatment.workout import workout, generate_workout, MODEL as WORKOUT_MODEL
+    from personalized_treatment.plan_cache import start_prefetch, collect_prefetched_plans
     from personalized_treatment.health_monitor import health_monitor
     # Streamlit UI for Personal Medical Assistant
     st.title("Personal Medical Assistant")
@@ -17,6 +19,15 @@ def app():
     if 'page' not in st.session_state:
         st.session_state['page'] = "Medical Chatbot"  # Default page is the Medical Chatbot
 
+    users = get_repository()
+
+    # Plans generated in the background right after login/sign-up
+    plan_generators = {
+        "diet": (generate_diet, DIET_MODEL),
+        "workout": (generate_workout, WORKOUT_MODEL),
+        "monthly_goals": (generate_monthly_goals, MONTHLY_GOALS_MODEL),
+    }
+
     # Function to handle login
     def login_user(email, password):
         try:
@@ -25,10 +36,11 @@ def app():
 
             # Fetch the user's personal details from the database using their user ID
             user_id = user['localId']
-            user_data = db.child("users").child(user_id).get().val()
+            user_data = users.get_user(user_id)
             if user_data and 'name' in user_data:
                 st.session_state['user_name'] = user_data['name']
                 st.session_state['user_data'] = user_data  # Save user data for chatbot
+                start_prefetch(user_id, user_data, plan_generators)  # Warm up the plan pages
                 st.success(f"Welcome, {user_data['name']}!")  # Personalized welcome message
             else:
                 st.success(f"Welcome, {email}!")  # Fallback to email if name is not available
@@ -50,7 +62,7 @@ def app():
     # Function to store user data in Realtime Database
     def store_user_data(user_id, user_data):
         try:
-            db.child("users").child(user_id).set(user_data)  # Store data under user's unique ID
+            users.create_user(user_id, user_data)  # Store data under user's unique ID
             st.success("Data saved successfully!")
         except Exception as e:
             st.error(f"Error saving data: {e}")
@@ -58,6 +70,8 @@ def app():
     # Function to handle logout
     def logout_user():
         st.session_state['user'] = None  # Reset user session
+        st.session_state.pop('plan_prefetch', None)
+        st.session_state.pop('chat_session', None)
         st.success("Logged out successfully!")
 
     # Main layout and navigation bar
@@ -66,6 +80,9 @@ def app():
         menu_options = ["Medical Chatbot", "Monthly Goals", "Diet", "Health Monitoring", "Workout Plan"]
         user_name = st.session_state['user_data'].get('name', st.session_state['user']['email'])  # Use name if available, otherwise fallback to email
         st.write(f"Welcome, {user_name}")
+
+        # Pick up any plans that finished generating in the background
+        collect_prefetched_plans(st.session_state['user_data'])
         
         # Create the horizontal menu bar
         selected_option = st.selectbox("Select a feature", menu_options, key="page", format_func=lambda x: x)
@@ -228,4 +245,5 @@ def app():
                         user_id = user['localId']
                         store_user_data(user_id, st.session_state['user_data'])  # Store all collected data to Firebase
                         st.session_state['user'] = user  # Log in the newly registered user
+                        start_prefetch(user_id, st.session_state['user_data'], plan_generators)
                         st.rerun()  # Go to home page after submission
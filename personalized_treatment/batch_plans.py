@@ -0,0 +1,217 @@
+# Headless batch generation of diet, workout and monthly-goal plans for a cohort of users.
+# Run from the project root, e.g.:
+#   python -m personalized_treatment.batch_plans --csv cohort.csv --output plans.jsonl
+#   python -m personalized_treatment.batch_plans --firebase --write-firebase --concurrency 8
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from langchain_core.callbacks import get_usage_metadata_callback
+from personalized_treatment.diet import generate_diet, MODEL as DIET_MODEL
+from personalized_treatment.monthly_goals import generate_monthly_goals, MODEL as MONTHLY_GOALS_MODEL
+from personalized_treatment.plan_cache import get_cached_plan, make_plan, profile_fingerprint
+from personalized_treatment.user_repository import get_repository
+from personalized_treatment.workout import generate_workout, MODEL as WORKOUT_MODEL
+
+logger = logging.getLogger(__name__)
+
+PLAN_GENERATORS = {
+    "diet": (generate_diet, DIET_MODEL),
+    "workout": (generate_workout, WORKOUT_MODEL),
+    "monthly_goals": (generate_monthly_goals, MONTHLY_GOALS_MODEL),
+}
+
+DEFAULT_CHECKPOINT = "batch_plans.checkpoint.jsonl"
+# USD per million (input, output) tokens; override with --price-in/--price-out
+DEFAULT_PRICES = (0.05, 0.08)
+CSV_CHUNK_ROWS = 500
+
+
+def iter_csv_users(path, id_column="user_id"):
+    """Streams (user_id, user_data) from a CSV in chunks; empty cells are left out of the record.
+
+    IDs are read as text, so "001" stays "001" (and not 1 or 1.0) and matches its Firebase
+    key; rows without an ID are skipped.
+    """
+    for chunk in pd.read_csv(path, chunksize=CSV_CHUNK_ROWS, dtype={id_column: str}):
+        if id_column not in chunk.columns:
+            raise ValueError(f"The CSV has no '{id_column}' column.")
+        for record in chunk.to_dict("records"):
+            user_id = record.pop(id_column)
+            if not isinstance(user_id, str) or not user_id.strip():
+                logger.warning(f"Skipping a row without a {id_column}")
+                continue
+            yield user_id.strip(), {key: value for key, value in record.items() if not (isinstance(value, float) and math.isnan(value))}
+
+
+def iter_firebase_users(repository):
+    """Streams (user_id, user_data) from Firebase one record at a time after a shallow key listing."""
+    for user_id in repository.user_ids():
+        user_data = repository.get_user(user_id)
+        if user_data:
+            yield user_id, user_data
+        repository.invalidate(user_id)  # Nothing is re-read, so don't hold thousands of records
+
+
+def load_checkpoint(path):
+    """Returns the (user_id, kind) pairs already written by an earlier run."""
+    done = set()
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # A run killed mid-write can leave a partial last line
+                done.add((entry["user_id"], entry["kind"]))
+    return done
+
+
+class PlanWriter:
+    """Buffers generated plans and writes them in bulk, checkpointing only what was written."""
+
+    def __init__(self, checkpoint_path, output_path=None, repository=None, flush_every=50):
+        self.checkpoint_path = checkpoint_path
+        self.output_path = output_path
+        self.repository = repository
+        self.flush_every = flush_every
+        self.buffer = []
+
+    def add(self, user_id, kind, plan):
+        self.buffer.append((user_id, kind, plan))
+        return len(self.buffer) >= self.flush_every
+
+    def flush(self):
+        batch, self.buffer = self.buffer, []
+        if not batch:
+            return
+        if self.repository is not None:
+            updates = {}
+            for user_id, kind, plan in batch:
+                updates.setdefault(user_id, {})[f"plans/{kind}"] = plan
+            self.repository.batch_update(updates)  # One multi-path update per flush
+        if self.output_path:
+            with open(self.output_path, "a") as f:
+                for user_id, kind, plan in batch:
+                    f.write(json.dumps({"user_id": user_id, "kind": kind, **plan}) + "\n")
+        with open(self.checkpoint_path, "a") as f:
+            for user_id, kind, _ in batch:
+                f.write(json.dumps({"user_id": user_id, "kind": kind}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+async def generate_with_retry(generate, user_data, retries):
+    for attempt in range(retries + 1):
+        try:
+            return await asyncio.to_thread(generate, user_data)
+        except Exception:
+            if attempt == retries:
+                raise
+            await asyncio.sleep(2 ** attempt)  # Back off on rate limits and transient errors
+
+
+async def run_batch(users, kinds, writer, concurrency=8, retries=3, force=False, done=frozenset()):
+    """Generates plans for every (user, kind) not in done, with at most concurrency LLM calls in flight.
+
+    users may be any iterator of (user_id, user_data); it is advanced on a worker thread.
+    """
+    stats = {"generated": 0, "skipped": 0, "failed": 0}
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+    write_lock = asyncio.Lock()
+
+    async def produce():
+        # Each record is read on a worker thread: a Firebase read or CSV chunk must not block the loop
+        records = iter(users)
+        while (record := await asyncio.to_thread(next, records, None)) is not None:
+            user_id, user_data = record
+            for kind in kinds:
+                generate, model = PLAN_GENERATORS[kind]
+                fingerprint = profile_fingerprint(user_data, model)
+                if (user_id, kind) in done or (not force and get_cached_plan(user_data, kind, fingerprint)):
+                    stats["skipped"] += 1
+                    continue
+                await queue.put((user_id, user_data, kind, generate, fingerprint))
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    async def work():
+        while (item := await queue.get()) is not None:
+            user_id, user_data, kind, generate, fingerprint = item
+            try:
+                content = await generate_with_retry(generate, user_data, retries)
+            except Exception as e:
+                stats["failed"] += 1
+                logger.warning(f"{kind} plan for {user_id} failed: {e}")
+                continue
+            stats["generated"] += 1
+            async with write_lock:
+                if writer.add(user_id, kind, make_plan(fingerprint, content)):
+                    await asyncio.to_thread(writer.flush)
+                    logger.info(f"{stats['generated']} plans written")
+
+    await asyncio.gather(produce(), *(work() for _ in range(concurrency)))
+    await asyncio.to_thread(writer.flush)
+    return stats
+
+
+def estimate_cost(usage_metadata, price_in, price_out):
+    input_tokens = sum(usage["input_tokens"] for usage in usage_metadata.values())
+    output_tokens = sum(usage["output_tokens"] for usage in usage_metadata.values())
+    return input_tokens, output_tokens, (input_tokens * price_in + output_tokens * price_out) / 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate personalized plans for many users at once.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--csv", help="CSV of user profiles with a user_id column")
+    source.add_argument("--firebase", action="store_true", help="Read every user record from Firebase")
+    parser.add_argument("--id-column", default="user_id")
+    parser.add_argument("--kinds", nargs="+", choices=list(PLAN_GENERATORS), default=list(PLAN_GENERATORS))
+    parser.add_argument("--concurrency", type=int, default=8, help="Maximum LLM calls in flight")
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--output", help="Append generated plans to this JSONL file")
+    parser.add_argument("--write-firebase", action="store_true", help="Store plans under users/<id>/plans")
+    parser.add_argument("--flush-every", type=int, default=50, help="Plans per bulk write")
+    parser.add_argument("--force", action="store_true", help="Regenerate plans that are still up to date")
+    parser.add_argument("--price-in", type=float, default=DEFAULT_PRICES[0], help="USD per 1M input tokens")
+    parser.add_argument("--price-out", type=float, default=DEFAULT_PRICES[1], help="USD per 1M output tokens")
+    args = parser.parse_args()
+    if not args.output and not args.write_firebase:
+        parser.error("choose where to write the plans: --output and/or --write-firebase")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    repository = get_repository() if args.firebase or args.write_firebase else None
+    users = iter_firebase_users(repository) if args.firebase else iter_csv_users(args.csv, args.id_column)
+    writer = PlanWriter(args.checkpoint, args.output, repository if args.write_firebase else None, args.flush_every)
+    done = load_checkpoint(args.checkpoint)
+    if done:
+        logger.info(f"Resuming: {len(done)} plans already written")
+
+    started = time.perf_counter()
+    with get_usage_metadata_callback() as usage, \
+            ThreadPoolExecutor(max_workers=args.concurrency + 1) as executor:
+        loop = asyncio.new_event_loop()
+        loop.set_default_executor(executor)  # One to_thread worker per LLM call in flight, plus one reading users
+        try:
+            stats = loop.run_until_complete(
+                run_batch(users, args.kinds, writer, args.concurrency, args.retries, args.force, done)
+            )
+        finally:
+            loop.close()
+    elapsed = time.perf_counter() - started
+
+    input_tokens, output_tokens, cost = estimate_cost(usage.usage_metadata, args.price_in, args.price_out)
+    print(f"Generated {stats['generated']} plans, skipped {stats['skipped']}, failed {stats['failed']} in {elapsed:.1f}s")
+    print(f"Throughput: {stats['generated'] / elapsed:.2f} plans/s")
+    print(f"Tokens: {input_tokens} in / {output_tokens} out, estimated cost ${cost:.4f}")
+
+
+if __name__ == "__main__":
+    main()
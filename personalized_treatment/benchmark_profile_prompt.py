@@ -0,0 +1,69 @@
+# Token-count benchmark for the profile block sent with every personalization prompt.
+# Run from the project root: python -m personalized_treatment.benchmark_profile_prompt
+import tiktoken
+from personalized_treatment.profile_prompt import format_profile, profile_preamble
+
+# cl100k is not Llama 3's tokenizer, but the relative saving is what matters here
+ENCODING = tiktoken.get_encoding("cl100k_base")
+
+SAMPLE_PROFILES = {
+    "complete": {
+        "name": "Jane Smith", "age": 28, "gender": "Female", "height": 165, "weight": 62,
+        "bmi": 62 / (1.65 ** 2), "allergies": "Penicillin", "current_medications": "Levothyroxine 50mcg",
+        "previous_conditions": "Hypothyroidism", "previous_medications": "None", "visited_doctors": "Dr. Rao (endocrinologist)",
+        "smoking_habits": "No", "drinking_habits": "Occasionally", "exercise_frequency": "Weekly", "sleep_duration": 7,
+        "current_diet": "Oats for breakfast, rice and dal for lunch, salad for dinner",
+        "family_medical_history": "Mother has type 2 diabetes",
+    },
+    "sparse": {
+        "name": "John Doe", "age": 45, "gender": "Male", "height": 180, "weight": 90, "bmi": 90 / (1.8 ** 2),
+        "allergies": "", "current_medications": "", "previous_conditions": "", "previous_medications": "",
+        "visited_doctors": "", "smoking_habits": "Yes", "drinking_habits": "No", "exercise_frequency": "Rarely",
+        "sleep_duration": 6, "current_diet": "", "family_medical_history": "",
+    },
+    "minimal": {"name": "Sam", "age": 30},
+}
+
+
+# The block previously copy-pasted into medical_chatbot, diet, workout and monthly_goals
+def legacy_profile_block(user_data):
+    return f"""
+            - Name: {user_data.get('name', 'Unknown')}
+            - Age: {user_data.get('age', 'Unknown')}
+            - Gender: {user_data.get('gender', 'Unknown')}
+            - Height: {user_data.get('height', 'Unknown')} cm
+            - Weight: {user_data.get('weight', 'Unknown')} kg
+            - BMI: {user_data.get('bmi', 'Unknown')}
+            - Known Allergies: {user_data.get('allergies', 'None')}
+            - Current Medications: {user_data.get('current_medications', 'None')}
+            - Previous Medical Conditions: {user_data.get('previous_conditions', 'None')}
+            - Previous Medications: {user_data.get('previous_medications', 'None')}
+            - Doctors Visited: {user_data.get('visited_doctors', 'None')}
+            - Smoking Habits: {user_data.get('smoking_habits', 'Unknown')}
+            - Drinking Habits: {user_data.get('drinking_habits', 'Unknown')}
+            - Exercise Frequency: {user_data.get('exercise_frequency', 'Unknown')}
+            - Average Sleep Duration: {user_data.get('sleep_duration', 'Unknown')} hours per night
+            - Current Diet: {user_data.get('current_diet', 'Unknown')}
+            - Family Medical History: {user_data.get('family_medical_history', 'None')}
+            """
+
+
+def count_tokens(text):
+    return len(ENCODING.encode(text))
+
+
+def main():
+    print(f"{'profile':<10} {'legacy':>8} {'compact':>8} {'saved':>8}")
+    for label, user_data in SAMPLE_PROFILES.items():
+        legacy = count_tokens(legacy_profile_block(user_data))
+        compact = count_tokens(format_profile(user_data))
+        print(f"{label:<10} {legacy:>8} {compact:>8} {1 - compact / legacy:>8.0%}")
+
+    # Every feature must start with exactly the same bytes for provider-side prefix caching
+    user_data = SAMPLE_PROFILES["complete"]
+    prefixes = {profile_preamble(dict(user_data)) for _ in range(4)}
+    print(f"\nshared prefix: {count_tokens(profile_preamble(user_data))} tokens, byte-identical across calls: {len(prefixes) == 1}")
+
+
+if __name__ == "__main__":
+    main()
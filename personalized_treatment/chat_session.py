@@ -0,0 +1,80 @@
+# Upper bound on the conversation history sent with each chatbot turn
+DEFAULT_HISTORY_TOKENS = 1500
+# Appended where an over-budget turn was cut short
+TRUNCATION_MARK = " [...]"
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token), good enough for budgeting history."""
+    return len(text) // 4 + 1
+
+
+def shorten(text, max_tokens):
+    """text cut to about max_tokens tokens, marked where it was cut."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    return text[:max(0, (max_tokens - 1) * 4 - len(TRUNCATION_MARK))] + TRUNCATION_MARK
+
+
+class ChatSession:
+    """A chat conversation with a stable system prompt and a token-budgeted window of past turns.
+
+    The system prompt is always sent first and unchanged, so providers can cache it as a
+    prefix; only the most recent turns that fit in max_history_tokens are kept, and the
+    latest exchange is always kept (cut short if it alone is over the budget).
+    """
+
+    def __init__(self, system_prompt, turns=None, max_history_tokens=DEFAULT_HISTORY_TOKENS):
+        self.system_prompt = system_prompt
+        self.max_history_tokens = max_history_tokens
+        self.turns = []
+        for turn in turns or []:
+            self.turns.append({"role": turn["role"], "content": turn["content"]})
+        self.trim()
+
+    def history_tokens(self):
+        return sum(estimate_tokens(turn["content"]) for turn in self.turns)
+
+    def trim(self):
+        """Drops the oldest turns until the history fits the token budget, keeping the latest exchange."""
+        # Where the latest exchange starts (with no user turn, every turn is a dangling reply)
+        latest = max((i for i, turn in enumerate(self.turns) if turn["role"] == "user"), default=len(self.turns))
+        while latest and self.history_tokens() > self.max_history_tokens:
+            self.turns.pop(0)
+            latest -= 1
+        # Never start the window with a dangling assistant reply
+        while latest and self.turns[0]["role"] != "user":
+            self.turns.pop(0)
+            latest -= 1
+
+        # A single exchange over the budget is cut short, the shorter turn first
+        budget = self.max_history_tokens
+        if self.history_tokens() > budget:
+            for done, turn in enumerate(sorted(self.turns, key=lambda t: len(t["content"]))):
+                turn["content"] = shorten(turn["content"], budget // (len(self.turns) - done))
+                budget -= estimate_tokens(turn["content"])
+
+    def add_exchange(self, user_input, response):
+        self.turns.append({"role": "user", "content": user_input})
+        self.turns.append({"role": "assistant", "content": response})
+        self.trim()
+
+    def history_messages(self):
+        """Remembered turns as (role, content) tuples LangChain chat models accept."""
+        roles = {"user": "human", "assistant": "ai"}
+        return [(roles[turn["role"]], turn["content"]) for turn in self.turns]
+
+    def messages(self, user_input):
+        """Messages for the next model call: system prompt, remembered turns, then the new input."""
+        return [("system", self.system_prompt)] + self.history_messages() + [("human", user_input)]
+
+    def clear(self):
+        self.turns = []
+
+    def to_dict(self):
+        """Compact form persisted with the user record; the system prompt is rebuilt from the profile."""
+        return {"turns": list(self.turns)}
+
+    @classmethod
+    def from_dict(cls, data, system_prompt, max_history_tokens=DEFAULT_HISTORY_TOKENS):
+        return cls(system_prompt, (data or {}).get("turns"), max_history_tokens)
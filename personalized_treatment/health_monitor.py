@@ -1,4 +1,10 @@
+import datetime
+import pandas as pd
 import streamlit as st
+from personalized_treatment.vitals_store import VITALS, append_readings, query_range, lttb_downsample, minmax_downsample, import_csv, utc_epoch
+
+# Most points sent to the browser per chart, whatever the length of the range
+CHART_POINTS = 1000
 
 def health_monitor(user_data):
     st.subheader("Health Monitoring Dashboard")
@@ -58,4 +64,80 @@ def health_monitor(user_data):
     st.write(f"**Current Diet**: {current_diet}")
     st.write(f"**Family Medical History**: {family_medical_history}")
     
+    # Longitudinal vitals recorded by the user
+    user = st.session_state.get("user") or {}
+    vitals_dashboard(user.get("localId", "local"))
+
     st.write("**Keep monitoring your health regularly and consult a healthcare professional if needed.**")
+
+
+def record_reading_form(user_id):
+    with st.form("add_vitals", clear_on_submit=True):
+        st.write("#### Record a reading")
+        col1, col2 = st.columns(2)
+        # Readings are stored and queried in UTC, so the form works in UTC too
+        now = datetime.datetime.now(datetime.timezone.utc)
+        day = col1.date_input("Date (UTC)", value=now.date())
+        at = col2.time_input("Time (UTC)", value=now.time().replace(second=0, microsecond=0))
+        # 0 means "not measured" so one form can record any subset of vitals
+        readings = {
+            metric: st.number_input(f"{metric.replace('_', ' ').capitalize()} ({unit})", min_value=0.0, value=0.0)
+            for metric, unit in VITALS.items()
+        }
+        if st.form_submit_button("Save reading"):
+            timestamp = utc_epoch(day, at)
+            saved = [metric for metric, value in readings.items() if value > 0]
+            for metric in saved:
+                append_readings(user_id, metric, [timestamp], [readings[metric]])
+            if saved:
+                st.success(f"Saved {', '.join(saved)}.")
+            else:
+                st.warning("Enter at least one value.")
+
+
+def import_readings(user_id):
+    uploaded = st.file_uploader("Import readings from a CSV or wearable export", type=["csv"])
+    if uploaded is not None and st.button("Import"):
+        try:
+            counts, skipped = import_csv(user_id, uploaded)
+            st.success("Imported " + ", ".join(f"{count} {metric}" for metric, count in counts.items()) + " readings.")
+            if skipped:
+                st.warning(f"Skipped {skipped} row(s) whose date or time could not be read.")
+        except ValueError as e:
+            st.error(f"Could not import the file: {e}")
+
+
+def vitals_dashboard(user_id):
+    st.write("### Vitals Trends")
+    record_reading_form(user_id)
+    import_readings(user_id)
+
+    metric = st.selectbox("Vital", list(VITALS), format_func=lambda m: f"{m.replace('_', ' ').capitalize()} ({VITALS[m]})")
+    today = datetime.datetime.now(datetime.timezone.utc).date()
+    date_range = st.date_input("Date range (UTC)", value=(today - datetime.timedelta(days=90), today))
+    if len(date_range) != 2:
+        return
+    start = utc_epoch(date_range[0])
+    end = utc_epoch(date_range[1], datetime.time.max)
+
+    timestamps, values = query_range(user_id, metric, start, end)
+    if timestamps.size == 0:
+        st.info("No readings in this range yet.")
+        return
+
+    # Summary statistics use every reading; only the chart is downsampled
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Latest", f"{values[-1]:g}")
+    col2.metric("Average", f"{values.mean():.1f}")
+    col3.metric("Min", f"{values.min():g}")
+    col4.metric("Max", f"{values.max():g}")
+
+    # Spiky daily counts keep their extremes with min/max buckets; smooth vitals use LTTB
+    if metric == "steps":
+        chart_ts, chart_values = minmax_downsample(timestamps, values, CHART_POINTS // 2)
+    else:
+        chart_ts, chart_values = lttb_downsample(timestamps, values, CHART_POINTS)
+    chart = pd.DataFrame({metric: chart_values}, index=pd.to_datetime(chart_ts, unit="s", utc=True))
+    st.line_chart(chart)
+    if chart_ts.size < timestamps.size:
+        st.caption(f"Showing {chart_ts.size} of {timestamps.size} readings.")
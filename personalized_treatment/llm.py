@@ -0,0 +1,16 @@
+import os
+from functools import lru_cache
+from dotenv import load_dotenv
+from langchain_groq import ChatGroq
+
+# Load environment variables from .env file
+load_dotenv()
+
+
+@lru_cache(maxsize=None)
+def get_chat_model(model_name):
+    """Returns one shared ChatGroq client per model so its HTTP connection pool is reused across reruns."""
+    return ChatGroq(
+        groq_api_key=os.getenv('GROQ_API_KEY'),
+        model_name=model_name
+    )
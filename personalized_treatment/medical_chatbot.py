@@ -1,74 +1,78 @@
-import os
-from dotenv import load_dotenv
-from langchain_groq import ChatGroq
 import streamlit as st
+from personalized_treatment.chat_session import ChatSession
+from personalized_treatment.llm import get_chat_model
+from personalized_treatment.profile_prompt import profile_preamble
+from personalized_treatment.user_repository import get_repository
 
-# Load environment variables from .env file
-load_dotenv()
+CHATBOT_INSTRUCTIONS = (
+    "You are a helpful medical assistant. "
+    "The user will describe a symptom or issue they are experiencing. Provide personalized health advice, assess the seriousness of the issue "
+    "and mention it to the user, suggest possible treatment plans, and recommend immediate actions if necessary. "
+    "Offer additional health recommendations. Do not give solutions to non-medical questions."
+)
+
+MODEL = 'llama3-8b-8192'
+
+# Returns the user's conversation, restored from their stored record on first use
+def get_chat_session(user_data, system_prompt):
+    session = st.session_state.get("chat_session")
+    if session is None:
+        session = ChatSession.from_dict(user_data.get("chat_session"), system_prompt)
+        st.session_state["chat_session"] = session
+    # Profile edits change the prompt; the stored turns stay valid
+    session.system_prompt = system_prompt
+    return session
+
+# Persists the bounded conversation window so it survives logout/login
+def save_chat_session(user_data, session):
+    user_data["chat_session"] = session.to_dict()
+    user = st.session_state.get("user") or {}
+    if user.get("localId"):
+        try:
+            get_repository().update_fields(user["localId"], {"chat_session": session.to_dict()})
+        except Exception as e:
+            st.warning(f"Could not save the conversation: {e}")
 
 # Function to handle the medical chatbot
 def medical_chatbot(user_data):
-    # Get Groq API key from environment
-    groq_api_key = os.getenv('GROQ_API_KEY')
-    model = 'llama3-8b-8192'
-
-    # Initialize Groq Langchain chat object
-    groq_chat = ChatGroq(
-        groq_api_key=groq_api_key, 
-        model_name=model
-    )
+    # Shared Groq Langchain chat object
+    groq_chat = get_chat_model(MODEL)
 
-    # Define the personalized system prompt for the chatbot
-    system_prompt = f"""
-    You are a helpful medical assistant. The user has the following medical data:
-    - Name: {user_data.get('name', 'Unknown')}
-            - Age: {user_data.get('age', 'Unknown')}
-            - Gender: {user_data.get('gender', 'Unknown')}
-            - Height: {user_data.get('height', 'Unknown')} cm
-            - Weight: {user_data.get('weight', 'Unknown')} kg
-            - BMI: {user_data.get('bmi', 'Unknown')}
-            - Known Allergies: {user_data.get('allergies', 'None')}
-            - Current Medications: {user_data.get('current_medications', 'None')}
-            - Previous Medical Conditions: {user_data.get('previous_conditions', 'None')}
-            - Previous Medications: {user_data.get('previous_medications', 'None')}
-            - Doctors Visited: {user_data.get('visited_doctors', 'None')}
-            - Smoking Habits: {user_data.get('smoking_habits', 'Unknown')}
-            - Drinking Habits: {user_data.get('drinking_habits', 'Unknown')}
-            - Exercise Frequency: {user_data.get('exercise_frequency', 'Unknown')}
-            - Average Sleep Duration: {user_data.get('sleep_duration', 'Unknown')} hours per night
-            - Current Diet: {user_data.get('current_diet', 'Unknown')}
-            - Family Medical History: {user_data.get('family_medical_history', 'None')}
-    
-    The user will describe a symptom or issue they are experiencing. Provide personalized health advice, assess the seriousness of the issue and mention it to the user, suggest possible treatment plans, and recommend immediate actions if necessary. Offer additional health recommendations. Do not give solutions to non-medical questions.
-    """
+    # The shared profile block goes first so every feature sends the same prompt prefix
+    system_prompt = profile_preamble(user_data) + CHATBOT_INSTRUCTIONS
+    session = get_chat_session(user_data, system_prompt)
 
     # Streamlit interface for the chatbot
     st.write("Enter your symptoms or health-related question to receive personalized advice.")
 
+    # Show the conversation the model will remember
+    for turn in session.turns:
+        speaker = "You" if turn["role"] == "user" else "Chatbot"
+        st.write(f"**{speaker}:** {turn['content']}")
+
     # Input from the user
     user_input = st.text_input("Describe your symptoms or ask a health-related question:")
 
-    # Ensure chat history is initialized
-    if "chat_history" not in st.session_state:
-        st.session_state["chat_history"] = []
-
     if st.button("Get Response"):
         if user_input:
-            # Append system prompt and user input
-            full_prompt = system_prompt + "\nUser's input: " + user_input
+            # System prompt, remembered turns and the new question as separate chat messages
+            with st.spinner("Thinking..."):
+                response = groq_chat.invoke(session.messages(user_input)).content
 
-            # Get chatbot response directly by sending the full prompt
-            response = groq_chat.predict(full_prompt)
-            
             # Display chatbot response
             st.write(f"**Chatbot Response:** {response}")
 
-            # Update chat history with new message and response
-            st.session_state["chat_history"].append({"role": "user", "content": user_input})
-            st.session_state["chat_history"].append({"role": "assistant", "content": response})
+            # Remember the exchange (older turns beyond the token budget are dropped)
+            session.add_exchange(user_input, response)
+            save_chat_session(user_data, session)
         else:
             st.warning("Please enter a symptom or question.")
 
+    if session.turns and st.button("Clear conversation"):
+        session.clear()
+        save_chat_session(user_data, session)
+        st.rerun()
+
 if __name__ == "__main__":
     # Example user data to pass to the chatbot
     user_data = {
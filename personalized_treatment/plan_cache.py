@@ -0,0 +1,143 @@
+import copy
+import hashlib
+import json
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+import streamlit as st
+from personalized_treatment.profile_prompt import format_profile
+from personalized_treatment.user_repository import get_repository
+
+logger = logging.getLogger(__name__)
+
+# Shared pool for background plan generation; each call is an I/O-bound LLM round trip
+PREFETCH_WORKERS = 6
+prefetch_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="plan-prefetch")
+# Workers one session may occupy; its other plans wait their turn, so one user cannot fill the pool
+PREFETCH_PER_SESSION = 1
+
+
+def profile_fingerprint(user_data, model):
+    """Returns a stable hash of the encoded profile (and model) a plan was generated from.
+
+    Hashing the encoded profile rather than the raw record means edits that do not
+    change what the model sees (e.g. BMI float noise, blank answers) keep the plan.
+    """
+    payload = json.dumps({"model": model, "profile": format_profile(user_data)}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def get_cached_plan(user_data, kind, fingerprint):
+    """Returns the stored plan of this kind if it was generated from the same profile, else None."""
+    plan = (user_data.get("plans") or {}).get(kind)
+    if plan and plan.get("fingerprint") == fingerprint:
+        return plan
+    return None
+
+
+def make_plan(fingerprint, content):
+    """Builds the record stored under users/<user_id>/plans/<kind>."""
+    return {
+        "fingerprint": fingerprint,
+        "content": content,
+        "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def save_plan(user_id, user_data, kind, fingerprint, content):
+    """Keeps a generated plan in the session profile and persists it under the user's Firebase record."""
+    plan = make_plan(fingerprint, content)
+    user_data.setdefault("plans", {})[kind] = plan
+
+    if user_id:
+        try:
+            get_repository().update_fields(user_id, {f"plans/{kind}": plan})
+        except Exception as e:
+            # The plan is still cached for this session, it just won't survive a new login
+            logger.warning(f"Could not persist {kind} plan for {user_id}: {e}")
+    return plan
+
+
+def get_plan(kind, user_data, generate, model, user_id=None, force=False):
+    """Returns the plan for this profile, calling the LLM only when the profile changed or force is set."""
+    fingerprint = profile_fingerprint(user_data, model)
+    plan = None if force else get_cached_plan(user_data, kind, fingerprint)
+    if plan is None:
+        content = generate(user_data)
+        plan = save_plan(user_id, user_data, kind, fingerprint, content)
+    return plan
+
+
+def _prefetch(jobs, user_id, profile):
+    """Generates the plans of one session's jobs one after another, skipping cancelled ones."""
+    for kind, generate, model, future in jobs:
+        if not future.set_running_or_notify_cancel():
+            continue
+        try:
+            future.set_result(get_plan(kind, profile, generate, model, user_id, force=True))
+        except Exception as e:
+            future.set_exception(e)
+
+
+def start_prefetch(user_id, user_data, generators):
+    """Generates every missing or stale plan in the background, on at most PREFETCH_PER_SESSION workers.
+
+    generators maps a plan kind to its (generate, model) pair. Workers get a deep copy of
+    the profile and never touch st.session_state; finished plans are persisted to
+    Firebase by the worker and merged into the session by collect_prefetched_plans.
+    """
+    # Plans of an earlier profile that have not started are no longer needed
+    for future in (st.session_state.get("plan_prefetch") or {}).values():
+        future.cancel()
+
+    jobs = []
+    for kind, (generate, model) in generators.items():
+        if get_cached_plan(user_data, kind, profile_fingerprint(user_data, model)) is None:
+            jobs.append((kind, generate, model, Future()))
+    for lane in range(PREFETCH_PER_SESSION):
+        if jobs[lane::PREFETCH_PER_SESSION]:
+            prefetch_executor.submit(_prefetch, jobs[lane::PREFETCH_PER_SESSION], user_id, copy.deepcopy(user_data))
+    st.session_state["plan_prefetch"] = {kind: future for kind, _, _, future in jobs}
+
+
+def collect_prefetched_plans(user_data, wait_for=None):
+    """Moves finished background plans into the session profile, blocking only on wait_for.
+
+    A wait_for plan still queued behind the session's other plans is cancelled instead,
+    so the caller generates it right away.
+    """
+    pending = st.session_state.get("plan_prefetch") or {}
+    for kind, future in list(pending.items()):
+        if not future.done() and kind != wait_for:
+            continue
+        if kind == wait_for and future.cancel():
+            del pending[kind]
+            continue
+        try:
+            user_data.setdefault("plans", {})[kind] = future.result()
+        except Exception as e:
+            logger.warning(f"Background generation of {kind} plan failed: {e}")
+        del pending[kind]
+
+
+def render_plan(kind, user_data, generate, model):
+    """Streamlit view for a cached plan with an explicit regenerate button."""
+    user = st.session_state.get("user") or {}
+    force = st.button("Regenerate", key=f"regenerate_{kind}")
+
+    # A plan already being prefetched is awaited instead of starting a second LLM call
+    if kind in (st.session_state.get("plan_prefetch") or {}):
+        with st.spinner("Finishing your plan..."):
+            collect_prefetched_plans(user_data, wait_for=kind)
+
+    plan = None if force else get_cached_plan(user_data, kind, profile_fingerprint(user_data, model))
+    if plan is None:
+        with st.spinner("Generating your plan..."):
+            try:
+                plan = get_plan(kind, user_data, generate, model, user.get("localId"), force=True)
+            except Exception as e:
+                st.error(f"Error generating plan: {e}")
+                return
+
+    st.write(f"{plan['content']}")
+    st.caption(f"Generated on {plan['generated_at']}")
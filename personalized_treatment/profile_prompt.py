@@ -0,0 +1,62 @@
+import re
+
+# (field, label, unit) in the order they are sent to the model; the order must stay fixed
+# so the same profile always encodes to byte-identical text
+PROFILE_FIELDS = (
+    ("name", "Name", ""),
+    ("age", "Age", ""),
+    ("gender", "Gender", ""),
+    ("height", "Height", "cm"),
+    ("weight", "Weight", "kg"),
+    ("bmi", "BMI", ""),
+    ("allergies", "Allergies", ""),
+    ("current_medications", "Current medications", ""),
+    ("previous_conditions", "Previous conditions", ""),
+    ("previous_medications", "Previous medications", ""),
+    ("visited_doctors", "Doctors visited", ""),
+    ("smoking_habits", "Smoking", ""),
+    ("drinking_habits", "Drinking", ""),
+    ("exercise_frequency", "Exercise", ""),
+    ("sleep_duration", "Sleep", "h/night"),
+    ("current_diet", "Current diet", ""),
+    ("family_medical_history", "Family history", ""),
+)
+
+# Free-text answers that carry no information and are dropped like empty fields. Negative
+# answers ("No", "None", "Nil") are kept: "Allergies: No" is information, not a blank
+EMPTY_VALUES = {"", "n/a", "na", "unknown", "-"}
+
+# Selectbox answers, always kept as chosen
+CHOICE_FIELDS = {"gender", "smoking_habits", "drinking_habits", "exercise_frequency"}
+
+
+def format_value(field, value):
+    """Normalizes one profile value to compact text, or returns None if it is empty."""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        # Signup stores 0 for unanswered height/weight/sleep and BMI 0 when height is missing
+        if value <= 0:
+            return None
+        value = round(value, 1)
+        return str(int(value)) if value == int(value) else str(value)
+
+    text = re.sub(r"\s+", " ", str(value)).strip()
+    if field not in CHOICE_FIELDS and text.lower() in EMPTY_VALUES:
+        return None
+    return text or None
+
+
+def format_profile(user_data):
+    """Encodes a user profile as compact 'Label: value' lines, skipping empty fields."""
+    lines = []
+    for field, label, unit in PROFILE_FIELDS:
+        value = format_value(field, user_data.get(field))
+        if value is not None:
+            lines.append(f"{label}: {value}{unit}")
+    return "\n".join(lines)
+
+
+def profile_preamble(user_data):
+    """Shared prompt prefix with the user's data; identical for every feature so providers can cache it."""
+    return "The user has the following medical and lifestyle data:\n" + format_profile(user_data) + "\n\n"
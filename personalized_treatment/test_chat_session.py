@@ -0,0 +1,55 @@
+import unittest
+from chat_session import ChatSession, TRUNCATION_MARK, estimate_tokens
+from user_repository import LocalBackend, UserRepository
+
+class TestChatSession(unittest.TestCase):
+    def testing_keeps_recent_turns_within_budget(self):
+        session = ChatSession("You are a helpful medical assistant.", max_history_tokens=60)
+        for i in range(10):
+            session.add_exchange(f"question {i} " + "x" * 40, f"answer {i} " + "y" * 40)
+        self.assertLessEqual(session.history_tokens(), 60)
+        self.assertEqual(session.turns[0]["role"], "user")
+        self.assertTrue(session.turns[-1]["content"].startswith("answer 9"))
+        self.assertEqual(session.messages("next")[0], ("system", "You are a helpful medical assistant."))
+        self.assertEqual(session.messages("next")[-1], ("human", "next"))
+
+    def testing_oversized_exchange_is_cut_short(self):
+        session = ChatSession("prompt", max_history_tokens=100)
+        session.add_exchange("short question", "answer")
+        plan = "Day 1: oatmeal and a walk. " * 200
+        session.add_exchange(plan, "Here is a lighter version of that plan. " * 100)
+        # The latest exchange survives, trimmed to the budget; the older one is dropped
+        self.assertEqual([turn["role"] for turn in session.turns], ["user", "assistant"])
+        self.assertLessEqual(session.history_tokens(), 100)
+        self.assertTrue(session.turns[0]["content"].startswith("Day 1:"))
+        self.assertTrue(session.turns[0]["content"].endswith(TRUNCATION_MARK))
+        self.assertTrue(session.turns[1]["content"].startswith("Here is a lighter version"))
+
+        # A short question keeps its full text; the long reply takes the rest of the budget
+        session.add_exchange("and for dinner?", "z" * 2000)
+        self.assertEqual(session.turns[0]["content"], "and for dinner?")
+        self.assertLessEqual(session.history_tokens(), 100)
+        self.assertGreater(estimate_tokens(session.turns[1]["content"]), 80)
+
+    def testing_dangling_replies_are_dropped(self):
+        session = ChatSession("prompt", [{"role": "assistant", "content": "hello"},
+                                         {"role": "user", "content": "hi"},
+                                         {"role": "assistant", "content": "how can I help?"}])
+        self.assertEqual([turn["content"] for turn in session.turns], ["hi", "how can I help?"])
+        self.assertEqual(ChatSession("prompt", [{"role": "assistant", "content": "hello"}]).turns, [])
+
+    def testing_round_trip_through_user_record(self):
+        users = UserRepository(LocalBackend({"users": {"u1": {"name": "Jane"}}}))
+        session = ChatSession("prompt")
+        session.add_exchange("I have a headache", "Drink water and rest.")
+        users.update_fields("u1", {"chat_session": session.to_dict()})
+
+        users.invalidate()
+        record = users.get_user("u1")
+        restored = ChatSession.from_dict(record["chat_session"], "new prompt")
+        self.assertEqual(restored.turns, session.turns)
+        self.assertEqual(restored.system_prompt, "new prompt")
+        self.assertEqual(ChatSession.from_dict(None, "prompt").turns, [])
+
+if __name__ == '__main__':
+    unittest.main()
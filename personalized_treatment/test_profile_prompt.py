@@ -0,0 +1,37 @@
+import unittest
+from profile_prompt import format_profile, format_value, profile_preamble
+
+class TestProfilePrompt(unittest.TestCase):
+    def testing_empty_fields_are_dropped(self):
+        user_data = {
+            "name": "John Doe",
+            "age": 45,
+            "height": 0,
+            "allergies": "",
+            "current_medications": "Unknown",
+            "previous_conditions": "  n/a ",
+            "family_medical_history": None,
+        }
+        self.assertEqual(format_profile(user_data), "Name: John Doe\nAge: 45")
+
+    def testing_numeric_normalization(self):
+        self.assertEqual(format_value("bmi", 62 / (1.65 ** 2)), "22.8")
+        self.assertEqual(format_value("height", 175.0), "175")
+        self.assertEqual(format_profile({"height": 175.0, "weight": 70.25, "sleep_duration": 7}),
+                         "Height: 175cm\nWeight: 70.2kg\nSleep: 7h/night")
+
+    def testing_negative_answers_are_kept(self):
+        user_data = {"allergies": "No", "current_medications": "None", "smoking_habits": "No"}
+        self.assertEqual(format_profile(user_data), "Allergies: No\nCurrent medications: None\nSmoking: No")
+
+    def testing_text_whitespace_is_collapsed(self):
+        self.assertEqual(format_profile({"current_diet": "Oats\n  and   fruit "}), "Current diet: Oats and fruit")
+
+    def testing_stable_prefix(self):
+        # Key order in the stored record must not change the encoded text
+        first = {"age": 30, "name": "Sam", "gender": "Male"}
+        second = {"gender": "Male", "name": "Sam", "age": 30}
+        self.assertEqual(profile_preamble(first), profile_preamble(second))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import threading
+import time
+import unittest
+from user_repository import LocalBackend, UserRepository
+
+class TestUserRepository(unittest.TestCase):
+    def setUp(self):
+        self.backend = LocalBackend({"users": {"u1": {"name": "Jane", "age": 28}}})
+        self.users = UserRepository(self.backend, ttl=60)
+
+    def testing_read_through_cache(self):
+        self.assertEqual(self.users.get_user("u1")["name"], "Jane")
+        self.users.get_user("u1")
+        self.users.get_user("u1")
+        self.assertEqual(self.backend.calls, 1)
+
+        # Callers get copies, so mutating a returned record cannot corrupt the cache
+        self.users.get_user("u1")["name"] = "Changed"
+        self.assertEqual(self.users.get_user("u1")["name"], "Jane")
+
+        self.users.get_user("u1", refresh=True)
+        self.assertEqual(self.backend.calls, 2)
+
+    def testing_ttl_expiry(self):
+        users = UserRepository(self.backend, ttl=0)
+        users.get_user("u1")
+        users.get_user("u1")
+        self.assertEqual(self.backend.calls, 2)
+
+    def testing_missing_user(self):
+        self.assertIsNone(self.users.get_user("nobody"))
+
+    def testing_partial_update(self):
+        self.users.get_user("u1")
+        self.users.update_fields("u1", {"age": 29, "plans/diet": {"content": "Eat well"}})
+
+        stored = self.backend.child("users", "u1").get().val()
+        self.assertEqual(stored, {"name": "Jane", "age": 29, "plans": {"diet": {"content": "Eat well"}}})
+        # The cached copy is patched in place instead of being re-read
+        calls = self.backend.calls
+        self.assertEqual(self.users.get_user("u1")["plans"]["diet"]["content"], "Eat well")
+        self.assertEqual(self.backend.calls, calls)
+
+    def testing_batch_update_is_one_call(self):
+        self.users.create_user("u2", {"name": "John"})
+        calls = self.backend.calls
+        self.users.batch_update({"u1": {"age": 30}, "u2": {"age": 45, "plans/workout": {"content": "Walk"}}})
+        self.assertEqual(self.backend.calls, calls + 1)
+        self.assertEqual(self.backend.child("users/u2/plans/workout/content").get().val(), "Walk")
+        self.assertEqual(self.users.get_user("u1")["age"], 30)
+
+    def testing_backend_calls_run_in_parallel(self):
+        backend = LocalBackend({"users": {f"u{i}": {"name": f"User {i}"} for i in range(4)}}, latency=0.2)
+        users = UserRepository(backend)
+        threads = [threading.Thread(target=users.get_user, args=(f"u{i}",)) for i in range(4)]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertLess(time.monotonic() - started, 0.6)
+        self.assertEqual(backend.calls, 4)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import datetime
+import io
+import os
+import tempfile
+import unittest
+import numpy as np
+from vitals_store import append_readings, query_range, load_series, lttb_downsample, minmax_downsample, import_csv, utc_epoch
+
+class TestVitalsStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.base_dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def testing_append_and_range_query(self):
+        append_readings("u1", "weight", [100, 200, 300], [70.0, 70.5, 71.0], self.base_dir)
+        append_readings("u1", "weight", [400], [71.2], self.base_dir)
+        timestamps, values = query_range("u1", "weight", 200, 300, self.base_dir)
+        self.assertEqual(timestamps.tolist(), [200, 300])
+        self.assertEqual(values.tolist(), [70.5, 71.0])
+        self.assertEqual(query_range("u2", "weight", base_dir=self.base_dir)[0].size, 0)
+
+    def testing_out_of_order_batch_keeps_series_sorted(self):
+        append_readings("u1", "glucose", [300, 400], [95.0, 101.0], self.base_dir)
+        append_readings("u1", "glucose", [350, 100, 500], [99.0, 90.0, float("nan")], self.base_dir)
+        timestamps, values = load_series("u1", "glucose", self.base_dir)
+        self.assertEqual(timestamps.tolist(), [100, 300, 350, 400])
+        self.assertEqual(values.tolist(), [90.0, 95.0, 99.0, 101.0])
+
+    def testing_unknown_metric(self):
+        with self.assertRaises(ValueError):
+            append_readings("u1", "mood", [1], [1.0], self.base_dir)
+
+    def testing_downsampling_keeps_extremes(self):
+        timestamps = np.arange(10_000, dtype=np.int64)
+        values = np.sin(timestamps / 500.0)
+        values[1234] = 50.0
+
+        ts, vals = lttb_downsample(timestamps, values, 200)
+        self.assertEqual(ts.size, 200)
+        self.assertEqual((ts[0], ts[-1]), (0, 9999))
+        self.assertIn(1234, ts.tolist())
+
+        ts, vals = minmax_downsample(timestamps, values, 100)
+        self.assertLessEqual(ts.size, 200)
+        self.assertTrue(np.all(np.diff(ts) > 0))
+        self.assertEqual(vals.max(), 50.0)
+        self.assertEqual(vals.min(), values.min())
+
+    def testing_csv_import(self):
+        wide = io.StringIO("Date,Weight (kg),Systolic,Diastolic,Steps\n"
+                           "2024-01-01,70.2,120,80,8000\n"
+                           "2024-01-02,70.0,,,9500\n")
+        counts, skipped = import_csv("u1", wide, self.base_dir)
+        self.assertEqual(skipped, 0)
+        self.assertEqual(counts, {"weight": 2, "systolic_bp": 1, "diastolic_bp": 1, "steps": 2})
+
+        wearable = io.StringIO("type,value,startDate\n"
+                               "HKQuantityTypeIdentifierStepCount,120,2024-01-03 08:00:00 +0000\n"
+                               "HKQuantityTypeIdentifierHeartRate,64,2024-01-03 08:00:00 +0000\n")
+        self.assertEqual(import_csv("u1", wearable, self.base_dir), ({"steps": 1}, 0))
+        self.assertEqual(load_series("u1", "steps", self.base_dir)[1].tolist(), [8000.0, 9500.0, 120.0])
+
+    def testing_times_are_utc(self):
+        # Imported times (with or without an offset), typed-in readings and day windows all use UTC
+        import_csv("u1", io.StringIO("Date,Glucose\n2024-01-03 23:30,100\n2024-01-04 00:30,90\n"), self.base_dir)
+        import_csv("u1", io.StringIO("Date,Glucose\n2024-01-04 01:30 +0200,110\n"), self.base_dir)
+        append_readings("u1", "glucose", [utc_epoch(datetime.date(2024, 1, 3), datetime.time(12, 0))], [105.0], self.base_dir)
+        day = datetime.date(2024, 1, 3)
+        _, values = query_range("u1", "glucose", utc_epoch(day), utc_epoch(day, datetime.time.max), self.base_dir)
+        self.assertEqual(values.tolist(), [105.0, 100.0, 110.0])
+
+    def testing_mixed_time_layouts(self):
+        counts, skipped = import_csv("u1", io.StringIO("Date,Weight\n2024-01-01,70\n2024-01-02 10:00,71\n"
+                                                       "2024-01-03T08:00:00+02:00,72\nyesterday,73\n"), self.base_dir)
+        self.assertEqual((counts, skipped), ({"weight": 3}, 1))
+        timestamps, _ = load_series("u1", "weight", self.base_dir)
+        self.assertEqual(timestamps.tolist(), [utc_epoch(datetime.date(2024, 1, 1)),
+                                               utc_epoch(datetime.date(2024, 1, 2), datetime.time(10, 0)),
+                                               utc_epoch(datetime.date(2024, 1, 3), datetime.time(6, 0))])
+
+    def testing_interrupted_append(self):
+        append_readings("u1", "steps", [100, 200], [10.0, 20.0], self.base_dir)
+        # A crash after the timestamps were appended but before the values
+        ts_path = os.path.join(self.base_dir, "u1", "steps.ts")
+        with open(ts_path, "ab") as f:
+            np.array([300], dtype=np.int64).tofile(f)
+        self.assertEqual(load_series("u1", "steps", self.base_dir)[0].tolist(), [100, 200])
+        append_readings("u1", "steps", [400], [40.0], self.base_dir)
+        timestamps, values = load_series("u1", "steps", self.base_dir)
+        self.assertEqual((timestamps.tolist(), values.tolist()), ([100, 200, 400], [10.0, 20.0, 40.0]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,225 @@
+import copy
+import os
+import threading
+import time
+
+# How long a user record read from Firebase is served from memory
+DEFAULT_TTL_SECONDS = 300
+
+
+def split_path(path):
+    return [part for part in str(path).split("/") if part]
+
+
+def set_in(data, path, value):
+    """Sets value at a '/'-separated path inside nested dicts (None deletes, like Firebase)."""
+    parts = split_path(path)
+    for part in parts[:-1]:
+        if not isinstance(data.get(part), dict):
+            data[part] = {}
+        data = data[part]
+    if value is None:
+        data.pop(parts[-1], None)
+    else:
+        data[parts[-1]] = copy.deepcopy(value)
+
+
+class LocalSnapshot:
+    """Mimics the response object returned by pyrebase's get()."""
+
+    def __init__(self, value):
+        self._value = value
+
+    def val(self):
+        return self._value
+
+
+class LocalReference:
+    def __init__(self, backend, parts, shallow=False):
+        self._backend = backend
+        self._parts = parts
+        self._shallow = shallow
+
+    def child(self, *path):
+        return LocalReference(self._backend, self._parts + [p for part in path for p in split_path(part)])
+
+    def shallow(self):
+        return LocalReference(self._backend, self._parts, shallow=True)
+
+    def get(self):
+        value = self._backend.read(self._parts)
+        if self._shallow and isinstance(value, dict):
+            value = {key: True for key in value}  # Firebase's ?shallow=true returns keys only
+        return LocalSnapshot(value)
+
+    def set(self, data):
+        self._backend.write(self._parts, data)
+        return data
+
+    def update(self, data):
+        self._backend.write_many(self._parts, data)
+        return data
+
+
+class LocalBackend:
+    """In-process stand-in for pyrebase's Realtime Database, for tests, benchmarks and offline runs.
+
+    Supports the subset of the API the app uses: child(), get().val(), set(), update()
+    (including multi-path updates). latency adds a fixed delay per call to mimic a round trip;
+    like network calls, the delays of concurrent calls overlap.
+    """
+
+    def __init__(self, data=None, latency=0.0):
+        self._data = copy.deepcopy(data) if data else {}
+        self._lock = threading.Lock()
+        self.latency = latency
+        self.calls = 0
+
+    def _round_trip(self):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def read(self, parts):
+        self._round_trip()
+        with self._lock:
+            node = self._data
+            for part in parts:
+                if not isinstance(node, dict) or part not in node:
+                    return None
+                node = node[part]
+            return copy.deepcopy(node)
+
+    def write(self, parts, value):
+        self._round_trip()
+        with self._lock:
+            if not parts:
+                self._data = copy.deepcopy(value) if value else {}
+            else:
+                set_in(self._data, "/".join(parts), value)
+
+    def write_many(self, parts, updates):
+        """Multi-path update: every relative path in updates is written in a single call."""
+        self._round_trip()
+        with self._lock:
+            for path, value in updates.items():
+                set_in(self._data, "/".join(parts + split_path(path)), value)
+
+    def child(self, *path):
+        return LocalReference(self, []).child(*path)
+
+    def update(self, data):
+        return LocalReference(self, []).update(data)
+
+
+class FirebaseBackend:
+    """pyrebase's Realtime Database with a fresh Database object per call.
+
+    pyrebase's Database builds paths by mutating itself in child(), so one shared object
+    must never be used from two threads; a new one per call lets calls run in parallel.
+    """
+
+    def __init__(self, app):
+        self._app = app
+
+    def child(self, *path):
+        return self._app.database().child(*path)
+
+    def update(self, data):
+        return self._app.database().update(data)
+
+
+class UserRepository:
+    """Data access for users/<user_id> records with a TTL'd read-through cache.
+
+    The lock guards only the cache: backend calls run outside it, so reads and writes for
+    different users proceed in parallel. The backend must hand out a fresh reference per
+    child() call (LocalBackend, FirebaseBackend).
+    """
+
+    def __init__(self, backend, ttl=DEFAULT_TTL_SECONDS):
+        self._backend = backend
+        self._ttl = ttl
+        self._cache = {}
+        # Writes per user, so a read that overlapped a write does not cache what it read
+        self._writes = {}
+        self._lock = threading.Lock()
+
+    def _user_ref(self, user_id):
+        return self._backend.child("users", user_id)
+
+    def get_user(self, user_id, refresh=False):
+        """Returns a copy of the user's record, reading Firebase only on a miss or after the TTL."""
+        with self._lock:
+            entry = self._cache.get(user_id)
+            if not refresh and entry is not None and time.monotonic() - entry[0] <= self._ttl:
+                return copy.deepcopy(entry[1])
+            writes = self._writes.get(user_id, 0)
+
+        data = self._user_ref(user_id).get().val()
+        data = dict(data) if data else None
+        with self._lock:
+            if self._writes.get(user_id, 0) == writes:
+                self._cache[user_id] = (time.monotonic(), copy.deepcopy(data))
+        return data
+
+    def user_ids(self):
+        """Returns every user ID with one shallow read, without downloading the records."""
+        keys = self._backend.child("users").shallow().get().val()
+        return sorted(keys or [])
+
+    def create_user(self, user_id, user_data):
+        """Writes a full user record (sign-up only; use update_fields for changes)."""
+        self._user_ref(user_id).set(user_data)
+        with self._lock:
+            self._writes[user_id] = self._writes.get(user_id, 0) + 1
+            self._cache[user_id] = (time.monotonic(), copy.deepcopy(user_data))
+
+    def update_fields(self, user_id, fields):
+        """Writes only the given fields; keys may be nested paths such as 'plans/diet'."""
+        self.batch_update({user_id: fields})
+
+    def batch_update(self, updates):
+        """Applies {user_id: {field_path: value}} for many users in one multi-path update."""
+        payload = {
+            f"users/{user_id}/{path}": value
+            for user_id, fields in updates.items()
+            for path, value in fields.items()
+        }
+        if not payload:
+            return
+        self._backend.update(payload)
+        with self._lock:
+            for user_id, fields in updates.items():
+                self._writes[user_id] = self._writes.get(user_id, 0) + 1
+                entry = self._cache.get(user_id)
+                if entry is not None and entry[1] is not None:
+                    for path, value in fields.items():
+                        set_in(entry[1], path, value)
+
+    def invalidate(self, user_id=None):
+        """Drops one cached record, or the whole cache."""
+        with self._lock:
+            if user_id is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(user_id, None)
+
+
+_repository = None
+_repository_lock = threading.Lock()
+
+
+def get_repository():
+    """Returns the process-wide repository (USER_STORE_BACKEND=local uses the in-process backend)."""
+    global _repository
+    with _repository_lock:
+        if _repository is None:
+            if os.getenv("USER_STORE_BACKEND", "firebase").lower() == "local":
+                backend = LocalBackend()
+            else:
+                from personalized_treatment.firebaseConfig import firebase
+                backend = FirebaseBackend(firebase)
+            _repository = UserRepository(backend)
+        return _repository
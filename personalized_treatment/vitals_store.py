@@ -0,0 +1,201 @@
+import datetime
+import os
+import re
+import numpy as np
+import pandas as pd
+
+# Supported vitals and their display units
+VITALS = {
+    "weight": "kg",
+    "systolic_bp": "mmHg",
+    "diastolic_bp": "mmHg",
+    "glucose": "mg/dL",
+    "sleep_hours": "h",
+    "steps": "steps",
+}
+
+VITALS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "vitals_data")
+
+# Column names (lower-cased, non-alphanumerics stripped) recognised by the CSV importer
+COLUMN_ALIASES = {
+    "weight": "weight", "weightkg": "weight", "bodymass": "weight",
+    "systolic": "systolic_bp", "systolicbp": "systolic_bp", "bpsystolic": "systolic_bp", "bloodpressuresystolic": "systolic_bp",
+    "diastolic": "diastolic_bp", "diastolicbp": "diastolic_bp", "bpdiastolic": "diastolic_bp", "bloodpressurediastolic": "diastolic_bp",
+    "glucose": "glucose", "bloodglucose": "glucose", "glucosemgdl": "glucose",
+    "sleep": "sleep_hours", "sleephours": "sleep_hours", "sleepduration": "sleep_hours",
+    "steps": "steps", "stepcount": "steps",
+}
+TIME_COLUMNS = ("timestamp", "datetime", "date", "time", "startdate", "start_date", "creationdate")
+
+# Record types in long-format wearable exports (e.g. Apple Health / Google Fit CSV dumps)
+WEARABLE_TYPES = {
+    "hkquantitytypeidentifierbodymass": "weight",
+    "hkquantitytypeidentifierbloodpressuresystolic": "systolic_bp",
+    "hkquantitytypeidentifierbloodpressurediastolic": "diastolic_bp",
+    "hkquantitytypeidentifierbloodglucose": "glucose",
+    "hkquantitytypeidentifierstepcount": "steps",
+}
+
+
+def normalize_name(name):
+    return re.sub(r"[^a-z0-9]", "", str(name).lower())
+
+
+def _series_paths(user_id, metric, base_dir):
+    if metric not in VITALS:
+        raise ValueError(f"Unknown vital '{metric}'. Expected one of: {', '.join(VITALS)}")
+    user_dir = os.path.join(base_dir, re.sub(r"[^A-Za-z0-9_-]", "_", str(user_id)))
+    return os.path.join(user_dir, f"{metric}.ts"), os.path.join(user_dir, f"{metric}.val")
+
+
+def utc_epoch(day, at=datetime.time.min):
+    """Epoch seconds of a date and wall-clock time read as UTC, like naive times in imported files."""
+    return int(datetime.datetime.combine(day, at, tzinfo=datetime.timezone.utc).timestamp())
+
+
+def _stored_rows(ts_path, val_path):
+    """Readings present in both files; a crash between the two appends leaves one of them longer."""
+    if not os.path.exists(ts_path) or not os.path.exists(val_path):
+        return 0
+    return min(os.path.getsize(ts_path), os.path.getsize(val_path)) // 8
+
+
+def load_series(user_id, metric, base_dir=VITALS_DIR):
+    """Returns (timestamps, values) as memory-mapped arrays; timestamps are UTC epoch seconds, sorted."""
+    ts_path, val_path = _series_paths(user_id, metric, base_dir)
+    rows = _stored_rows(ts_path, val_path)
+    if rows == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    timestamps = np.memmap(ts_path, dtype=np.int64, mode="r", shape=(rows,))
+    values = np.memmap(val_path, dtype=np.float64, mode="r", shape=(rows,))
+    return timestamps, values
+
+
+def append_readings(user_id, metric, timestamps, values, base_dir=VITALS_DIR):
+    """Appends readings to a per-user, per-metric columnar series.
+
+    Readings newer than everything stored are appended to the end of the files; an
+    out-of-order batch (e.g. an older export) triggers one sorted rewrite of the series.
+    A tail left in only one file by an interrupted append is cut off first.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    keep = ~np.isnan(values)
+    timestamps, values = timestamps[keep], values[keep]
+    if timestamps.size == 0:
+        return 0
+
+    order = np.argsort(timestamps, kind="stable")
+    timestamps, values = timestamps[order], values[order]
+
+    ts_path, val_path = _series_paths(user_id, metric, base_dir)
+    os.makedirs(os.path.dirname(ts_path), exist_ok=True)
+    rows = _stored_rows(ts_path, val_path)
+    for path in (ts_path, val_path):
+        if os.path.exists(path) and os.path.getsize(path) != rows * 8:
+            os.truncate(path, rows * 8)
+    stored_ts, stored_values = load_series(user_id, metric, base_dir)
+
+    if stored_ts.size == 0 or timestamps[0] >= stored_ts[-1]:
+        with open(ts_path, "ab") as f:
+            timestamps.tofile(f)
+        with open(val_path, "ab") as f:
+            values.tofile(f)
+    else:
+        merged_ts = np.concatenate([stored_ts, timestamps])
+        merged_values = np.concatenate([stored_values, values])
+        order = np.argsort(merged_ts, kind="stable")
+        del stored_ts, stored_values  # Release the memory maps before replacing the files
+        for path, array in ((ts_path, merged_ts[order]), (val_path, merged_values[order])):
+            array.tofile(path + ".tmp")
+            os.replace(path + ".tmp", path)
+    return int(timestamps.size)
+
+
+def query_range(user_id, metric, start=None, end=None, base_dir=VITALS_DIR):
+    """Returns (timestamps, values) with start <= timestamp <= end, found by binary search."""
+    timestamps, values = load_series(user_id, metric, base_dir)
+    lo = 0 if start is None else np.searchsorted(timestamps, start, side="left")
+    hi = timestamps.size if end is None else np.searchsorted(timestamps, end, side="right")
+    return np.array(timestamps[lo:hi]), np.array(values[lo:hi])
+
+
+def minmax_downsample(timestamps, values, n_buckets):
+    """Splits the series into equal-count buckets and keeps each bucket's min and max point."""
+    n = timestamps.size
+    if n <= 2 * n_buckets:
+        return timestamps, values
+    starts = np.linspace(0, n, n_buckets, endpoint=False).astype(np.int64)
+    bucket = np.repeat(np.arange(n_buckets), np.diff(np.append(starts, n)))
+
+    # argmin/argmax per bucket via a lexicographic sort on (bucket, value)
+    order = np.lexsort((values, bucket))
+    ends = np.append(starts[1:], n) - 1
+    min_idx, max_idx = order[starts], order[ends]
+    idx = np.unique(np.concatenate([min_idx, max_idx]))
+    return timestamps[idx], values[idx]
+
+
+def lttb_downsample(timestamps, values, n_out):
+    """Largest-Triangle-Three-Buckets downsampling, keeping the points that preserve the line's shape."""
+    n = timestamps.size
+    if n_out >= n or n_out < 3:
+        return timestamps, values
+
+    x = timestamps.astype(np.float64)
+    y = values
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point) is the third triangle vertex
+        next_hi = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[hi:next_hi].mean(), y[hi:next_hi].mean()
+        areas = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(areas))
+        selected[i + 1] = a
+    return timestamps[selected], values[selected]
+
+
+def _to_epoch_seconds(column):
+    # Times with an offset are converted; times without one are taken as UTC. Each value is
+    # parsed on its own, since exports mix layouts (e.g. dates and date-times)
+    parsed = pd.to_datetime(column, errors="coerce", utc=True, format="mixed")
+    return parsed.astype("int64").to_numpy() // 10**9, parsed.notna().to_numpy()
+
+
+def import_csv(user_id, csv_file, base_dir=VITALS_DIR):
+    """Bulk-imports a CSV of readings and returns ({metric: rows imported}, rows skipped).
+
+    Accepts wide files (a time column plus columns such as weight, systolic, glucose,
+    sleep, steps) and long wearable exports with type/value/date columns. Rows whose
+    time cannot be parsed are skipped and counted.
+    """
+    df = pd.read_csv(csv_file)
+    columns = {normalize_name(column): column for column in df.columns}
+    time_column = next((columns[name] for name in map(normalize_name, TIME_COLUMNS) if name in columns), None)
+    if time_column is None:
+        raise ValueError("The CSV needs a timestamp/date column.")
+    timestamps, valid_time = _to_epoch_seconds(df[time_column])
+
+    series = {}
+    if "type" in columns and "value" in columns:
+        types = df[columns["type"]].map(normalize_name).map(WEARABLE_TYPES)
+        numeric = pd.to_numeric(df[columns["value"]], errors="coerce").to_numpy()
+        for metric in types.dropna().unique():
+            mask = (types == metric).to_numpy() & valid_time
+            series[metric] = (timestamps[mask], numeric[mask])
+    else:
+        for name, column in columns.items():
+            metric = COLUMN_ALIASES.get(name)
+            if metric is not None:
+                numeric = pd.to_numeric(df[column], errors="coerce").to_numpy()
+                series[metric] = (timestamps[valid_time], numeric[valid_time])
+
+    if not series:
+        raise ValueError(f"No vitals columns found. Expected any of: {', '.join(sorted(set(COLUMN_ALIASES)))}")
+    counts = {metric: append_readings(user_id, metric, ts, vals, base_dir) for metric, (ts, vals) in series.items()}
+    return counts, int((~valid_time).sum())